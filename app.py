@@ -1,4 +1,5 @@
 import aiosqlite
+import asyncio
 import inspect
 import json
 
@@ -8,7 +9,8 @@ from collections import deque
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
+from minio.error import S3Error
 from langgraph.types import Command
 from langchain_core.messages import AIMessage, AIMessageChunk, AnyMessage, HumanMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
@@ -21,6 +23,7 @@ from uuid import UUID, uuid4
 
 from src.model.agents.agents import DEFAULT_AGENT, PMHC_AFFINITY_PREDICTION, PATIENT_CASE_MRNA_AGENT,NEO_ANTIGEN,get_agent, initialize_agents
 from src.model.agents.file_description import fileDescriptionAgent
+from src.model.agents.tools import get_import_times
 from src.model.schema.schema import UserInput
 from src.model.schema import MinioRequest,MinioResponse
 from src.model.schema.models import OpenAIModelName
@@ -30,6 +33,20 @@ from src.utils.message_handling import (
     remove_tool_calls,
     _sse_response_example
 )
+from src.utils.http_client import init_http_session, close_http_session, get_http_stats
+from src.utils.inline_payload import get_inline_payload_stats
+from src.utils.artifact_links import ARTIFACT_LINK_EXPIRES, ARTIFACT_LINK_MAX_EXPIRES, get_artifact_link_stats, presign_artifact
+from src.utils.async_storage import get_storage_stats
+from src.utils.candidates import get_candidate_dedup_stats
+from src.utils.cpu_pool import get_cpu_pool_stats, shutdown_cpu_pool
+from src.utils.minio_cache import get_download_cache_stats
+from src.utils.minio_utils import get_minio_client_stats
+from src.utils.prediction_cache import get_prediction_cache_stats
+from src.utils.resilience import get_breaker_states
+from src.utils.run_manifest import apply_lifecycle_rules, cleanup_run, get_run_manifest_stats, load_manifest
+from src.utils.single_flight import get_single_flight_stats
+from src.utils.tool_jobs import resume_pending_jobs
+from src.utils.write_behind import get_write_behind_stats
 from src.utils.log import logger
 
 logger.info(f"========================start molly_langgraph backend==============================")
@@ -38,10 +55,22 @@ async def lifespan(app: FastAPI):
     # 初始化所有代理并获取连接对象
     connections = await initialize_agents()
     app.state.connections = connections  # 将连接对象存储在 app.state 中
+    # 远程工具共享的HTTP连接池
+    await init_http_session()
+    # 继续轮询重启前未完成的远程作业
+    resume_jobs_task = asyncio.create_task(resume_pending_jobs())
+    # 结果桶的中间产物过期规则（RUN_MANIFEST.intermediate_expire_days > 0 时生效）
+    try:
+        await asyncio.to_thread(apply_lifecycle_rules)
+    except Exception as e:
+        logger.warning(f"Failed to apply lifecycle rules: {e}")
 
     try:
         yield
     finally:
+        resume_jobs_task.cancel()
+        await close_http_session()
+        shutdown_cpu_pool()
         # 关闭所有连接
         if hasattr(app.state, "connections"):
             for key, conn in app.state.connections.items():
@@ -522,3 +551,108 @@ async def reset_thread(thread_id: str):
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"清除失败: {str(e)}")
+
+#结果文件的短期预签名下载地址：客户端直连MinIO下载（支持Range/断点续传），redirect=true时直接307跳转
+@app.get("/artifacts/link")
+async def artifact_link_endpoint(uri: str, filename: str = None, expires: int = None, redirect: bool = False):
+    try:
+        url = presign_artifact(uri, filename, expires)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if redirect:
+        return RedirectResponse(url, status_code=307)
+    return {"url": url, "expires_in": min(int(expires or ARTIFACT_LINK_EXPIRES), ARTIFACT_LINK_MAX_EXPIRES)}
+
+#流水线运行清单：该次运行产生的全部MinIO对象及其角色（input/intermediate/deliverable）
+@app.get("/runs/{run_id}/manifest")
+async def run_manifest_endpoint(run_id: str):
+    try:
+        return await asyncio.to_thread(load_manifest, run_id)
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject"):
+            raise HTTPException(status_code=404, detail=f"运行清单不存在: {run_id}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+#按运行清单批量删除该次运行的中间产物，保留输入与交付物
+@app.delete("/runs/{run_id}/intermediates")
+async def cleanup_run_endpoint(run_id: str):
+    try:
+        return await asyncio.to_thread(cleanup_run, run_id)
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject"):
+            raise HTTPException(status_code=404, detail=f"运行清单不存在: {run_id}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+#工具模块加载情况（按需导入，未加载的工具耗时为null）
+@app.get("/tools/import_times")
+async def tool_import_times():
+    import_times = get_import_times()
+    return {
+        "loaded": {name: seconds for name, seconds in import_times.items() if seconds is not None},
+        "not_loaded": [name for name, seconds in import_times.items() if seconds is None],
+    }
+
+#远程工具HTTP连接复用统计
+@app.get("/tools/http_stats")
+async def tool_http_stats():
+    return get_http_stats()
+
+#远程工具服务熔断状态（open表示该端点暂不可用）
+@app.get("/tools/circuit_breakers")
+async def tool_circuit_breakers():
+    return get_breaker_states()
+
+#肽段-等位基因预测缓存统计（条目数、淘汰数、各工具命中率）
+@app.get("/tools/prediction_cache")
+async def tool_prediction_cache():
+    return get_prediction_cache_stats()
+
+#MinIO下载缓存命中统计
+@app.get("/tools/minio_cache")
+async def tool_minio_cache():
+    return get_download_cache_stats()
+
+#共享MinIO客户端的连接池配置及已确认存在的桶
+@app.get("/tools/minio_client")
+async def tool_minio_client():
+    return get_minio_client_stats()
+
+#MinIO读写耗时统计（按操作分组）及存储线程池占用
+@app.get("/tools/storage_stats")
+async def tool_storage_stats():
+    return get_storage_stats()
+
+#流水线中间产物后台写入统计（各阶段上传耗时、阻塞等待耗时及节省的耗时）
+@app.get("/tools/write_behind")
+async def tool_write_behind():
+    return get_write_behind_stats()
+
+#相同工具调用的合并统计
+@app.get("/tools/single_flight")
+async def tool_single_flight():
+    return get_single_flight_stats()
+
+#结果文件预签名下载链接的签发/拒绝统计
+@app.get("/tools/artifact_links")
+async def tool_artifact_links():
+    return get_artifact_link_stats()
+
+#运行清单写出及中间产物清理统计
+@app.get("/tools/run_manifest")
+async def tool_run_manifest():
+    return get_run_manifest_stats()
+
+#小文件内联传输统计（内联输入/结果的次数与字节数）
+@app.get("/tools/inline_payload")
+async def tool_inline_payload():
+    return get_inline_payload_stats()
+
+#CPU进程池统计（执行中的任务数，各类计算的次数与耗时）
+@app.get("/tools/cpu_pool")
+async def tool_cpu_pool():
+    return get_cpu_pool_stats()
+
+#候选去重统计（累计运行次数、候选数、唯一 (peptide, allele) 键数及去重比）
+@app.get("/tools/candidates")
+async def tool_candidates():
+    return get_candidate_dedup_stats()
@@ -0,0 +1,141 @@
+"""
+候选表内存基准：一百万个 (peptide, allele) 候选组合，对比字典列表、object列的DataFrame与紧凑的CandidateStore
+
+每种表示都从同样的打分CSV和来源映射CSV构建（各自持有解析出的字符串），包含三个阶段打分
+（BindLevel / BigMHC_EL / BigMHC_IM）及来源映射（蛋白、起始位置、长度、突变）。
+内存按tracemalloc统计的构建峰值与构建完成后的常驻量计，耗时在关闭tracemalloc时单独测量。
+
+用法:
+    python benchmarks/bench_candidate_memory.py [--pairs 1000000] [--alleles 6] [--occurrences 1.3]
+"""
+import argparse
+import csv
+import gc
+import io
+import random
+import sys
+import time
+import tracemalloc
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+from src.utils.candidate_store import CandidateStore
+
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+ALLELES = [
+    "HLA-A*02:01", "HLA-A*11:01", "HLA-A*24:02", "HLA-B*07:02", "HLA-B*40:01", "HLA-C*07:02",
+    "HLA-A*01:01", "HLA-A*03:01", "HLA-B*08:01", "HLA-B*15:01", "HLA-C*04:01", "HLA-C*06:02",
+]
+
+
+def make_candidates(pairs: int, alleles: int, occurrence_rate: float, seed: int = 0):
+    """随机生成唯一肽段、每个肽段的出现（重复序列按occurrence_rate多次出现）及各阶段打分，返回两份CSV文本"""
+    rng = random.Random(seed)
+    alleles = ALLELES[:alleles]
+    peptide_count = pairs // len(alleles)
+    peptides = list({
+        "".join(rng.choice(AMINO_ACIDS) for _ in range(rng.choice((8, 9, 10))))
+        for _ in range(peptide_count)
+    })
+    occurrences = []
+    for peptide in peptides:
+        for _ in range(1 + (rng.random() < occurrence_rate - 1)):
+            gene = rng.randrange(2000)
+            occurrences.append((f"GENE{gene}|p.G{gene % 999 + 1}D", rng.randrange(1, 2000), peptide))
+    provenance = pd.DataFrame(occurrences, columns=['protein', 'start', 'sequence'])
+    provenance['length'] = provenance['sequence'].str.len()
+    provenance['end'] = provenance['start'] + provenance['length'] - 1
+    provenance['mutation'] = provenance['protein'].str.rpartition("|")[2]
+
+    pair_peptides = [peptide for peptide in peptides for _ in alleles]
+    pair_alleles = [allele for _ in peptides for allele in alleles]
+    np_rng = np.random.default_rng(seed)
+    scores = pd.DataFrame({
+        'pep': pair_peptides,
+        'mhc': pair_alleles,
+        'BindLevel': np_rng.choice(["<= SB", "<= WB"], len(pair_peptides)),
+        'BigMHC_EL': np_rng.random(len(pair_peptides)),
+        'BigMHC_IM': np_rng.random(len(pair_peptides)),
+    })
+    return provenance.to_csv(index=False), scores.to_csv(index=False)
+
+
+def build_dicts(provenance_csv: str, scores_csv: str):
+    """原表示：每个候选一个字典，来源为每个肽段的字典列表"""
+    sources = {}
+    for row in csv.DictReader(io.StringIO(provenance_csv)):
+        sources.setdefault(row['sequence'], []).append({
+            'protein': row['protein'], 'start': int(row['start']), 'end': int(row['end']), 'mutation': row['mutation'],
+        })
+    return [
+        {
+            'peptide': row['pep'], 'allele': row['mhc'], 'BindLevel': row['BindLevel'],
+            'BigMHC_EL': float(row['BigMHC_EL']), 'BigMHC_IM': float(row['BigMHC_IM']),
+            'sources': sources.get(row['pep'], []),
+        }
+        for row in csv.DictReader(io.StringIO(scores_csv))
+    ]
+
+
+def _read_frames(provenance_csv: str, scores_csv: str):
+    provenance = pd.read_csv(io.StringIO(provenance_csv), dtype={'protein': object, 'sequence': object, 'mutation': object})
+    scores = pd.read_csv(io.StringIO(scores_csv), dtype={'pep': object, 'mhc': object, 'BindLevel': object})
+    return provenance, scores
+
+
+def build_frame(provenance_csv: str, scores_csv: str):
+    """原表示：object列的打分表与来源映射表"""
+    return _read_frames(provenance_csv, scores_csv)
+
+
+def build_store(provenance_csv: str, scores_csv: str):
+    provenance, scores = _read_frames(provenance_csv, scores_csv)
+    store = CandidateStore.from_occurrences(provenance)
+    store.add_scores(scores, "pep", "mhc", ["BindLevel", "BigMHC_EL", "BigMHC_IM"])
+    return store
+
+
+def measure(build, *args):
+    """返回 (结果, 构建峰值MB, 常驻MB, 耗时秒)"""
+    gc.collect()
+    started = time.perf_counter()
+    build(*args)
+    seconds = time.perf_counter() - started
+    gc.collect()
+    tracemalloc.start()
+    result = build(*args)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / 2**20, retained / 2**20, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=1_000_000, help="候选 (peptide, allele) 组合数")
+    parser.add_argument("--alleles", type=int, default=6)
+    parser.add_argument("--occurrences", type=float, default=1.3, help="每个肽段的平均出现次数（1~2）")
+    args = parser.parse_args()
+
+    provenance, scores = make_candidates(args.pairs, args.alleles, args.occurrences)
+    pairs = scores.count("\n") - 1
+    print(f"{pairs} pairs x {args.alleles} alleles, {provenance.count(chr(10)) - 1} occurrences")
+    print(f"{'representation':<18}{'peak MB':>10}{'retained MB':>13}{'bytes/pair':>12}{'build (s)':>11}")
+    for name, build in (("list of dicts", build_dicts), ("object DataFrame", build_frame), ("CandidateStore", build_store)):
+        result, peak, retained, seconds = measure(build, provenance, scores)
+        print(f"{name:<18}{peak:>10.1f}{retained:>13.1f}{retained * 2**20 / pairs:>12.1f}{seconds:>11.2f}")
+        if isinstance(result, CandidateStore):
+            started = time.perf_counter()
+            table = result.fan_out()
+            print(f"{'':<18}fan-out to {len(table)} rows in {time.perf_counter() - started:.2f} s, arrays {result.nbytes / 2**20:.1f} MB")
+        del result
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+切割肽段生成基准：numpy向量化的 cleavage_peptides 对比原先每个剪切位点一个线程池任务的实现
+
+用法:
+    python benchmarks/bench_cleavage.py [--sizes 1000 5000 10000 50000] [--site-rate 0.3] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "src"))
+from src.model.agents.tools.CleavagePeptide.cleavage_peptide import cleavage_peptides
+from src.utils.fasta import AMINO_ACIDS
+
+
+LENGTHS = [8, 9, 10]
+
+
+# ---- 原实现（向量化之前的代码，保留用于对比） ----
+
+def _process_single_site(s_start, full_sequence, cut_sites_set, lengths, max_pos):
+    peptides = []
+    for l in lengths:
+        e_pos = s_start + l
+        if e_pos > max_pos:
+            continue
+        if e_pos not in cut_sites_set:
+            continue
+        peptides.append({
+            'start': s_start + 1,
+            'end': e_pos,
+            'length': l,
+            'sequence': full_sequence[s_start:e_pos]
+        })
+    return peptides
+
+
+def legacy_cleavage_peptides(full_sequence, cut_sites, lengths=LENGTHS, max_workers=min(4, os.cpu_count() or 1)):
+    peptides = []
+    seen_sequences = set()
+    cut_sites_set = set(cut_sites)
+    max_pos = len(full_sequence)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_process_single_site, s_start, full_sequence, cut_sites_set, lengths, max_pos)
+            for s_start in cut_sites
+        ]
+        for future in as_completed(futures):
+            for p in future.result():
+                if p['sequence'] not in seen_sequences:
+                    seen_sequences.add(p['sequence'])
+                    peptides.append(p)
+    return peptides
+
+
+def make_protein(length: int, site_rate: float, seed: int):
+    rng = random.Random(seed)
+    sequence = "".join(rng.choice(AMINO_ACIDS) for _ in range(length))
+    cut_sites = [pos for pos in range(1, length + 1) if rng.random() < site_rate]
+    return sequence, cut_sites
+
+
+def best_of(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000, 50000])
+    parser.add_argument("--site-rate", type=float, default=0.3, help="位置为剪切位点(S)的比例")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"lengths {LENGTHS}, site rate {args.site_rate}, best of {args.repeat}")
+    print(f"{'residues':>10}{'sites':>8}{'peptides':>10}{'legacy (s)':>12}{'numpy (s)':>12}{'speedup':>10}")
+    for size in args.sizes:
+        sequence, cut_sites = make_protein(size, args.site_rate, seed=size)
+        proteins = {"protein": (sequence, np.asarray(cut_sites, dtype=np.int64))}
+
+        legacy = legacy_cleavage_peptides(sequence, cut_sites)
+        vectorized = cleavage_peptides(proteins, LENGTHS)
+        # 原实现按完成顺序去重，顺序不确定；比较去重后的肽段集合
+        assert {p['sequence'] for p in legacy} == set(vectorized['sequence'])
+        assert len(legacy) == len(vectorized)
+
+        legacy_time = best_of(lambda: legacy_cleavage_peptides(sequence, cut_sites), args.repeat)
+        numpy_time = best_of(lambda: cleavage_peptides(proteins, LENGTHS), args.repeat)
+        print(
+            f"{size:>10}{len(cut_sites):>8}{len(vectorized):>10}"
+            f"{legacy_time:>12.4f}{numpy_time:>12.4f}{legacy_time / numpy_time:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
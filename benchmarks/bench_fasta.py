@@ -0,0 +1,180 @@
+"""
+FASTA解析微基准：共享的流式解析器 src.utils.fasta 对比各工具原先的逐行解析实现
+
+用法:
+    python benchmarks/bench_fasta.py [--records 200000] [--length 30] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+from src.utils.fasta import AMINO_ACIDS, fasta_hla_alleles, iter_fasta, iter_fasta_sequences
+
+
+HLA_ALLELES = ["A*02:01", "A*11:01", "A*24:02", "B*07:02", "B*40:01", "C*07:02"]
+
+
+def make_fasta(records: int, length: int, line_width: int = 60) -> str:
+    rng = random.Random(0)
+    lines = []
+    for _ in range(records):
+        peptide = "".join(rng.choice(AMINO_ACIDS) for _ in range(length))
+        lines.append(f">{peptide[:9]}|{rng.choice(HLA_ALLELES)}")
+        lines.extend(peptide[i:i + line_width] for i in range(0, len(peptide), line_width))
+    return "\n".join(lines) + "\n"
+
+
+# ---- 原实现（各工具迁移前的代码，保留用于对比） ----
+
+def legacy_sequences(text: str):
+    # bigmhc.parse_fasta / cds_combine / utr_spacer_rnafold
+    peptides, current = [], []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith(">"):
+            if current:
+                peptides.append("".join(current))
+                current = []
+        else:
+            current.append(line)
+    if current:
+        peptides.append("".join(current))
+    return peptides
+
+
+def legacy_sequences_concat(text: str):
+    # pMTnet / piste.extract_antigen_sequences（字符串累加）
+    sequences, current_seq = [], ""
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith(">"):
+            if current_seq:
+                sequences.append(current_seq)
+                current_seq = ""
+        else:
+            current_seq += line
+    if current_seq:
+        sequences.append(current_seq)
+    return sequences
+
+
+def legacy_hla(text: str):
+    # step3 extract_hla_and_peptides_from_fasta
+    hla_list = []
+    hla_regex = re.compile(r"^(HLA-)?[ABC]\*\d{2}:\d{2}$")
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith(">") and "|" in line:
+            parts = line[1:].split("|", 1)
+            if len(parts) == 2 and hla_regex.fullmatch(parts[1].strip()):
+                hla = parts[1].strip()
+                if not hla.startswith("HLA-"):
+                    hla = "HLA-" + hla
+                if hla not in hla_list:
+                    hla_list.append(hla)
+    return hla_list
+
+
+def legacy_records(text: str):
+    # prediction_cache.read_fasta_records
+    records = []
+    header, seq = None, []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith(">"):
+            if header is not None:
+                records.append((header, "".join(seq)))
+            header, seq = line[1:].strip(), []
+        else:
+            seq.append(line)
+    if header is not None:
+        records.append((header, "".join(seq)))
+    return records
+
+
+def legacy_file(path: str):
+    with open(path, "r") as f:
+        return legacy_sequences(f.read())
+
+
+# ---- 新实现 ----
+
+def shared_sequences(text: str):
+    return list(iter_fasta_sequences(text))
+
+
+def shared_validated(text: str):
+    return list(iter_fasta_sequences(text, validate=True))
+
+
+def shared_records(text: str):
+    return list(iter_fasta(text))
+
+
+def shared_hla(text: str):
+    return fasta_hla_alleles(iter_fasta(text))
+
+
+def shared_file(path: str):
+    with open(path, "rb") as f:
+        return list(iter_fasta_sequences(f))
+
+
+def best_of(func, arg, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--length", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = make_fasta(args.records, args.length)
+    assert legacy_sequences(text) == legacy_sequences_concat(text) == shared_sequences(text) == shared_validated(text)
+    assert legacy_records(text) == shared_records(text)
+    assert legacy_hla(text) == shared_hla(text)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".fasta", delete=False) as f:
+        f.write(text)
+        path = f.name
+    try:
+        assert legacy_file(path) == shared_file(path)
+        cases = [
+            ("sequences", legacy_sequences, shared_sequences, text),
+            ("sequences (str +=)", legacy_sequences_concat, shared_sequences, text),
+            ("sequences + validate", legacy_sequences, shared_validated, text),
+            ("records", legacy_records, shared_records, text),
+            ("hla headers", legacy_hla, shared_hla, text),
+            ("local file", legacy_file, shared_file, path),
+        ]
+        print(f"{args.records} records x {args.length} aa, {len(text) / 1024 / 1024:.1f} MiB, best of {args.repeat}")
+        print(f"{'case':<22}{'legacy (s)':>12}{'shared (s)':>12}{'speedup':>10}")
+        for name, legacy, shared, arg in cases:
+            legacy_time = best_of(legacy, arg, args.repeat)
+            shared_time = best_of(shared, arg, args.repeat)
+            print(f"{name:<22}{legacy_time:>12.4f}{shared_time:>12.4f}{legacy_time / shared_time:>9.2f}x")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+步骤1（蛋白切割）端到端基准：NetChop文本直接解析为剪切位点数组，对比原先
+文本 -> Excel（工具服务save_excel） -> pd.read_excel逐行解析 -> 构建序列 的路径
+
+两条路径之后的肽段生成相同（src.utils.cleavage），统计中单独列出，便于看出省去的转换耗时。
+
+用法:
+    python benchmarks/bench_netchop_step1.py [--proteins 10 100 500] [--length 500] [--site-rate 0.3] [--repeat 3]
+"""
+import argparse
+import io
+import random
+import re
+import sys
+import time
+
+from collections import defaultdict
+from itertools import chain
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+from src.utils.cleavage import make_shards, merge_peptides, parse_netchop_text, shard_peptides
+from src.utils.fasta import AMINO_ACIDS
+from src.utils.xlsx_export import SummaryRow, write_xlsx
+
+
+LENGTHS = [8, 9, 10]
+RULE = "-" * 60
+
+
+def make_netchop_output(proteins: int, length: int, site_rate: float) -> str:
+    rng = random.Random(0)
+    lines = ["NetChop 3.1 predictions using version C-term. Threshold 0.500000", "", RULE,
+             " pos  AA  C      score      Ident", RULE]
+    for index in range(proteins):
+        ident = f"gi|{1000000 + index}|"
+        sites = 0
+        for pos in range(1, length + 1):
+            score = rng.random()
+            is_site = score < site_rate
+            sites += is_site
+            lines.append(f"{pos:5d}   {rng.choice(AMINO_ACIDS)}  {'S' if is_site else '.'}   {score:.6f} {ident}")
+        lines += [RULE, "", f"Number of cleavage sites {sites}. Number of amino acids {length}. Protein name {ident}", RULE]
+    return "\n".join(lines) + "\n"
+
+
+# ---- 原路径（工具服务的Excel转换与切割工具的Excel解析，保留用于对比） ----
+
+TABLE_PATTERN = re.compile(r"\s*(\d+)\s+([A-Z])\s+([^\s])\s+([\d.]+)\s+([^\s]+)")
+SUMMARY_PATTERN = re.compile(r"Number of cleavage\s+[^\s]+.*")
+COLUMNS = ["Pos", "AA", "C", "score", "Ident"]
+
+
+def legacy_to_excel(output: str) -> bytes:
+    rows = (match.groups() for match in TABLE_PATTERN.finditer(output))
+    summary_match = SUMMARY_PATTERN.search(output)
+    if summary_match:
+        rows = chain(rows, [SummaryRow(summary_match[0])])
+    buffer = io.BytesIO()
+    write_xlsx(buffer, COLUMNS, rows)
+    return buffer.getvalue()
+
+
+def legacy_parse_excel(data: bytes):
+    df = pd.read_excel(io.BytesIO(data), sheet_name=0, header=0)
+    df.columns = df.columns.str.strip().str.capitalize()
+    positions = {}
+    for pos, aa, c, ident in zip(df['Pos'], df['Aa'], df['C'], df['Ident']):
+        try:
+            ident = '' if pd.isna(ident) else str(ident).strip()
+            positions[(ident, int(pos))] = (str(aa).strip(), str(c).strip())
+        except (ValueError, TypeError):
+            continue
+    return positions
+
+
+def legacy_build_proteins(positions):
+    residues = defaultdict(dict)
+    for (protein, pos), (aa, c) in positions.items():
+        residues[protein][pos] = (aa, c)
+    proteins = {}
+    for protein, protein_positions in residues.items():
+        sequence = [''] * max(protein_positions)
+        for pos, (aa, _) in protein_positions.items():
+            sequence[pos - 1] = aa
+        cut_sites = np.fromiter((pos for pos, (_, c) in protein_positions.items() if c == 'S'), dtype=np.int64)
+        proteins[protein] = (''.join(sequence), np.sort(cut_sites))
+    return proteins
+
+
+def cleave(proteins):
+    return merge_peptides([shard_peptides(shard, LENGTHS) for shard in make_shards(proteins)], proteins)
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def best_of(stages, repeat: int):
+    """stages: [(名称, 函数)]，前一阶段的结果作为后一阶段的输入；返回每阶段的最短耗时"""
+    best = {}
+    for _ in range(repeat):
+        value = None
+        for name, func in stages:
+            value, seconds = timed(func, value)
+            best[name] = min(best.get(name, float("inf")), seconds)
+    return best, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proteins", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--length", type=int, default=500, help="每条蛋白的残基数")
+    parser.add_argument("--site-rate", type=float, default=0.3, help="位置为剪切位点(S)的比例")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.length} aa per protein, site rate {args.site_rate}, lengths {LENGTHS}, best of {args.repeat}")
+    print(
+        f"{'proteins':>9}{'txt KiB':>9}{'xlsx KiB':>10}{'to excel':>10}{'read xlsx':>11}"
+        f"{'text parse':>12}{'cleavage':>10}{'legacy (s)':>12}{'direct (s)':>12}{'saved':>8}"
+    )
+    for proteins in args.proteins:
+        text = make_netchop_output(proteins, args.length, args.site_rate)
+        legacy_stages = [
+            ("to_excel", lambda _: legacy_to_excel(text)),
+            ("read_excel", lambda data: legacy_build_proteins(legacy_parse_excel(data))),
+            ("cleavage", cleave),
+        ]
+        direct_stages = [
+            ("parse_text", lambda _: parse_netchop_text(text.encode())),
+            ("cleavage", cleave),
+        ]
+        legacy, legacy_peptides = best_of(legacy_stages, args.repeat)
+        direct, direct_peptides = best_of(direct_stages, args.repeat)
+        assert legacy_peptides.equals(direct_peptides)
+
+        xlsx_size = len(legacy_to_excel(text))
+        legacy_total = sum(legacy.values())
+        direct_total = sum(direct.values())
+        print(
+            f"{proteins:>9}{len(text) / 1024:>9.0f}{xlsx_size / 1024:>10.0f}{legacy['to_excel']:>10.3f}"
+            f"{legacy['read_excel']:>11.3f}{direct['parse_text']:>12.3f}{direct['cleavage']:>10.3f}"
+            f"{legacy_total:>12.3f}{direct_total:>12.3f}{legacy_total / direct_total:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import weakref
+
+from langchain_core.messages import AIMessage, ToolMessage
+from typing import Any, Dict, List, Optional
+
+from config import CONFIG_YAML
+from src.model.agents.tools.registry import ToolSpec
+from src.utils.log import logger
+
+EXECUTOR_CONFIG = CONFIG_YAML.get("TOOL_EXECUTOR", {})
+EXECUTOR_MODE = EXECUTOR_CONFIG.get("mode", "concurrent")
+DEFAULT_CONCURRENCY = EXECUTOR_CONFIG.get("default_concurrency", 4)
+TOOL_CONCURRENCY = EXECUTOR_CONFIG.get("concurrency", {}) or {}
+
+
+# 每个事件循环各自一组信号量，避免跨事件循环复用asyncio原语
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+
+def _get_semaphore(tool_name: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    loop_semaphores = _semaphores.setdefault(loop, {})
+    if tool_name not in loop_semaphores:
+        limit = TOOL_CONCURRENCY.get(tool_name, DEFAULT_CONCURRENCY)
+        loop_semaphores[tool_name] = asyncio.Semaphore(max(1, int(limit)))
+    return loop_semaphores[tool_name]
+
+
+async def _invoke_tool(tool_name: str, spec: ToolSpec, call_args: Dict[str, Any]) -> str:
+    async with _get_semaphore(tool_name):
+        func_result = await spec.tool.ainvoke(spec.build_args(call_args))
+    logger.info(f"{tool_name} result: {func_result}")
+    return func_result
+
+
+def _error_result(tool_name: str, error: Exception) -> str:
+    """工具调用异常转为与各工具失败时相同格式的结果"""
+    return json.dumps({
+        "type": "text",
+        "content": f"调用 {tool_name} 失败: {type(error).__name__} - {str(error)}"
+    }, ensure_ascii=False)
+
+
+async def execute_tool_calls(
+    messages: List[Any],
+    tool_specs: Dict[str, ToolSpec],
+    mode: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    执行最后一条AIMessage中的所有工具调用
+
+    concurrent模式下各工具调用通过asyncio.gather并发执行（同名工具受TOOL_EXECUTOR.concurrency限流），
+    sequential模式下按顺序逐个执行。两种模式下ToolMessage均按tool_call顺序输出，
+    抛出异常的工具调用输出一条错误ToolMessage，其结果字段保持为空字符串。
+
+    Args:
+        messages: 当前state中的消息列表
+        tool_specs: 工具名到ToolSpec的映射
+        mode: "concurrent" 或 "sequential"，默认读取配置TOOL_EXECUTOR.mode
+
+    Returns:
+        dict: {"messages": [...ToolMessage], "<state_key>": 结果, ...}，未调用的工具结果字段置为空字符串
+    """
+    mode = mode or EXECUTOR_MODE
+    update: Dict[str, Any] = {
+        spec.state_key: "" for spec in tool_specs.values() if spec.state_key
+    }
+    last_message = messages[-1] if messages else None
+    if not (isinstance(last_message, AIMessage) and last_message.tool_calls):
+        update["messages"] = []
+        return update
+
+    answered_ids = {msg.tool_call_id for msg in messages if isinstance(msg, ToolMessage)}
+    pending = []
+    for tool_call in last_message.tool_calls:
+        # 检查是否已经存在相同 tool_call_id 的 ToolMessage
+        if tool_call["id"] in answered_ids:
+            continue
+        if tool_call["name"] not in tool_specs:
+            logger.warning(f"Unknown tool call skipped: {tool_call['name']}")
+            continue
+        pending.append(tool_call)
+
+    if mode == "sequential":
+        results = []
+        for tool_call in pending:
+            try:
+                results.append(await _invoke_tool(tool_call["name"], tool_specs[tool_call["name"]], tool_call["args"]))
+            except Exception as e:
+                results.append(e)
+    else:
+        # 单个工具抛出异常不影响同一批次中其他工具的结果
+        results = await asyncio.gather(*(
+            _invoke_tool(tool_call["name"], tool_specs[tool_call["name"]], tool_call["args"])
+            for tool_call in pending
+        ), return_exceptions=True)
+
+    tool_messages = []
+    for tool_call, func_result in zip(pending, results):
+        spec = tool_specs[tool_call["name"]]
+        if isinstance(func_result, BaseException):
+            if not isinstance(func_result, Exception):
+                raise func_result
+            logger.error(f"{tool_call['name']} failed: {type(func_result).__name__} - {func_result}")
+            func_result = _error_result(tool_call["name"], func_result)
+        elif spec.state_key:
+            update[spec.state_key] = func_result
+        tool_messages.append(ToolMessage(content=func_result, tool_call_id=tool_call["id"]))
+
+    update["messages"] = tool_messages
+    return update
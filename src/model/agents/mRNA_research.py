@@ -5,37 +5,13 @@ from langchain_core.messages import AIMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig, RunnableLambda, RunnableSerializable
 from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.graph import END, MessagesState, StateGraph
-from langchain_core.messages import SystemMessage, AIMessage, ToolMessage
+from langchain_core.messages import SystemMessage, AIMessage
 from typing import Literal,Optional
 
-from src.model.agents.tools import (
-    mRNAResearchAndProduction,
-    NetMHCpan,
-    ESM3,
-    NetMHCstabpan,
-    FastaFileProcessor,
-    ExtractPeptides,
-    pMTnet,
-    NetChop,
-    Prime,
-    NetTCR,
-    NetCTLpan,
-    PISTE,
-    ImmuneApp,
-    BigMHC_EL, 
-    BigMHC_IM,
-    TransPHLA_AOMP,
-    ImmuneApp_Neo,
-    UniPMT,
-    NetChop_Cleavage,
-    LinearDesign,
-    RNAFold,
-    RNAPlot,
-    NeoantigenSelectionIntroduce
-)
-from src.utils.log import logger
+from src.model.agents.tools import get_tools, get_tool_specs
 
 from .core import get_model  # 相对导入
+from .core.tool_executor import execute_tool_calls
 from .core.prompts import (
     MRNA_AGENT_PROMPT,
     FILE_LIST,
@@ -86,30 +62,30 @@ class AgentState(MessagesState, total=False):
     rnafold_result: Optional[str]=None
     rnaplot_result: Optional[str]=None
 
-TOOLS = [
-    mRNAResearchAndProduction,
-    NetMHCpan,
-    ESM3,
-    FastaFileProcessor,
-    NetMHCstabpan,
-    ExtractPeptides,
-    pMTnet,
-    NetCTLpan,
-    PISTE,
-    ImmuneApp,
-    NetChop, 
-    Prime, 
-    NetTCR,
-    BigMHC_EL,
-    BigMHC_IM,
-    TransPHLA_AOMP,
-    ImmuneApp_Neo,
-    UniPMT,
-    NetChop_Cleavage,
-    LinearDesign,
-    RNAFold,
-    RNAPlot,
-    NeoantigenSelectionIntroduce,
+TOOL_NAMES = [
+    "mRNAResearchAndProduction",
+    "NetMHCpan",
+    "ESM3",
+    "FastaFileProcessor",
+    "NetMHCstabpan",
+    "ExtractPeptides",
+    "pMTnet",
+    "NetCTLpan",
+    "PISTE",
+    "ImmuneApp",
+    "NetChop",
+    "Prime",
+    "NetTCR",
+    "BigMHC_EL",
+    "BigMHC_IM",
+    "TransPHLA_AOMP",
+    "ImmuneApp_Neo",
+    "UniPMT",
+    "NetChop_Cleavage",
+    "LinearDesign",
+    "RNAFold",
+    "RNAPlot",
+    "NeoantigenSelectionIntroduce",
 ]
     
 TOOL_TEMPLATES = {
@@ -134,8 +110,11 @@ TOOL_TEMPLATES = {
     "rnaplot_result": RNAPLOT_RESULT
 }
 
+# 工具模块在首次bind/调用时才导入
+TOOL_SPECS = get_tool_specs(TOOL_NAMES)
+
 def wrap_model(model: BaseChatModel, file_instructions: str) -> RunnableSerializable[AgentState, AIMessage]:
-    model = model.bind_tools(TOOLS)
+    model = model.bind_tools(get_tools(TOOL_NAMES))
     #导入prompt
     preprocessor = RunnableLambda(
         lambda state: [SystemMessage(content=file_instructions)] + state["messages"],
@@ -182,456 +161,7 @@ async def modelNode(state: AgentState, config: RunnableConfig) -> AgentState:
     return {"messages": [response]}
 
 async def should_continue(state: AgentState, config: RunnableConfig):
-    messages = state["messages"]
-    last_message = messages[-1]
-    tmp_tool_msg = []
-    netmhcpan_result=""
-    esm3_result=""
-    netmhcstabpan_result=""
-    pmtnet_result=""
-    netchop_result=""
-    prime_result=""
-    nettcr_result=""
-    netctlpan_result=""
-    piste_result=""
-    immuneapp_result=""
-    bigmhc_el_result=""
-    bigmhc_im_result=""
-    transphla_aomp_result=""
-    immuneapp_neo_result=""
-    unipmt_result=""
-    netchop_cleavage_result=""
-    lineardesign_result=""
-    rnafold_result=""
-    rnaplot_result=""
-    if isinstance(last_message, AIMessage) and last_message.tool_calls:
-        # 处理所有工具调用
-        for tool_call in last_message.tool_calls:
-            tool_name = tool_call["name"]
-            tool_call_id = tool_call["id"]
-            
-
-            # 检查是否已经存在相同 tool_call_id 的 ToolMessage
-            if any(isinstance(msg, ToolMessage) and msg.tool_call_id == tool_call_id for msg in messages):
-                continue  # 如果已经存在，跳过添加
-            if tool_name == "NetMHCpan":
-                input_file = tool_call["args"].get("input_file")
-                mhc_allele=tool_call["args"].get("mhc_allele","HLA-A02:01")
-                high_threshold_of_bp=tool_call["args"].get("high_threshold_of_bp",0.5)
-                low_threshold_of_bp=tool_call["args"].get("low_threshold_of_bp",2.0)
-                peptide_length=tool_call["args"].get("peptide_length","9")
-                func_result = await NetMHCpan.ainvoke(
-                    {
-                        "input_file": input_file,
-                        "mhc_allele": mhc_allele,
-                        "high_threshold_of_bp": high_threshold_of_bp,
-                        "low_threshold_of_bp": low_threshold_of_bp,
-                        "peptide_length":peptide_length
-                    }
-                )
-                netmhcpan_result=func_result
-
-                logger.info(f"NetMHCpan result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-
-            elif tool_name == "FastaFileProcessor":
-                input_file=tool_call["args"].get("input_file")
-                func_result = await FastaFileProcessor.ainvoke(
-                    {
-                        "input_file": input_file
-                    }
-                )
-                logger.info(f"FastaFileProcessor result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)            
-            elif tool_name == "ExtractPeptides":
-                input_content = tool_call["args"].get("peptide_list")
-                func_result = await ExtractPeptides.ainvoke(
-                    {
-                        "peptide_list": input_content
-                    }
-                )
-                logger.info(f"ExtractPeptides result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-
-            elif tool_name == "mRNAResearchAndProduction":
-                func_result = await mRNAResearchAndProduction.ainvoke(
-                    {
-                        "input": "mRNA疫苗的研究生产过程"
-                    }
-                )
-                logger.info(f"Neoantigen result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-            elif tool_name == "pMTnet":
-                cdr3_list = tool_call["args"].get("cdr3_list")
-                input_file = tool_call["args"].get("input_file")
-                mhc_alleles = tool_call["args"].get("mhc_alleles")
-                func_result = await pMTnet.ainvoke(
-                    {
-                        "cdr3_list": cdr3_list,
-                        "input_file": input_file,
-                        "mhc_alleles": mhc_alleles,
-                    }
-                )
-                logger.info(f"pMTnet result: {func_result}")
-                pmtnet_result=func_result
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-                
-            elif tool_name == "PISTE":
-                cdr3_list = tool_call["args"].get("cdr3_list")
-                input_file = tool_call["args"].get("input_file")
-                mhc_alleles = tool_call["args"].get("mhc_alleles")
-                model_name = tool_call["args"].get("model_name","random")
-                threshold = tool_call["args"].get("threshold", 0.5)
-                antigen_type = tool_call["args"].get("antigen_type","MT")
-                func_result = await PISTE.ainvoke(
-                    {
-                        "cdr3_list": cdr3_list,
-                        "input_file": input_file,
-                        "mhc_alleles": mhc_alleles,
-                        "model_name": model_name,
-                        "threshold": threshold,
-                        "antigen_type": antigen_type
-                    }
-                )
-                logger.info(f"piste result: {func_result}")
-                piste_result=func_result
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-
-            elif tool_name == "ESM3":
-                tool_call_esm3_input=tool_call["args"].get("protein_sequence")
-                func_result = await ESM3.ainvoke(
-                    {
-                        "protein_sequence" : tool_call_esm3_input
-                    }
-                )
-                logger.info(f"ESM3 result: {func_result}")
-                esm3_result=func_result
-
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-
-            elif tool_name == "NetMHCstabpan":
-                input_file = tool_call["args"].get("input_file")
-                mhc_allele=tool_call["args"].get("mhc_allele","HLA-A02:01")
-                high_threshold_of_bp=tool_call["args"].get("high_threshold_of_bp",0.5)
-                low_threshold_of_bp=tool_call["args"].get("low_threshold_of_bp",2.0)
-                peptide_length=tool_call["args"].get("peptide_length","9")
-                func_result = await NetMHCstabpan.ainvoke(
-                    {
-                        "input_file": input_file,
-                        "mhc_allele": mhc_allele,
-                        "high_threshold_of_bp": high_threshold_of_bp,
-                        "low_threshold_of_bp": low_threshold_of_bp,
-                        "peptide_length":peptide_length
-                    }
-                )
-                netmhcstabpan_result=func_result
-
-                logger.info(f"NetMHCstabpan result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-
-            elif tool_name == "NetChop":
-                input_file = tool_call["args"].get("input_file")
-                cleavage_site_threshold=tool_call["args"].get("cleavage_site_threshold",0.5)
-                func_result = await NetChop.ainvoke(
-                    {
-                        "input_file": input_file,
-                        "cleavage_site_threshold": cleavage_site_threshold,
-                    }
-                )
-                netchop_result=func_result
-
-                logger.info(f"NetChop result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)         
-            elif tool_name == "Prime":
-                input_file = tool_call["args"].get("input_file")
-                mhc_alleles=tool_call["args"].get("mhc_alleles",None)
-                func_result = await Prime.ainvoke(
-                    {
-                        "input_file": input_file,
-                        "mhc_alleles": mhc_alleles,
-                    }
-                )
-                prime_result=func_result
-
-                logger.info(f"Prime result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=prime_result,
-                    tool_call_id=tool_call_id,
-                )                
-                tmp_tool_msg.append(tool_msg)                 
-                
-            elif tool_name == "NetCTLpan":
-                input_file = tool_call["args"].get("input_file")
-                mhc_allele=tool_call["args"].get("mhc_allele","HLA-A02:01")
-                weight_of_clevage=tool_call["args"].get("weight_of_clevage",0.225)
-                weight_of_tap=tool_call["args"].get("weight_of_tap",0.025)
-                peptide_length=tool_call["args"].get("peptide_length","9")
-                func_result = await NetCTLpan.ainvoke(
-                    {
-                        "input_file": input_file,
-                        "mhc_allele": mhc_allele,
-                        "weight_of_clevage": weight_of_clevage,
-                        "weight_of_tap": weight_of_tap,
-                        "peptide_length":peptide_length
-                    }
-                )
-                netctlpan_result=func_result
-                logger.info(f"NetCTLpan result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)       
-            elif tool_name == "NetTCR":
-                input_file = tool_call["args"].get("input_file")
-                func_result = await NetTCR.ainvoke(
-                    {
-                        "input_file": input_file,
-                    }
-                )
-                nettcr_result=func_result
-
-                logger.info(f"NetTCR result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=nettcr_result,
-                    tool_call_id=tool_call_id,
-                )                        
-                tmp_tool_msg.append(tool_msg)
-
-            elif tool_name == "ImmuneApp":
-                input_file_dir = tool_call["args"].get("input_file_dir")
-                alleles=tool_call["args"].get("alleles",["HLA-A*01:01", "HLA-A*02:01", "HLA-A*03:01", "HLA-B*07:02"])
-                use_binding_score=tool_call["args"].get("use_binding_score",True)
-                peptide_lengths=tool_call["args"].get("peptide_lengths",[8,9])
-                func_result = await ImmuneApp.ainvoke(
-                    {
-                        "input_file_dir": input_file_dir,
-                        "alleles": alleles,
-                        "use_binding_score": use_binding_score,
-                        "peptide_lengths": peptide_lengths,
-                    }
-                )
-                immuneapp_result=func_result
-                logger.info(f"ImmuneApp result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-            elif tool_name == "ImmuneApp_Neo":
-                input_file = tool_call["args"].get("input_file")
-                alleles=tool_call["args"].get("alleles",["HLA-A*01:01", "HLA-A*02:01", "HLA-A*03:01", "HLA-B*07:02"])
-                func_result = await ImmuneApp_Neo.ainvoke(
-                    {
-                        "input_file": input_file,
-                        "alleles": alleles,
-                    }
-                )
-                immuneapp_neo_result=func_result
-                logger.info(f"ImmuneApp_Neo result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=immuneapp_neo_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-            elif tool_name == "BigMHC_EL":
-                input_file = tool_call["args"].get("input_file")
-                mhc_alleles = tool_call["args"].get("mhc_alleles")
-                func_result = await BigMHC_EL.ainvoke(
-                    {
-                    "input_file":input_file,
-                    "mhc_alleles":mhc_alleles,
-                    }
-                )
-                logger.info(f"BigMHC_EL result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-            elif tool_name == "BigMHC_IM":
-                input_file = tool_call["args"].get("input_file")
-                mhc_alleles = tool_call["args"].get("mhc_alleles",None)
-                func_result = await BigMHC_IM.ainvoke(
-                    {
-                    "input_file":input_file,
-                    "mhc_alleles":mhc_alleles,
-                    }
-                )
-                logger.info(f"BigMHC_IM result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-
-            elif tool_name == "TransPHLA_AOMP":
-                peptide_file = tool_call["args"].get("peptide_file")
-                alleles = tool_call["args"].get("alleles")
-                threshold = tool_call["args"].get("threshold", 0.5)
-                cut_length = tool_call["args"].get("cut_length", 10)
-                cut_peptide = tool_call["args"].get("cut_peptide", True)
-                func_result = await TransPHLA_AOMP.ainvoke(
-                    {
-                        "peptide_file": peptide_file,
-                        "alleles": alleles,
-                        "threshold": threshold,
-                        "cut_length": cut_length,
-                        "cut_peptide": cut_peptide
-                    }
-                )
-                transphla_aomp_result=func_result
-                logger.info(f"TransPHLA_AOMP result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=transphla_aomp_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-            elif tool_name == "UniPMT":
-                input_file = tool_call["args"].get("input_file")
-                func_result = await UniPMT.ainvoke(
-                    {
-                        "input_file": input_file,
-                    }
-                )
-                unipmt_result=func_result
-                logger.info(f"UniPMT result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=unipmt_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-            elif tool_name == "NetChop_Cleavage":
-                input_file = tool_call["args"].get("input_file")
-                lengths=tool_call["args"].get("lengths",[8,9,10])
-                output_format=tool_call["args"].get("output_format","fasta")
-                func_result = await NetChop_Cleavage.ainvoke(
-                    {
-                        "input_file": input_file,
-                        "lengths": lengths,
-                        "output_format": output_format
-                    }
-                )
-                netchop_cleavage_result=func_result
-                logger.info(f"NetChop_Cleavage result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=netchop_cleavage_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-            elif tool_name == "LinearDesign":
-                minio_input_fasta = tool_call["args"].get("minio_input_fasta")
-                lambda_val = tool_call["args"].get("lambda_val", 1.0)
-                func_result = await LinearDesign.ainvoke(
-                    {
-                        "minio_input_fasta": minio_input_fasta,
-                        "lambda_val": lambda_val
-                    }
-                )
-                lineardesign_result=func_result
-                logger.info(f"LinearDesign result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=lineardesign_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-
-            elif tool_name == "RNAFold":
-                input_file = tool_call["args"].get("input_file")
-                func_result = await RNAFold.ainvoke(
-                    {
-                        "input_file": input_file,
-                    }
-                )
-                rnafold_result=func_result
-                logger.info(f"RNAFold result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=rnafold_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-            elif tool_name == "RNAPlot":
-                input_file = tool_call["args"].get("input_file")
-                func_result = await RNAPlot.ainvoke(
-                    {
-                        "input_file": input_file,
-                    }
-                )
-                rnaplot_result=func_result
-                logger.info(f"RNAPlot result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=rnaplot_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-            elif tool_name == "NeoantigenSelectionIntroduce":
-                func_result = await NeoantigenSelectionIntroduce.ainvoke({})
-                neoantigenselectionintroduce_result=func_result
-                logger.info(f"RNAPlot result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=neoantigenselectionintroduce_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-
-    return {
-        "messages": tmp_tool_msg,
-        "netmhcpan_result":netmhcpan_result,
-        "esm3_result":esm3_result,
-        "netmhcstabpan_result":netmhcstabpan_result,
-        "pmtnet_result":pmtnet_result,
-        "netchop_result":netchop_result,
-        "prime_result":prime_result,
-        "nettcr_result":nettcr_result,
-        "piste_result": piste_result,
-        "netctlpan_result":netctlpan_result,
-        "immuneapp_result": immuneapp_result,
-        "bigmhc_el_result": bigmhc_el_result,
-        "bigmhc_im_result": bigmhc_im_result,
-        "transphla_aomp_result": transphla_aomp_result,
-        "immuneapp_neo_result": immuneapp_neo_result,
-        "unipmt_result": unipmt_result,
-        "netchop_cleavage_result": netchop_cleavage_result,
-        "lineardesign_result": lineardesign_result,
-        "rnafold_result": rnafold_result,
-        "rnaplot_result": rnaplot_result,
-        }
+    return await execute_tool_calls(state["messages"], TOOL_SPECS)
 
 
 # Define the graph
@@ -14,9 +14,8 @@ from typing import Literal, Any,Optional
 
 from config import CONFIG_YAML
 
-from src.model.agents.tools import (
-    NeoAntigenSelection
-)
+from src.model.agents.tools import get_tool
+from src.utils.artifact_links import deliverable_uri
 from src.utils.log import logger
 from src.utils.pdf_generator import neo_md2pdf
 
@@ -152,7 +151,7 @@ async def antigenDesignNode(state: AgentState, config: RunnableConfig):
 
     logger.info(f"mRNADesignNode args: fsa filename: {input_fsa_filepath}, mhc_allele: {mhc_allele}, cdr3: {cdr3}")
     # 1. 通过state参数构建NeoAntigenResearch工具输入参数
-    mrna_design_process_result= await NeoAntigenSelection.ainvoke(
+    mrna_design_process_result= await get_tool("NeoAntigenSelection").ainvoke(
         {
             "input_file": input_fsa_filepath,
             "mhc_allele": [mhc_allele],
@@ -207,10 +206,10 @@ async def PatientCaseReportNode(state: AgentState, config: RunnableConfig):
     writer("\n#### 📝 正在进行结果报告生成\n")
     pdf_minio_path = neo_md2pdf(response.content)
     #pdf_download_url = DOWNLOADER_URL_PREFIX + pdf_minio_path
-    pdf_download_url = pdf_minio_path
     writer("\n🏥 已完成mRNA个体化疫苗设计结果报告生成，📥 请下载: ")
     writer("#NEO_RESPONSE#")
     fdtime = datetime.now().strftime('%Y-%m-%d')
+    pdf_download_url = deliverable_uri(pdf_minio_path)
     writer(f"[mRNA疫苗设计报告-张先生-{fdtime}]({pdf_download_url})")
     writer("#NEO_RESPONSE#")
     return Command(
@@ -5,17 +5,13 @@ from langchain_core.messages import AIMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig, RunnableLambda, RunnableSerializable
 from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.graph import END, MessagesState, StateGraph
-from langchain_core.messages import SystemMessage, AIMessage, ToolMessage
+from langchain_core.messages import SystemMessage, AIMessage
 from typing import Literal,Optional
 
-from src.model.agents.tools import mRNAResearchAndProduction
-from src.model.agents.tools import NetMHCpan
-from src.model.agents.tools import ESM3
-from src.model.agents.tools import NetMHCstabpan
-from src.model.agents.tools import FastaFileProcessor
-from src.utils.log import logger
+from src.model.agents.tools import get_tools, get_tool_specs
 
 from .core import get_model  # 相对导入
+from .core.tool_executor import execute_tool_calls
 from .core.pMHC_affinity_prediction_prompts import MRNA_AGENT_PROMPT, FILE_LIST, NETMHCPAN_RESULT, ESM3_RESULT, NETMHCSTABPAN_RESULT, OUTPUT_INSTRUCTIONS
 
 
@@ -27,11 +23,13 @@ class AgentState(MessagesState, total=False):
     esm3_result: Optional[str]=None
     netmhcstabpan_result: Optional[str]=None
 
-TOOLS = [mRNAResearchAndProduction, NetMHCpan, ESM3, FastaFileProcessor, NetMHCstabpan]       
+TOOL_NAMES = ["mRNAResearchAndProduction", "NetMHCpan", "ESM3", "FastaFileProcessor", "NetMHCstabpan"]
+
+TOOL_SPECS = get_tool_specs(TOOL_NAMES)
 
 
 def wrap_model(model: BaseChatModel, file_instructions: str) -> RunnableSerializable[AgentState, AIMessage]:
-    model = model.bind_tools(TOOLS)
+    model = model.bind_tools(get_tools(TOOL_NAMES))
     #导入prompt
     preprocessor = RunnableLambda(
         lambda state: [SystemMessage(content=file_instructions)] + state["messages"],
@@ -81,119 +79,7 @@ async def modelNode(state: AgentState, config: RunnableConfig) -> AgentState:
     return {"messages": [response]}
 
 async def should_continue(state: AgentState, config: RunnableConfig):
-    messages = state["messages"]
-    last_message = messages[-1]
-    tmp_tool_msg = []
-    netmhcpan_result=""
-    esm3_result=""
-    netmhcstabpan_result=""
-    if isinstance(last_message, AIMessage) and last_message.tool_calls:
-        # 处理所有工具调用
-        for tool_call in last_message.tool_calls:
-            tool_name = tool_call["name"]
-            tool_call_id = tool_call["id"]
-            
-
-            # 检查是否已经存在相同 tool_call_id 的 ToolMessage
-            if any(isinstance(msg, ToolMessage) and msg.tool_call_id == tool_call_id for msg in messages):
-                continue  # 如果已经存在，跳过添加
-            if tool_name == "NetMHCpan":
-                input_file = tool_call["args"].get("input_file")
-                mhc_allele=tool_call["args"].get("mhc_allele","HLA-A02:01")
-                high_threshold_of_bp=tool_call["args"].get("high_threshold_of_bp",0.5)
-                low_threshold_of_bp=tool_call["args"].get("low_threshold_of_bp",2.0)
-                peptide_length=tool_call["args"].get("peptide_length","9")
-                func_result = await NetMHCpan.ainvoke(
-                    {
-                        "input_file": input_file,
-                        "mhc_allele": mhc_allele,
-                        "high_threshold_of_bp": high_threshold_of_bp,
-                        "low_threshold_of_bp": low_threshold_of_bp,
-                        "peptide_length":peptide_length
-                    }
-                )
-                netmhcpan_result=func_result
-                logger.info(f"NetMHCpan result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-
-            elif tool_name == "FastaFileProcessor":
-                input_file=tool_call["args"].get("input_file")
-                func_result = await FastaFileProcessor.ainvoke(
-                    {
-                        "input_file": input_file
-                    }
-                )
-                logger.info(f"FastaFileProcessor result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)            
-                
-
-            elif tool_name == "mRNAResearchAndProduction":
-                func_result = await mRNAResearchAndProduction.ainvoke(
-                    {
-                        "input": "mRNA疫苗的研究生产过程"
-                    }
-                )
-                logger.info(f"Neoantigen result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-
-
-            elif tool_name == "ESM3":
-                tool_call_esm3_input=tool_call["args"].get("protein_sequence")
-                func_result = await ESM3.ainvoke(
-                    {
-                        "protein_sequence" : tool_call_esm3_input
-                    }
-                )
-                logger.info(f"ESM3 result: {func_result}")
-                esm3_result=func_result
-
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-
-            elif tool_name == "NetMHCstabpan":
-                input_file = tool_call["args"].get("input_file")
-                mhc_allele=tool_call["args"].get("mhc_allele","HLA-A02:01")
-                high_threshold_of_bp=tool_call["args"].get("high_threshold_of_bp",0.5)
-                low_threshold_of_bp=tool_call["args"].get("low_threshold_of_bp",2.0)
-                peptide_length=tool_call["args"].get("peptide_length","9")
-                func_result = await NetMHCstabpan.ainvoke(
-                    {
-                        "input_file": input_file,
-                        "mhc_allele": mhc_allele,
-                        "high_threshold_of_bp": high_threshold_of_bp,
-                        "low_threshold_of_bp": low_threshold_of_bp,
-                        "peptide_length":peptide_length
-                    }
-                )
-                netmhcstabpan_result=func_result
-
-                logger.info(f"NetMHCstabpan result: {func_result}")
-                tool_msg = ToolMessage(
-                    content=func_result,
-                    tool_call_id=tool_call_id,
-                )
-                tmp_tool_msg.append(tool_msg)
-    return {
-        "messages": tmp_tool_msg,
-        "netmhcpan_result":netmhcpan_result,
-        "esm3_result":esm3_result,
-        "netmhcstabpan_result":netmhcstabpan_result,
-        }
+    return await execute_tool_calls(state["messages"], TOOL_SPECS)
 
 
 # Define the graph
@@ -1,26 +1,28 @@
-import aiohttp
 import asyncio
 import json
 import os
 import pandas as pd
 import re
 import sys
-import tempfile
 import traceback
-import uuid
 
 from dotenv import load_dotenv
 from langchain_core.tools import tool
 from minio import Minio
 from minio.error import S3Error
 from pathlib import Path
-from typing import List, Union, Optional
+from typing import List, Union, Optional, Tuple
 
-from utils.minio_utils import upload_file_to_minio,download_from_minio_uri
 current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]                
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
+from src.utils.async_storage import run_storage_op
+from src.utils.fasta import read_fasta_sequences
+from src.utils.inline_payload import stage_tool_input
+from src.utils.minio_utils import read_minio_text, upload_bytes_to_minio
+from src.utils.prediction_cache import cached_pair_prediction
+from src.utils.remote_tool import call_remote_tool
 load_dotenv()
 
 bigmhc_url = CONFIG_YAML["TOOL"]["BIGMHC"]["url"]
@@ -30,24 +32,6 @@ MINIO_CONFIG = CONFIG_YAML["MINIO"]
 MINIO_BUCKET = MINIO_CONFIG["bigmhc_bucket"]
 
 
-def parse_fasta(filepath: str) -> List[str]:
-    peptides = []
-    with open(filepath, "r") as f:
-        current = []
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith(">"):
-                if current:
-                    peptides.append("".join(current))
-                    current = []
-            else:
-                current.append(line)
-        if current:
-            peptides.append("".join(current))
-    return peptides
-
 #  下载并解析 MinIO 文件
 def resolve_minio_to_list(minio_path: str, is_peptide: bool = False) -> List[str]:
 
@@ -56,13 +40,10 @@ def resolve_minio_to_list(minio_path: str, is_peptide: bool = False) -> List[str
 
     ext = os.path.splitext(object_path)[1].lower()
 
-    with tempfile.NamedTemporaryFile(delete=True) as tmp:
-        download_from_minio_uri(minio_path,tmp.name)
-
-        if is_peptide and ext in [".fa", ".fasta", ".fas"]:
-            return parse_fasta(tmp.name)
-        else:
-            return [line.strip() for line in open(tmp.name) if line.strip()]
+    if is_peptide and ext in [".fa", ".fasta", ".fas"]:
+        return read_fasta_sequences(minio_path)
+    lines = read_minio_text(minio_path).splitlines()
+    return [line.strip() for line in lines if line.strip()]
 
 
 #  支持 list[str] 或 minio:// 路径
@@ -74,12 +55,11 @@ def resolve_input(input_val: Union[str, List[str]], is_peptide: bool = False) ->
     else:
         raise ValueError("必须是列表或以 minio:// 开头的字符串")
 
-#  前处理 + 上传 MinIO，返回 minio 路径
-def generate_bigmhc_input_file(
+#  前处理：构建 (mhc, pep) 组合
+def build_bigmhc_pairs(
     input_file: Union[List[str], str],
     mhc_alleles: List[str],
-    default_tgt: int = 1
-) -> str:
+) -> List[Tuple[str, str]]:
     peptides = resolve_input(input_file, is_peptide=True)
     hlas = resolve_input(mhc_alleles)
 
@@ -87,20 +67,35 @@ def generate_bigmhc_input_file(
         raise ValueError("肽段或 HLA 输入不能为空")
 
     if len(peptides) == len(hlas):
-        data = [{"mhc": hla.strip(), "pep": pep.strip(), "tgt": default_tgt}
-                for pep, hla in zip(peptides, hlas)]
-    else:
-        data = [{"mhc": hla.strip(), "pep": pep.strip(), "tgt": default_tgt}
-                for hla in hlas for pep in peptides]
+        return [(hla.strip(), pep.strip()) for pep, hla in zip(peptides, hlas)]
+    return [(hla.strip(), pep.strip()) for hla in hlas for pep in peptides]
 
+#  (mhc, pep) 组合转为 BigMHC 输入 CSV 内容
+def bigmhc_pairs_csv(pairs: List[Tuple[str, str]], default_tgt: int = 1) -> str:
+    data = [{"mhc": hla, "pep": pep, "tgt": default_tgt} for hla, pep in pairs]
     df = pd.DataFrame(data, columns=["mhc", "pep", "tgt"])
+    return df.to_csv(index=False)
 
-    # 创建临时文件
-    with tempfile.NamedTemporaryFile(delete=True, suffix=".csv") as tmp:
-        df.to_csv(tmp.name, index=False)
-        unique_name = f"{uuid.uuid4().hex}_bigmhc_el_input.csv"
-        minio_upload_path = upload_file_to_minio(tmp.name,MINIO_BUCKET,unique_name)
-    return minio_upload_path
+#  上传 (mhc, pep) 组合为 BigMHC 输入 CSV，返回 minio 路径
+def upload_bigmhc_pairs(pairs: List[Tuple[str, str]], default_tgt: int = 1) -> str:
+    # 按内容寻址：相同的 (mhc, pep) 组合复用同一个输入对象
+    return upload_bytes_to_minio(
+        bigmhc_pairs_csv(pairs, default_tgt), MINIO_BUCKET, suffix=".csv", content_type="text/csv", content_addressed=True
+    )
+
+#  BigMHC 输入：小输入直接内联在请求体中，否则上传 MinIO
+async def stage_bigmhc_pairs(tool_name: str, pairs: List[Tuple[str, str]]):
+    return await stage_tool_input(
+        tool_name, bigmhc_pairs_csv(pairs), MINIO_BUCKET, suffix=".csv", content_type="text/csv", content_addressed=True
+    )
+
+#  前处理 + 上传 MinIO，返回 minio 路径
+def generate_bigmhc_input_file(
+    input_file: Union[List[str], str],
+    mhc_alleles: List[str],
+    default_tgt: int = 1
+) -> str:
+    return upload_bigmhc_pairs(build_bigmhc_pairs(input_file, mhc_alleles), default_tgt)
 
 # def generate_bigmhc_im_input_from_fasta(
 #     fasta_minio_path: str,
@@ -170,7 +165,7 @@ def generate_bigmhc_input_file(
 def prepare_bigmhc_input_file(
     input_file: str,
     mhc_alleles: List[str],
-) -> str:
+) -> List[Tuple[str, str]]:
     # if input_file:
     #     if peptide_input or hla_input:
     #         raise ValueError("不允许同时提供 input_file 和 peptide/hla 参数")
@@ -197,7 +192,7 @@ def prepare_bigmhc_input_file(
     #     return input_file  # 普通 .csv 文件
 
     if input_file and mhc_alleles:
-        return generate_bigmhc_input_file(input_file, mhc_alleles)
+        return build_bigmhc_pairs(input_file, mhc_alleles)
 
     raise ValueError("请提供 input_file，或同时提供 peptide_input 和 hla_input")
 
@@ -219,24 +214,22 @@ async def BigMHC_EL(
     """
     try:
         try:
-            input_file = prepare_bigmhc_input_file(input_file,  mhc_alleles)
+            pairs = await run_storage_op("bigmhc.prepare_input", prepare_bigmhc_input_file, input_file, mhc_alleles)
         except ValueError as ve:
             return json.dumps({
                 "type": "text",
                 "content": f" 参数错误: {str(ve)}"
             }, ensure_ascii=False)
 
-        payload = {
-            "input_file": input_file,
-            "model_type": "el"
-        }
-
-        timeout = aiohttp.ClientTimeout(total=60)
-        
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(bigmhc_url, json=payload) as response:
-                response.raise_for_status()
-                return await response.json()
+        async def call_upstream(miss_pairs: List[Tuple[str, str]]) -> str:
+            payload = {
+                "input_file": await stage_bigmhc_pairs("BigMHC_EL", miss_pairs),
+                "model_type": "el"
+            }
+            return await call_remote_tool("BigMHC_EL", bigmhc_url, payload)
+
+        # 已预测过的 (mhc, pep) 直接取缓存，仅未命中部分发给上游
+        return await cached_pair_prediction("BigMHC_EL", pairs, call_upstream, MINIO_BUCKET)
     except Exception as e:
         print("发生异常类型：", type(e).__name__)
         print("异常信息：", str(e))
@@ -264,23 +257,22 @@ async def BigMHC_IM(
     """
     try:
         try:
-            input_file = prepare_bigmhc_input_file(input_file, mhc_alleles)
+            pairs = await run_storage_op("bigmhc.prepare_input", prepare_bigmhc_input_file, input_file, mhc_alleles)
         except ValueError as ve:
             return json.dumps({
                 "type": "text",
                 "content": f" 参数错误: {str(ve)}"
             }, ensure_ascii=False)
 
-        payload = {
-            "input_file": input_file,
-            "model_type": "im" 
-        }
+        async def call_upstream(miss_pairs: List[Tuple[str, str]]) -> str:
+            payload = {
+                "input_file": await stage_bigmhc_pairs("BigMHC_IM", miss_pairs),
+                "model_type": "im"
+            }
+            return await call_remote_tool("BigMHC_IM", bigmhc_url, payload)
 
-        timeout = aiohttp.ClientTimeout(total=30)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(bigmhc_url, json=payload) as response:
-                response.raise_for_status()
-                return await response.json()
+        # 已预测过的 (mhc, pep) 直接取缓存，仅未命中部分发给上游
+        return await cached_pair_prediction("BigMHC_IM", pairs, call_upstream, MINIO_BUCKET)
 
     except Exception as e:
         print("发生异常类型：", type(e).__name__)
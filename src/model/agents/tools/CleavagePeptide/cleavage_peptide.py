@@ -1,6 +1,6 @@
-import os
+import io
+import numpy as np
 import pandas as pd
-import csv
 import json
 import uuid
 import sys
@@ -8,27 +8,28 @@ import asyncio
 
 from dotenv import load_dotenv
 from pathlib import Path  
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import defaultdict
 
 from urllib.parse import urlparse
 from langchain_core.tools import tool
 from minio import Minio
 from minio.error import S3Error
 
-from utils.minio_utils import upload_file_to_minio,download_from_minio_uri
-
 current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]
 sys.path.append(str(project_root))
+from src.utils.async_storage import aupload_bytes, run_storage_op
+from src.utils.cleavage import (
+    PEPTIDE_COLUMNS, Proteins, batch_cleavage_occurrences, make_shards, merge_peptides, netchop_text_name,
+    parse_netchop_text, shard_peptides, unique_peptides,
+)
+from src.utils.candidates import provenance_csv, provenance_name
 from src.utils.log import logger
+from src.utils.minio_utils import open_minio_object, split_minio_uri
+from src.utils.write_behind import pending_bytes, persist_behind
 from config import CONFIG_YAML
 load_dotenv()
 
-input_tmp_dir = CONFIG_YAML["TOOL"]["NETCHOP_CLEAVAGE"]["input_tmp_dir"]
-output_tmp_dir = CONFIG_YAML["TOOL"]["NETCHOP_CLEAVAGE"]["output_tmp_dir"]
-os.makedirs(input_tmp_dir, exist_ok=True)
-os.makedirs(output_tmp_dir, exist_ok=True)
-
 MINIO_CONFIG = CONFIG_YAML["MINIO"]
 MINIO_BUCKET = CONFIG_YAML["MINIO"]["netchop_cleavage_bucket"]
 
@@ -36,13 +37,20 @@ MINIO_BUCKET = CONFIG_YAML["MINIO"]["netchop_cleavage_bucket"]
 
 
 
-def parse_netchop(input_file):
-    """解析 NetChop 输出文件（支持 .txt, .tsv, .xlsx 格式）"""
+def parse_netchop(input_file, suffix=None):
+    """
+    解析 NetChop 输出文件（支持 .txt, .tsv, .xlsx 格式）
+
+    input_file 可以是本地路径，也可以是二进制流（此时需通过 suffix 指定格式）
+
+    返回以 (protein, pos) 为键的字典，多条序列的同一位置不会互相覆盖
+    """
     logger.info(f"Parsing input file: {input_file}")
 
-    if Path(input_file).suffix == '.xlsx':
+    suffix = (suffix or Path(input_file).suffix).lower()
+    if suffix == '.xlsx':
         return _parse_excel(input_file)
-    elif Path(input_file).suffix == '.txt' or  Path(input_file).suffix == '.tsv':
+    elif suffix == '.txt' or  suffix == '.tsv':
         return _parse_text(input_file)
     else:
         raise ValueError("Unsupported file format. Please provide a .txt, .tsv, or .xlsx file.")
@@ -50,6 +58,9 @@ def parse_netchop(input_file):
 def _parse_excel(file_path):
     """解析 Excel 文件"""
     try:
+        if not isinstance(file_path, (str, Path)):
+            # read_excel需要可seek的对象，MinIO响应流先读入内存
+            file_path = io.BytesIO(file_path.read())
         df = pd.read_excel(file_path, sheet_name=0, header=0)
         df.columns = df.columns.str.strip().str.capitalize()  # 统一列名大小写
     except Exception as e:
@@ -60,192 +71,214 @@ def _parse_excel(file_path):
     missing_cols = [col for col in required_columns if col not in df.columns]
     if missing_cols:
         raise ValueError(f"Missing required columns in Excel: {missing_cols}")
+    if 'Ident' not in df.columns:
+        df['Ident'] = ''
 
     positions = {}
-    for _, row in df.iterrows():
+    for pos, aa, c, ident in zip(df['Pos'], df['Aa'], df['C'], df['Ident']):
         try:
-            pos = int(row['Pos'])
-            aa = str(row['Aa']).strip()
-            c = str(row['C']).strip()
-            positions[pos] = (aa, c)
-        except (ValueError, TypeError, KeyError):
+            ident = '' if pd.isna(ident) else str(ident).strip()
+            positions[(ident, int(pos))] = (str(aa).strip(), str(c).strip())
+        except (ValueError, TypeError):
             continue
 
     logger.info(f"Found {len(positions)} total positions from Excel.")
     return positions
 
+def _read_text_lines(file_path):
+    if isinstance(file_path, (str, Path)):
+        with open(file_path, 'r') as f:
+            return f.readlines()
+    return io.TextIOWrapper(file_path, encoding='utf-8').readlines()
+
 def _parse_text(file_path):
     """解析文本格式文件"""
     positions = {}
-    with open(file_path, 'r') as f:
-        lines = f.readlines()[1:]  # 跳过第一行表头
-        for line in lines:
-            if line.lower().startswith('pos') or line.startswith('---'):
-                continue
-            parts = line.strip().split()
-            if len(parts) < 5:
-                continue
-            try:
-                pos = int(parts[0])
-                aa = parts[1]
-                c = parts[2]
-                positions[pos] = (aa, c)
-            except ValueError:
-                continue
+    lines = _read_text_lines(file_path)[1:]  # 跳过第一行表头
+    for line in lines:
+        if line.lower().startswith('pos') or line.startswith('---'):
+            continue
+        parts = line.strip().split()
+        if len(parts) < 5:
+            continue
+        try:
+            pos = int(parts[0])
+            aa = parts[1]
+            c = parts[2]
+            positions[(parts[4], pos)] = (aa, c)
+        except ValueError:
+            continue
     logger.info(f"Found {len(positions)} total positions from text.")
     return positions
 
-def build_sequence(positions):
-    """构建完整蛋白质序列"""
-    max_pos = max(positions.keys())
-    sequence = [''] * max_pos
-    for pos in positions:
-        sequence[pos - 1] = positions[pos][0]
-    full_sequence = ''.join(sequence)
-    logger.info(f"Built full sequence of length {len(full_sequence)}.")
-    return full_sequence
-
-def collect_cut_sites(positions):
-    """收集所有剪切位点（C列为S的位置）"""
-    cut_sites = [pos for pos in positions if positions[pos][1] == 'S']
-    logger.info(f"Found {len(cut_sites)} cut sites.")
-    return cut_sites
-
-
-def _process_single_site(s_start, full_sequence, cut_sites_set, lengths, max_pos):
-    """处理单个剪切位点，生成所有合法肽段"""
-    peptides = []
-    for l in lengths:
-        e_pos = s_start + l
-        if e_pos > max_pos:
-            continue
-        if e_pos not in cut_sites_set:
-            continue
-        start_idx = s_start
-        end_idx = e_pos
-        peptide_seq = full_sequence[start_idx:end_idx]
-        peptides.append({
-            'start': s_start + 1,
-            'end': e_pos,
-            'length': l,
-            'sequence': peptide_seq
-        })
-    return peptides
+def build_proteins(positions) -> Proteins:
+    """
+    按蛋白构建完整序列和剪切位点数组
 
-def cleavage_peptides(full_sequence, 
-                                    cut_sites, 
-                                    lengths=[8, 9, 10], 
-                                    max_workers=min(4, os.cpu_count() or 1)):
-    """多线程生成肽段，并去重"""
-    logger.info(f"Generating peptides using multithreading ({max_workers} workers)...")
-
-    peptides = []
-    seen_sequences = set()
-    cut_sites_set = set(cut_sites)
-    max_pos = len(full_sequence)
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [
-            executor.submit(_process_single_site, s_start, full_sequence, cut_sites_set, lengths, max_pos)
-            for s_start in cut_sites
-        ]
-        for future in as_completed(futures):
-            site_peptides = future.result()
-            for p in site_peptides:
-                seq = p['sequence']
-                if seq not in seen_sequences:
-                    seen_sequences.add(seq)
-                    peptides.append(p)
-
-    logger.info(f"Generated {len(peptides)} unique peptides.")
+    Returns:
+        Dict[str, Tuple[str, np.ndarray]]: protein -> (完整序列, 升序的剪切位点（C列为S的位置，1-based）)
+    """
+    residues = defaultdict(dict)
+    for (protein, pos), (aa, c) in positions.items():
+        residues[protein][pos] = (aa, c)
+
+    proteins = {}
+    for protein, protein_positions in residues.items():
+        max_pos = max(protein_positions)
+        sequence = [''] * max_pos
+        for pos, (aa, _) in protein_positions.items():
+            sequence[pos - 1] = aa
+        cut_sites = np.fromiter(
+            (pos for pos, (_, c) in protein_positions.items() if c == 'S'), dtype=np.int64
+        )
+        proteins[protein] = (''.join(sequence), np.sort(cut_sites))
+    logger.info(
+        f"Built {len(proteins)} protein sequences with "
+        f"{sum(len(sites) for _, sites in proteins.values())} cut sites."
+    )
+    return proteins
+
+
+def cleavage_peptides(proteins: Proteins, lengths=[8, 9, 10]) -> pd.DataFrame:
+    """在当前线程中按蛋白向量化生成肽段，并按序列去重（保留首次出现）"""
+    frames = [shard_peptides(shard, lengths) for shard in make_shards(proteins)]
+    peptides = merge_peptides(frames, proteins)
+    logger.info(f"Generated {len(peptides)} unique peptides from {len(proteins)} proteins.")
     return peptides
 
 
-def write_fasta(peptides, output_file):
-    with open(output_file, 'w') as f:
-        for idx, p in enumerate(peptides, start=1):
-            header = f">peptide_{idx} gi|3333147| start{p['start']}_end{p['end']}_len{p['length']}"
-            f.write(f"{header}\n{p['sequence']}\n")
-
-def write_csv(peptides, output_file):
-    with open(output_file, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['start', 'end', 'length', 'sequence'])
-        writer.writeheader()
-        writer.writerows(peptides)
-
-def write_tsv(peptides, output_file):
-    with open(output_file, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['start', 'end', 'length', 'sequence'], delimiter='\t')
-        writer.writeheader()
-        writer.writerows(peptides)
-
-def write_json(peptides, output_file):
-    with open(output_file, 'w') as f:
-        json.dump(peptides, f, indent=2)
-
-def write_output(peptides, output_file, output_format='fasta'):
-    if output_format == 'fasta':
-        write_fasta(peptides, output_file)
-    elif output_format == 'csv':
-        write_csv(peptides, output_file)
-    elif output_format == 'tsv':
-        write_tsv(peptides, output_file)
-    elif output_format == 'json':
-        write_json(peptides, output_file)
-    else:
+def write_fasta(peptides, f):
+    f.writelines(
+        f">peptide_{idx} {protein} start{start}_end{end}_len{length}\n{sequence}\n"
+        for idx, (protein, start, end, length, sequence) in enumerate(
+            zip(*(peptides[col].tolist() for col in PEPTIDE_COLUMNS)), start=1
+        )
+    )
+
+def write_csv(peptides, f):
+    peptides.to_csv(f, index=False)
+
+def write_tsv(peptides, f):
+    peptides.to_csv(f, sep='\t', index=False)
+
+def write_json(peptides, f):
+    json.dump(peptides.to_dict(orient='records'), f, indent=2)
+
+OUTPUT_WRITERS = {
+    'fasta': write_fasta,
+    'csv': write_csv,
+    'tsv': write_tsv,
+    'json': write_json,
+}
+
+def render_output(peptides, output_format='fasta') -> str:
+    """将肽段表按指定格式序列化为字符串（内存中完成，直接上传MinIO）"""
+    if output_format not in OUTPUT_WRITERS:
         raise ValueError(f"Unsupported output format: {output_format}")
-    logger.info(f"Output written to {output_file}")
+    buffer = io.StringIO(newline='')
+    OUTPUT_WRITERS[output_format](peptides, buffer)
+    logger.info(f"Rendered {len(peptides)} peptides as {output_format}")
+    return buffer.getvalue()
+
+
+NETCHOP_SUFFIXES = [".txt", ".tsv", ".xlsx"]
+FASTA_SUFFIXES = [".fa", ".fasta", ".fas", ".fsa"]
+
+
+def _read_proteins(input_file: str, suffix: str) -> Proteins:
+    """
+    读取NetChop结果并构建各蛋白的序列与剪切位点（同步，应在存储线程池中调用）
+
+    文本结果直接从MinIO对象流解析为剪切位点数组；Excel结果优先读取工具服务写出的同名.txt原始文本，
+    不存在时才回退到解析Excel。
+    """
+    if suffix == '.xlsx':
+        text_uri = netchop_text_name(input_file)
+        # 内联返回、尚在后台写入的结果只在内存中，没有原始文本兄弟文件，不再请求MinIO
+        in_memory_only = pending_bytes(input_file) is not None and pending_bytes(text_uri) is None
+        if not in_memory_only:
+            try:
+                with open_minio_object(text_uri) as f:
+                    return parse_netchop_text(f)
+            except S3Error as e:
+                if e.code not in ("NoSuchKey", "NoSuchObject"):
+                    raise
+            logger.debug(f"No NetChop text for {input_file}, falling back to Excel")
+        with open_minio_object(input_file) as f:
+            return build_proteins(parse_netchop(f, suffix))
+
+    # 直接从MinIO对象流解析，不落地临时文件，也不经过Excel
+    with open_minio_object(input_file) as f:
+        return parse_netchop_text(f)
+
+
+async def _run_netchop(fasta_file: str, cleavage_site_threshold: float) -> str:
+    """对多序列FASTA调用远程NetChop，返回预测结果文件路径"""
+    from src.model.agents.tools.NetChop.netchop import NetChop
+
+    result = json.loads(await NetChop.arun({
+        "input_file": fasta_file,
+        "cleavage_site_threshold": cleavage_site_threshold
+    }))
+    if result.get("type") != "link":
+        raise ValueError(result.get("content", "NetChop 执行失败"))
+    return result["url"]
 
 
 async def run_NetChop_Cleavage(
     input_file: str,
     output_format: str = "fasta",
     lengths=[8, 9, 10],
+    cleavage_site_threshold: float = 0.5,
 ):
     """
     根据NetChop预测结果文件生成肽段，并输出为指定格式。
 
+    支持多序列：NetChop输出中的每条序列（Ident列）分别切割，蛋白分片在进程池中并行计算，
+    合并后的肽段表头带有来源蛋白与位置。输入为FASTA时先调用NetChop预测切割位点。
+
     参数：
-        input_file (str): 输入文件路径 (.txt, .tsv, .xlsx)
+        input_file (str): 输入文件路径 (.txt, .tsv, .xlsx 或 .fa/.fasta/.fas/.fsa)
         lengths (list): 要提取的肽段长度，默认 [8,9,10]
         output_format (str): 输出格式，支持 ['fasta', 'csv', 'tsv', 'json']
+        cleavage_site_threshold (float): 输入为FASTA时NetChop的切割阈值
     """
 
     logger.info(f"Starting peptide generation from {input_file}...")
-    local_input = download_from_minio_uri(input_file, input_tmp_dir)
-    suffix = Path(local_input).suffix.lower()
-    if suffix not in [".txt", ".tsv" ,".xlsx"]:
+    suffix = Path(split_minio_uri(input_file)[1]).suffix.lower()
+    if suffix not in NETCHOP_SUFFIXES + FASTA_SUFFIXES:
         return json.dumps({"type": "text", 
-                            "content": "仅支持 txt 、 tsv 文件 或 excel文件 "
+                            "content": "仅支持 txt 、 tsv 文件 、 excel文件 或 FASTA文件 "
                             }, ensure_ascii=False)
     try:
-        positions = parse_netchop(local_input)
-        sequence = build_sequence(positions)
-        cut_sites = collect_cut_sites(positions)
-        peptides = cleavage_peptides(
-            sequence,
-            cut_sites,
-            lengths=lengths,
-            max_workers=min(4, os.cpu_count() or 1)
-        )
+        if suffix in FASTA_SUFFIXES:
+            input_file = await _run_netchop(input_file, cleavage_site_threshold)
+            suffix = Path(split_minio_uri(input_file)[1]).suffix.lower()
+
+        proteins = await run_storage_op("netchop_cleavage.parse", _read_proteins, input_file, suffix)
+        # 分片在共享进程池中计算，不阻塞事件循环
+        occurrences = await batch_cleavage_occurrences(proteins, lengths=lengths)
+        # 输出只含唯一序列，重复序列的每一次出现记录在同名的来源映射中
+        peptides = unique_peptides(occurrences)
+        logger.info(f"Generated {len(peptides)} unique peptides ({len(occurrences)} occurrences) from {len(proteins)} proteins.")
         
         # 输出保存
+        if peptides.empty:
+            logger.warning("No valid peptides generated.")
         result_uuid = str(uuid.uuid4())
         object_name = f"{result_uuid}_cleavage_result.{output_format}"
-        output_file = Path(output_tmp_dir) / object_name
-        if peptides:
-            write_output(peptides, output_file, output_format)
-        else:
-            logger.warning("No valid peptides generated.")
-        
-        file_path = upload_file_to_minio(str(output_file),MINIO_BUCKET,str(object_name))
-        os.remove(local_input)
-        os.remove(output_file)
+        content = await asyncio.to_thread(render_output, peptides, output_format)
+        file_path = await aupload_bytes(content, MINIO_BUCKET, object_name, content_type="text/plain")
+        provenance = await asyncio.to_thread(provenance_csv, occurrences)
+        await persist_behind(
+            provenance, MINIO_BUCKET, provenance_name(split_minio_uri(file_path)[1]),
+            content_type="text/csv", stage="netchop_cleavage.provenance",
+        )
         
         return json.dumps({
             "type": "link",
             "url": file_path,
-            "content": "已完成切割，请查看内容"
+            "content": f"已完成 {len(proteins)} 条序列的切割，共 {len(peptides)} 条肽段（{len(occurrences)} 处出现），请查看内容"
         }, ensure_ascii=False)
 
     except Exception as e:
@@ -257,20 +290,24 @@ async def run_NetChop_Cleavage(
 @tool
 def NetChop_Cleavage(input_file: str,
                      output_format: str = "fasta",
-                     lengths: list = [8, 9, 10]):
+                     lengths: list = [8, 9, 10],
+                     cleavage_site_threshold: float = 0.5):
     """
     使用 NetChop 输出结果文件生成切割肽段，支持多格式输出。
+    支持多序列的NetChop结果或多序列FASTA（先调用NetChop预测切割位点），合并输出所有序列的肽段。
 
     参数：
-        input_file (str): MinIO 文件路径，格式如 minio://bucket/file.txt
+        input_file (str): MinIO 文件路径，格式如 minio://bucket/file.txt 或 minio://bucket/proteins.fasta
         output_format (str): 输出格式，支持 fasta, csv, tsv, json
         lengths (list): 要生成的肽段长度列表，默认 [8, 9, 10]
+        cleavage_site_threshold (float): 输入为FASTA时NetChop的切割阈值，默认 0.5
     """
     try:
         return asyncio.run(run_NetChop_Cleavage(
             input_file=input_file,
             output_format=output_format,
-            lengths=lengths
+            lengths=lengths,
+            cleavage_site_threshold=cleavage_site_threshold
         ))
     except Exception as e:
         return json.dumps({
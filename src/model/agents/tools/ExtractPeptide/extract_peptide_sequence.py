@@ -14,11 +14,7 @@ project_root = current_file.parents[5]
 sys.path.append(str(project_root))   
 from config import CONFIG_YAML
 from src.utils.log import logger
-from utils.minio_utils import upload_file_to_minio
-
-TMP_OUTPUT_DIR = CONFIG_YAML["TOOL"]["EXTRACT_PEPTIDE"]["tmp_extract_peptide_dir"]
-tmp_output_dir = Path(TMP_OUTPUT_DIR)
-tmp_output_dir.mkdir(parents=True, exist_ok=True)
+from src.utils.minio_utils import upload_bytes_to_minio
 
 # 配置环境变量和 MinIO 连接
 MINIO_BUCKET = CONFIG_YAML["MINIO"]["extract_peptide_bucket"]
@@ -64,26 +60,11 @@ async def process_multiple_peptides(peptide_list: list[str]) -> str:
             }, ensure_ascii=False)
         clean_peptides.append(seq)
 
-    # 保存为fasta文件
+    # 在内存中生成fasta内容并直接上传到MinIO
     file_id = uuid.uuid4().hex
     object_name = f"{file_id}_peptide_sequence.fasta"
-    fasta_file_tmp_path = tmp_output_dir / object_name
-    try:
-        with open(fasta_file_tmp_path, 'w') as f:
-            for idx, seq in enumerate(clean_peptides, 1):
-                f.write(f">peptide_{idx}\n{seq}\n")
-    except Exception as e:
-        return json.dumps({
-            "type": "text",
-            "content": f"写入 FASTA 文件失败: {e}",
-        }, ensure_ascii=False)
-    # 上传到MinIO
-
-    file_path = upload_file_to_minio(str(fasta_file_tmp_path),MINIO_BUCKET,object_name)
-    try:
-        fasta_file_tmp_path.unlink(missing_ok=True)
-    except Exception as e:
-        logger.warning(f"临时文件删除失败: {e}")  
+    fasta_content = "".join(f">peptide_{idx}\n{seq}\n" for idx, seq in enumerate(clean_peptides, 1))
+    file_path = upload_bytes_to_minio(fasta_content, MINIO_BUCKET, object_name, content_type="text/plain")
     return json.dumps({
         "type": "link",
         "url": file_path,
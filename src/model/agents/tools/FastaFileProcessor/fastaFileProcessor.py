@@ -1,12 +1,10 @@
 import json
-import os
 import sys
 
 from dotenv import load_dotenv
 from io import StringIO
 from io import BytesIO
 from langchain.tools import tool
-from minio import Minio
 from minio.error import S3Error
 from pathlib import Path
 
@@ -17,22 +15,7 @@ current_file = Path(__file__).resolve()
 project_root = current_file.parents[4] 
 # 将项目根目录添加到 sys.path
 sys.path.append(str(project_root))
-from config import CONFIG_YAML
-
-# MinIO 配置:
-MINIO_CONFIG = CONFIG_YAML["MINIO"]
-MINIO_ENDPOINT = MINIO_CONFIG["endpoint"]
-MINIO_ACCESS_KEY = os.getenv("ACCESS_KEY")
-MINIO_SECRET_KEY = os.getenv("SECRET_KEY")
-MINIO_SECURE = MINIO_CONFIG.get("secure", False)
-
-# 初始化 MinIO 客户端
-minio_client = Minio(
-    MINIO_ENDPOINT,
-    access_key=MINIO_ACCESS_KEY,
-    secret_key=MINIO_SECRET_KEY,
-    secure=MINIO_SECURE
-)
+from src.utils.minio_utils import get_minio_client
 
 # 定义有效氨基酸集合
 valid_amino_acids = set('ACDEFGHIKLMNPQRSTVWYX')
@@ -119,8 +102,12 @@ def FastaFileProcessor(input_file):
 
         # 从 MinIO 读取文件内容
         try:
-            response = minio_client.get_object(bucket_name, object_name)
-            file_content = response.read().decode("utf-8")
+            response = get_minio_client().get_object(bucket_name, object_name)
+            try:
+                file_content = response.read().decode("utf-8")
+            finally:
+                response.close()
+                response.release_conn()
         except S3Error as e:
             return json.dumps({
                 "type": "text",
@@ -212,7 +199,7 @@ def FastaFileProcessor(input_file):
                 corrected_bytes = corrected_fasta.encode("utf-8")
                 data_stream = BytesIO(corrected_bytes)
                 # 将校正后的内容上传到 MinIO
-                minio_client.put_object(
+                get_minio_client().put_object(
                     bucket_name,
                     object_name,  # 覆盖原始文件
                     data_stream,
@@ -1,4 +1,3 @@
-import aiohttp
 import asyncio
 import json
 import sys
@@ -12,6 +11,7 @@ current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]                
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
+from src.utils.remote_tool import call_remote_tool
 
 immuneapp_url = CONFIG_YAML["TOOL"]["IMMUNEAPP"]["url"]
 
@@ -43,12 +43,8 @@ async def ImmuneApp(
         "peptide_lengths": peptide_lengths
     }
 
-    timeout = aiohttp.ClientTimeout(total=60)
     try:
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(immuneapp_url, json=payload) as response:
-                response.raise_for_status()
-                return await response.json()
+        return await call_remote_tool("ImmuneApp", immuneapp_url, payload)
     except Exception as e:
         print("发生异常类型：", type(e).__name__)
         print("异常信息：", str(e))
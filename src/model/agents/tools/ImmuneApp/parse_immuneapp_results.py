@@ -3,7 +3,6 @@ import pandas as pd
 import requests
 import sys
 
-from minio import Minio
 from minio.error import S3Error
 from pathlib import Path
 from urllib.parse import urlparse
@@ -13,20 +12,7 @@ project_root = current_file.parents[5]
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
 from src.utils.log import logger
-
-# MinIO 配置
-MINIO_CONFIG = CONFIG_YAML["MINIO"]
-MINIO_ENDPOINT = MINIO_CONFIG["endpoint"]
-MINIO_ACCESS_KEY = os.getenv("ACCESS_KEY")
-MINIO_SECRET_KEY = os.getenv("SECRET_KEY")
-MINIO_SECURE = MINIO_CONFIG.get("secure", False)
-
-minio_client = Minio(
-    MINIO_ENDPOINT,
-    access_key=MINIO_ACCESS_KEY,
-    secret_key=MINIO_SECRET_KEY,
-    secure=MINIO_SECURE
-)
+from src.utils.minio_utils import download_from_minio_uri
 
 output_dir = CONFIG_YAML["TOOL"]["IMMUNEAPP"]["output_tmp_dir"]
 os.makedirs(output_dir, exist_ok=True)
@@ -51,13 +37,9 @@ def download_file_from_minio(minio_path: str, local_dir: str, local_file_name: s
         local_file_path = local_dir_path / \
             (local_file_name or Path(object_name).name)
 
-        if local_file_path.exists():
-            logger.info(f"File {local_file_path} already exists.")
-            return str(local_file_path)
-
+        # 经download_from_minio_uri的磁盘缓存读取，对象更新（ETag变化）后会重新下载
         logger.info(f"Downloading {minio_path} to {local_file_path}...")
-        minio_client.fget_object(
-            bucket_name, object_name, str(local_file_path))
+        download_from_minio_uri(minio_path, str(local_file_path))
         logger.info(f"Downloaded {minio_path} to {local_file_path}")
         return str(local_file_path)
 
@@ -75,21 +57,12 @@ def download_file_from_minio(minio_path: str, local_dir: str, local_file_name: s
         raise
 
 
-def check_minio_connection():
-    try:
-        minio_client.list_buckets()
-        return True
-    except S3Error as e:
-        print(f"MinIO连接或bucket操作失败: {e}")
-        return False
-
 def parse_immuneapp_results(minio_path: str) -> str:
     """
     解析 MinIO 上的 ImmuneApp 结果文件（TSV 格式），返回按 Aff_score 升序排序后的 Markdown 表格。
     若结果超过 7 行，仅返回前 7 行，并附加提示信息。
     """
-    if check_minio_connection():
-        result_file_path = download_file_from_minio(minio_path, output_dir)
+    result_file_path = download_file_from_minio(minio_path, output_dir)
 
     try:
         # 读取 TSV 文件
@@ -142,8 +115,7 @@ def parse_immuneapp_annotation_results(minio_path: str) -> str:
     """
     解析 MinIO 上的 Binding Summary 结果文件（TXT 格式，tab 分隔），返回 Markdown 表格（最多7行），不排序。
     """
-    if check_minio_connection():
-        result_file_path = download_file_from_minio(minio_path, output_dir)
+    result_file_path = download_file_from_minio(minio_path, output_dir)
 
     try:
         # 读取 TXT 文件（tab 分隔）
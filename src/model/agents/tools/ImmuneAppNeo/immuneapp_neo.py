@@ -1,7 +1,5 @@
-import aiohttp
 import asyncio
 import json
-import os
 import sys
 import traceback
 import uuid
@@ -17,11 +15,11 @@ current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]                
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
-from utils.minio_utils import upload_file_to_minio,download_from_minio_uri
+from src.utils.async_storage import run_storage_op
+from src.utils.minio_utils import read_minio_text, upload_bytes_to_minio
+from src.utils.remote_tool import call_remote_tool
 
 immuneapp_neo_url = CONFIG_YAML["TOOL"]["IMMUNEAPP_NEO"]["url"]
-LOCAL_OUTPUT_DIR = CONFIG_YAML["TOOL"]["IMMUNEAPP_NEO"]["output_tmp_dir"]
-os.makedirs(LOCAL_OUTPUT_DIR, exist_ok=True)
 
 MINIO_CONFIG = CONFIG_YAML["MINIO"]
 MINIO_BUCKET = MINIO_CONFIG["immuneapp_neo_bucket"]
@@ -38,36 +36,25 @@ def fasta_to_peplist_txt(
     - minio_path: 格式为 minio://bucket/path.fasta
 
     返回：
-    - 转换后 .txt 文件的本地路径
+    - 转换后 .txt 文件的 MinIO 路径
     """
 
-    
-    output_dir = Path(LOCAL_OUTPUT_DIR)
-    tmp_fasta_path = output_dir / f"{uuid.uuid4().hex}_input.fasta"
-    peplist_path = output_dir / f"{uuid.uuid4().hex}_peplist.txt"
-
-    download_from_minio_uri(minio_path,str(tmp_fasta_path))
+    fasta_text = read_minio_text(minio_path)
     
     invalid_length = False
-    with open(peplist_path, "w", encoding="utf-8") as fout:
-        for record in SeqIO.parse(tmp_fasta_path, "fasta"):
-            seq = str(record.seq).strip().upper()
-            if seq:
-                if not (8 <= len(seq) <= 12):
-                    invalid_length = True
-                fout.write(seq + "\n")
-                
-    tmp_fasta_path.unlink(missing_ok=True)
+    peplist = []
+    for record in SeqIO.parse(StringIO(fasta_text), "fasta"):
+        seq = str(record.seq).strip().upper()
+        if seq:
+            if not (8 <= len(seq) <= 12):
+                invalid_length = True
+            peplist.append(seq + "\n")
     
     if invalid_length:
-        peplist_path.unlink(missing_ok=True)
         raise ValueError("有非法肽段")
     
     upload_name = f"{uuid.uuid4().hex}_peplist.txt"
-    minio_upload_path=upload_file_to_minio(str(peplist_path),MINIO_BUCKET,upload_name)
-    peplist_path.unlink(missing_ok=True)
-    
-    return minio_upload_path
+    return upload_bytes_to_minio("".join(peplist), MINIO_BUCKET, upload_name, content_type="text/plain")
 
 
 @tool
@@ -87,7 +74,7 @@ async def ImmuneApp_Neo(
     """
     if input_file.lower().endswith((".fasta", ".fa", ".fsa", ".fas")):
         try:
-            input_file = fasta_to_peplist_txt(input_file)
+            input_file = await run_storage_op("immuneapp_neo.fasta_to_peplist", fasta_to_peplist_txt, input_file)
         except ValueError as ve:
             return json.dumps({
                 "type": "text",
@@ -102,12 +89,8 @@ async def ImmuneApp_Neo(
         "alleles": alleles
     }
 
-    timeout = aiohttp.ClientTimeout(total=60)
     try:
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(immuneapp_neo_url, json=payload) as response:
-                response.raise_for_status()
-                return await response.json()
+        return await call_remote_tool("ImmuneApp_Neo", immuneapp_neo_url, payload)
     except Exception as e:
         print("发生异常类型：", type(e).__name__)
         print("异常信息：", str(e))
@@ -15,8 +15,9 @@ current_dir = Path(__file__).resolve().parent
 project_root = current_dir.parents[4]
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
+from src.utils.remote_tool import call_remote_tool
 from src.utils.log import logger
-from utils.minio_utils import upload_file_to_minio,download_from_minio_uri
+from src.utils.minio_utils import upload_file_to_minio,download_from_minio_uri
 
 # 读取 config 中的配置
 MINIO_CONFIG = CONFIG_YAML["MINIO"]
@@ -110,7 +111,6 @@ if __name__ == "__main__":
 
 
 
-import aiohttp
 import asyncio
 import json
 import sys
@@ -144,12 +144,8 @@ async def LinearDesign(minio_input_fasta: str , lambda_val: float = 0.5) -> str:
         "lambda_val": lambda_val,
     }
 
-    timeout = aiohttp.ClientTimeout(total=1800)
     try:
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(lineardesign_url, json=payload) as response:
-                response.raise_for_status()
-                return await response.json()
+        return await call_remote_tool("LinearDesign", lineardesign_url, payload)
     except Exception as e:
         print("发生异常类型：", type(e).__name__)
         print("异常信息：", str(e))
@@ -1,11 +1,8 @@
 import asyncio
 import json
-import os
 import sys
-import uuid
 
 from dotenv import load_dotenv
-from minio import Minio
 from minio.error import S3Error
 from langchain_core.language_models import BaseChatModel
 from langchain_core.tools import tool
@@ -14,7 +11,6 @@ from langchain_core.runnables import RunnableSerializable,RunnableLambda
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 
 from pathlib import Path
-import pandas as pd
 from io import BytesIO
 from typing import List, Dict, Optional, Union, AsyncIterator,Any
 
@@ -31,7 +27,11 @@ from src.model.agents.tools.utils.step1_protein_cleavage import step1_protein_cl
 from src.model.agents.tools.utils.step2_pmhc_binding_affinity import step2_pmhc_binding_affinity
 from src.model.agents.tools.utils.step3_pmhc_immunogenicity import step3_pmhc_immunogenicity
 from src.model.agents.tools.utils.step4_pmhc_tcr_interaction import step4_pmhc_tcr_interaction
-from utils.minio_utils import upload_file_to_minio,download_from_minio_uri
+from src.utils.candidates import candidate_dedup, publish_fan_out
+from src.utils.log import logger
+from src.utils.result_tables import publish_result_table, read_result_table
+from src.utils.run_manifest import artifact_run, mark_deliverable
+from src.utils.write_behind import flush_pending, write_behind_run
 load_dotenv()
 current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]
@@ -40,23 +40,10 @@ from config import CONFIG_YAML
 
 # MinIO 配置:
 MINIO_CONFIG = CONFIG_YAML["MINIO"]
-MINIO_ENDPOINT = MINIO_CONFIG["endpoint"]
-MINIO_ACCESS_KEY = os.getenv("ACCESS_KEY")
-MINIO_SECRET_KEY = os.getenv("SECRET_KEY")
 MOLLY_BUCKET = MINIO_CONFIG["molly_bucket"]
-MINIO_SECURE = MINIO_CONFIG.get("secure", False)
 
 NEOANTIGEN_CONFIG = CONFIG_YAML["TOOL"]["NEOANTIGEN_SELECTION"]
 RNAFOLD_ENERGY_THRESHOLD = NEOANTIGEN_CONFIG["rnafold_energy_threshold"]
-OUTPUT_TMP = CONFIG_YAML["TOOL"]["RNAFOLD"]["output_tmp_dir"]
-
-# 初始化 MinIO 客户端
-minio_client = Minio(
-    MINIO_ENDPOINT,
-    access_key=MINIO_ACCESS_KEY,
-    secret_key=MINIO_SECRET_KEY,
-    secure=MINIO_SECURE
-)
 
 async def wrap_summary_llm_model_async_stream(
     model: BaseChatModel, 
@@ -93,35 +80,18 @@ def filter_rnafold(input_file_path: str, rnafold_energy_threshold: float) -> tup
         if not input_file_path.startswith("minio://"):
             raise ValueError("Input path must start with 'minio://'")
         
-        path_without_prefix = input_file_path[len("minio://"):]
-        bucket_name, object_name = path_without_prefix.split("/", 1)
-        
-        # 2. 下载文件到临时本地路径
-        local_temp_path = f"{OUTPUT_TMP}/{uuid.uuid4().hex}.xlsx"
-        # minio_client.fget_object(bucket_name, object_name, local_temp_path)
-        local_temp_path=download_from_minio_uri(input_file_path,local_temp_path)
-        # 3. 读取Excel并过滤MFE结构
-        df = pd.read_excel(local_temp_path)
+        # 2. 直接在内存中读取结果表（优先读取Parquet）并过滤MFE结构
+        df = read_result_table(input_file_path)
         
         # 提取自由能值（从"MFE结构"列）
         df["MFE_energy"] = df["MFE结构"].str.extract(r'\((-?\d+\.\d+)\)').astype(float)
         filtered_df = df[df["MFE_energy"] <= rnafold_energy_threshold]
 
-        # 4. 生成Markdown格式字符串
+        # 3. 生成Markdown格式字符串
         markdown_str = filtered_df.to_markdown(index=False)        
         
-        # 5. 保存过滤结果到新文件
-        filtered_local_path = f"{OUTPUT_TMP}/filtered_{Path(object_name).name}"
-        filtered_df.to_excel(filtered_local_path, index=False)
-        
-        # 6. 上传到molly桶
-        random_id = uuid.uuid4().hex
-        new_object_name = f"{random_id}_filter_RNAFold_results.xlsx"
-
-        mimio_path=upload_file_to_minio(filtered_local_path,MOLLY_BUCKET,new_object_name)
-        # 6. 清理临时文件
-        Path(local_temp_path).unlink(missing_ok=True)
-        Path(filtered_local_path).unlink(missing_ok=True)        
+        # 4. 过滤结果以Parquet上传到molly桶（按RESULT_TABLES.excel_export同时生成Excel导出）
+        mimio_path = publish_result_table(filtered_df, MOLLY_BUCKET, "filter_RNAFold_results")
         return markdown_str, mimio_path
     
     except S3Error as e:
@@ -149,42 +119,60 @@ async def run_neoanigenselection(
     mrna_design_process_result = []
     writer = get_stream_writer()
     
-    try:
-        # 第一步：蛋白切割位点预测
-        cleavage_result_file_path, netchop_final_result_str = await step1_protein_cleavage(
-            input_file, writer, mrna_design_process_result,minio_client
-        )
+    # 本次运行产生的MinIO对象登记到运行清单，中间产物可按run_id批量清理
+    # 各预测阶段只对唯一的 (peptide, allele) 打分，去重统计和来源展开记录在dedup中
+    async with artifact_run("NeoAntigenSelection", [input_file]) as run, candidate_dedup() as dedup, write_behind_run():
+        try:
+            # 第一步：蛋白切割位点预测
+            cleavage_result_file_path, netchop_final_result_str = await step1_protein_cleavage(
+                input_file, writer, mrna_design_process_result
+            )
         
-        # 第二步：pMHC结合亲和力预测
-        bigmhc_el_result_file_path, bigmhc_el_fasta_str = await step2_pmhc_binding_affinity(
-            cleavage_result_file_path, netchop_final_result_str,mhc_allele, writer, mrna_design_process_result,minio_client
-        )
+            # 第二步：pMHC结合亲和力预测
+            bigmhc_el_result_file_path, bigmhc_el_fasta_str = await step2_pmhc_binding_affinity(
+                cleavage_result_file_path, netchop_final_result_str,mhc_allele, writer, mrna_design_process_result
+            )
 
-        print(bigmhc_el_result_file_path)
-        # 第三步：pMHC免疫原性预测
-        bigmhc_im_result_file_path, bigmhc_im_fasta_str = await step3_pmhc_immunogenicity(
-            bigmhc_el_result_file_path, writer, mrna_design_process_result,minio_client
-        )
+            print(bigmhc_el_result_file_path)
+            # 第三步：pMHC免疫原性预测
+            bigmhc_im_result_file_path, bigmhc_im_fasta_str = await step3_pmhc_immunogenicity(
+                bigmhc_el_result_file_path, writer, mrna_design_process_result, bigmhc_el_fasta_str
+            )
         
-        # 第四步：pMHC-TCR相互作用预测
-        mrna_input_file_path = await step4_pmhc_tcr_interaction(
-            bigmhc_im_result_file_path, cdr3_sequence, writer, mrna_design_process_result,minio_client
-        )
+            # 第四步：pMHC-TCR相互作用预测
+            mrna_input_file_path = await step4_pmhc_tcr_interaction(
+                bigmhc_im_result_file_path, cdr3_sequence, writer, mrna_design_process_result, bigmhc_im_fasta_str
+            )
+            # 筛选出的肽段FASTA是本流程的交付物（后续mRNA设计的输入），清理时保留
+            mark_deliverable(mrna_input_file_path)
         
         
         
-    except Exception as e:
-        return json.dumps({
-            "type": "text",
-            "content": f"流程执行失败: {str(e)}"
-        }, ensure_ascii=False)
+        except Exception as e:
+            if run is not None:
+                run.status = "failed"
+            return json.dumps({
+                "type": "text",
+                "content": f"流程执行失败: {str(e)}"
+            }, ensure_ascii=False)
     
-    finally:
-        # 返回最终结果
-        return json.dumps({
-            "type": "text",
-            "content": "\n".join(mrna_design_process_result)
-        }, ensure_ascii=False)
+        finally:
+            # 通过筛选的候选打分展开到每一次出现（蛋白、位置、突变），并在报告中给出去重比
+            try:
+                await publish_fan_out(dedup, MOLLY_BUCKET)
+            except Exception as e:
+                logger.error(f"Failed to publish candidate provenance table: {e}")
+            dedup_report = dedup.markdown()
+            if dedup_report:
+                writer(dedup_report)
+                mrna_design_process_result.append(dedup_report)
+            # 各步骤的中间FASTA在后台写入MinIO，返回前确保本次运行写出的全部落盘
+            await flush_pending()
+            # 返回最终结果
+            return json.dumps({
+                "type": "text",
+                "content": "\n".join(mrna_design_process_result)
+            }, ensure_ascii=False)
 
 @tool
 def NeoAntigenSelection(
@@ -1,17 +1,17 @@
 import asyncio
 import uuid
 import sys
-import os
 
 from pathlib import Path
 from dotenv import load_dotenv
-from minio import Minio
 
 load_dotenv()
 current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
+from src.utils.async_storage import run_storage_op
+from src.utils.fasta import read_fasta_sequences
 from src.utils.log import logger
 
 # 配置信息
@@ -22,21 +22,6 @@ OUTPUT_TMP_DIR = NEOMRNA_CONFIG["output_tmp_dir"]
 LINEARDESIGN_SCRIPT = CONFIG_YAML["TOOL"]["LINEARDESIGN"]["script"]
 linear_design_dir = Path(LINEARDESIGN_SCRIPT).parents[0]
 
-# MinIO 配置:
-MINIO_CONFIG = CONFIG_YAML["MINIO"]
-MINIO_ENDPOINT = MINIO_CONFIG["endpoint"]
-MINIO_ACCESS_KEY = os.getenv("ACCESS_KEY")
-MINIO_SECRET_KEY = os.getenv("SECRET_KEY")
-MINIO_SECURE = MINIO_CONFIG.get("secure", False)
-
-# 初始化 MinIO 客户端
-minio_client = Minio(
-    MINIO_ENDPOINT,
-    access_key=MINIO_ACCESS_KEY,
-    secret_key=MINIO_SECRET_KEY,
-    secure=MINIO_SECURE
-)
-
 async def concatenate_peptides_with_linker(fasta_file):
     """
     将FASTA文件中的肽段用裂解子连接起来
@@ -62,31 +47,9 @@ async def concatenate_peptides_with_linker(fasta_file):
         
         logger.info(f"Processing file from MinIO - bucket: {bucket_name}, object: {object_name}")
 
-        # 从MinIO一次性读取文件内容
-        response = minio_client.get_object(bucket_name, object_name)
-        file_content = response.read().decode('utf-8')
-        response.close()
-        response.release_conn()
-
-        # 处理FASTA内容
+        # 在存储线程池中流式解析MinIO上的FASTA（不阻塞事件循环）
         linker = CLEAVAGE_ENHANCER
-        peptides = []
-        current_peptide = []
-        
-        for line in file_content.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith('>'):
-                if current_peptide:
-                    peptides.append(''.join(current_peptide))
-                    current_peptide = []
-            else:
-                current_peptide.append(line)
-    
-        # 添加最后一个肽段
-        if current_peptide:
-            peptides.append(''.join(current_peptide))
+        peptides = await run_storage_op("cds_combine.read_fasta", read_fasta_sequences, fasta_file)
         
         # 用连接符连接所有肽段
         concatenated = linker.join(peptides)
@@ -9,7 +9,8 @@ from dotenv import load_dotenv
 from minio import Minio
 from minio.error import S3Error
 
-from utils.minio_utils import upload_file_to_minio
+from src.utils.async_storage import aupload_file
+from src.utils.fasta import iter_fasta_sequences
 load_dotenv()
 current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]
@@ -47,23 +48,9 @@ async def utr_spacer_rnafold_to_mrna(fasta_file, mRNA_type="both"):
     if mRNA_type.lower() not in valid_types:
         raise ValueError(f"Invalid mRNA_type. Must be one of: {valid_types}")
 
-    # 读取并解析输入FASTA文件
-    sequences = []
-    current_seq = []
-    
-    with open(fasta_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith('>'):
-                if current_seq:
-                    sequences.append(''.join(current_seq))
-                    current_seq = []
-            else:
-                current_seq.append(line)
-        if current_seq:
-            sequences.append(''.join(current_seq))
+    # 读取并解析输入FASTA文件（mmap流式解析）
+    with open(fasta_file, "rb") as f:
+        sequences = list(iter_fasta_sequences(f))
     
     # 为每个密码子序列构建mRNA
     mrna_sequences = []
@@ -90,7 +77,7 @@ async def utr_spacer_rnafold_to_mrna(fasta_file, mRNA_type="both"):
             f_out.write(f">sequence_{i}_{seq_type}\n{mrna}\n")
     
     try:
-        file_path = upload_file_to_minio(str(output_path),MINIO_BUCKET,f"mrna_{random_id}.fasta")
+        file_path = await aupload_file(str(output_path),MINIO_BUCKET,f"mrna_{random_id}.fasta")
         rnafold_result = await RNAFold.arun({"input_file": file_path})
 
 
@@ -1,5 +1,4 @@
 import json
-import aiohttp
 import sys
 import traceback
 
@@ -12,6 +11,7 @@ current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]                
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
+from src.utils.remote_tool import call_remote_tool
 
 netchop_url = CONFIG_YAML["TOOL"]["NETCHOP"]["url"]
 @tool
@@ -35,12 +35,8 @@ async def NetChop(
         "cleavage_site_threshold": cleavage_site_threshold
     }
 
-    timeout = aiohttp.ClientTimeout(total=30)
     try:
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(netchop_url, json=payload) as response:
-                response.raise_for_status()
-                return await response.json()
+        return await call_remote_tool("NetChop", netchop_url, payload)
     except Exception as e:
         print("发生异常类型：", type(e).__name__)
         print("异常信息：", str(e))
@@ -1,14 +1,23 @@
 import re
-import pandas as pd
+from itertools import chain
 from pathlib import Path
-from openpyxl.styles import Alignment
-from openpyxl import load_workbook
 
+from src.utils.cleavage import netchop_text_name
 from src.utils.log import logger
+from src.utils.result_tables import EXCEL_EXPORT
+from src.utils.xlsx_export import SummaryRow, write_xlsx
 
-def save_excel(output: str, output_dir: str, output_filename: str) -> bool:
+TABLE_PATTERN = re.compile(r"\s*(\d+)\s+([A-Z])\s+([^\s])\s+([\d.]+)\s+([^\s]+)")
+SUMMARY_PATTERN = re.compile(r"Number of cleavage\s+[^\s]+.*")
+COLUMNS = ["Pos", "AA", "C", "score", "Ident"]
+
+
+def save_excel(output: str, output_dir: str, output_filename: str):
     """
     将数据保存到Excel文件（适用于netChop输出格式）
+
+    原始文本同时写为同名的.txt，切割肽段生成直接解析该文本，不再读取Excel；
+    Excel仅作为给用户的导出（RESULT_TABLES.excel_export），逐行解析并以流式方式写出
     
     Args:
         output: 要解析的原始文本数据
@@ -16,76 +25,34 @@ def save_excel(output: str, output_dir: str, output_filename: str) -> bool:
         output_filename: 输出文件名
         
     Returns:
-        bool: 成功返回True，失败返回False
+        成功返回需上传的结果文件路径（Excel，关闭导出时为.txt），失败返回False
     """
     try:
         # 数据解析 - 针对netChop输出格式
-        table_pattern = re.compile(
-            r"\s*(\d+)\s+([A-Z])\s+([^\s])\s+([\d.]+)\s+([^\s]+)"
-        )
-        matches = table_pattern.findall(output)
-        
-        if not matches:
+        rows = (match.groups() for match in TABLE_PATTERN.finditer(output))
+        first = next(rows, None)
+        if first is None:
             logger.error("未匹配到有效数据")
             return False
+        rows = chain([first], rows)
 
-        # 创建DataFrame
-        columns = [
-            "Pos", "AA", "C", "score", "Ident"
-        ]
-        df = pd.DataFrame(matches, columns=columns)
-
-        # 添加摘要信息
-        summary_pattern = re.compile(r"Number of cleavage\s+[^\s]+.*")
-        summary_match = summary_pattern.search(output)
-        
-        # 如果找到匹配的统计信息，将其添加到表格下方
+        # 如果找到统计信息，作为合并居中的一行添加到表格下方
+        summary_match = SUMMARY_PATTERN.search(output)
         if summary_match:
-            summary_row = [summary_match[0]] + [""] * (len(columns) - 1)  # 第一列是 summary_match[0]，其余列为空
+            rows = chain(rows, [SummaryRow(summary_match[0])])
 
-            df.loc[len(df)] = summary_row
-
-        # 准备输出路径
+        # 机器读取使用原始文本，Excel仅作为给用户的导出
         output_path = Path(output_dir) / output_filename
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-
-        # 写入Excel文件
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name="Results", index=False)
-            
-            # 获取workbook和worksheet对象
-            workbook = writer.book
-            worksheet = writer.sheets["Results"]
-            
-            # 设置合并单元格和居中
-            if summary_match:
-                worksheet.merge_cells(
-                    start_row=len(df)+1,
-                    start_column=1,
-                    end_row=len(df)+1,
-                    end_column=len(columns)
-                )
-                cell = worksheet.cell(row=len(df)+1, column=1)
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-            
-            # 调整列宽
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = (max_length + 2)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
+        text_path = Path(netchop_text_name(str(output_path)))
+        text_path.write_text(output, encoding="utf-8")
+        if not EXCEL_EXPORT:
+            return text_path
 
-            # 显式保存文件
-            workbook.save(output_path)
+        # 准备输出路径并写入Excel文件
+        write_xlsx(output_path, COLUMNS, rows)
 
         logger.info(f"Excel文件已成功保存至: {output_path}")
-        return True
+        return output_path
 
     except PermissionError as e:
         logger.error(f"文件权限错误: {str(e)}")
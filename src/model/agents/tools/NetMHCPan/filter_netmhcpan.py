@@ -18,8 +18,21 @@ def filter_netmhcpan_excel(excel_path: str) -> str:
         ])
     except Exception as e:
         return f"**错误**: 无法读取Excel文件 - {str(e)}"
+    return filter_netmhcpan_table(df)
 
+
+def filter_netmhcpan_table(df: pd.DataFrame) -> str:
+    """
+    从 netMHCpan 的结果表（含 Protein 统计行）中过滤 WB/SB 肽段，按蛋白生成 Markdown 表格
+
+    Args:
+        df (pd.DataFrame): 与Excel输出相同列的结果表
+
+    Returns:
+        str: 生成的 Markdown 表格字符串
+    """
     # 识别所有蛋白质信息行的位置
+    df = df.reset_index(drop=True)
     protein_indices = []
     for idx, row in df.iterrows():
         if isinstance(row["Pos"], str) and "Protein" in row["Pos"]:
@@ -1,4 +1,3 @@
-import aiohttp
 import asyncio
 import json
 import sys
@@ -11,8 +10,15 @@ current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]                
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
+from src.model.agents.tools.NetMHCPan.filter_netmhcpan import filter_netmhcpan_table
+from src.utils.prediction_cache import cached_fasta_prediction
+from src.utils.remote_tool import call_remote_tool
 
 netmhcpan_url = CONFIG_YAML["TOOL"]["NETMHCPAN"]["url"]
+RESULT_BUCKET = CONFIG_YAML["MINIO"]["netmhcpan_bucket"]
+# 结果表中用于缓存合并的列
+RESULT_COLUMNS = {"pos": "Pos", "allele": "MHC", "peptide": "Peptide", "identity": "Identity", "bind_level": "BindLevel"}
+SUMMARY_TEMPLATE = "Protein {identity}. Allele {allele}. Number of high binders {strong}. Number of weak binders {weak}. Number of peptides {total}"
 
 @tool
 async def NetMHCpan(
@@ -44,12 +50,24 @@ async def NetMHCpan(
         "peptide_length": peptide_length
     }
 
-    timeout = aiohttp.ClientTimeout(total=30)
     try:
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(netmhcpan_url, json=payload) as response:
-                response.raise_for_status()
-                return await response.json()
+        async def call_upstream(upstream_input: str) -> str:
+            return await call_remote_tool("NetMHCpan", netmhcpan_url, {**payload, "input_file": upstream_input})
+
+        # 所有滑窗肽段均已缓存的序列不再发给上游，结果与上游返回的结果表合并
+        return await cached_fasta_prediction(
+            "NetMHCpan",
+            input_file,
+            alleles=[allele.strip() for allele in mhc_allele.split(",") if allele.strip()],
+            lengths=[int(length) for length in str(peptide_length).split(",") if length.strip()],
+            call_upstream=call_upstream,
+            result_bucket=RESULT_BUCKET,
+            columns=RESULT_COLUMNS,
+            summary_template=SUMMARY_TEMPLATE,
+            pos_base=1,
+            params={"high_threshold_of_bp": high_threshold_of_bp, "low_threshold_of_bp": low_threshold_of_bp},
+            content_builder=filter_netmhcpan_table,
+        )
     except Exception as e:
         print("发生异常类型：", type(e).__name__)
         print("异常信息：", str(e))
@@ -1,8 +1,8 @@
 import re
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import Alignment
 from pathlib import Path
+from src.utils.result_tables import EXCEL_EXPORT, save_parquet
+from src.utils.xlsx_export import SummaryRow, write_xlsx
 
 def save_excel(output:str, output_dir:str, output_filename:str):
     # 增强正则表达式（允许最后四列部分缺失）
@@ -41,23 +41,18 @@ def save_excel(output:str, output_dir:str, output_filename:str):
     # 创建DataFrame
     df = pd.DataFrame(all_data, columns=columns)
 
-    # 写入Excel
+    # 机器读取的结果写为同名Parquet（数值列带类型），Excel仅作为给用户的导出
     output_path = Path(output_dir) / output_filename
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name="Results", index=False)
-        
-        # 合并统计行单元格
-        workbook = writer.book
-        worksheet = writer.sheets["Results"]
-        for idx in df.index[df['Pos'].str.contains('Protein', na=False)]:
-            excel_row = idx + 2  # 转换为Excel行号
-            worksheet.merge_cells(
-                start_row=excel_row,
-                start_column=1,
-                end_row=excel_row,
-                end_column=17  # 合并全部17列
-            )
-            cell = worksheet.cell(row=excel_row, column=1)
-            cell.alignment = Alignment(horizontal='center', vertical='center')
+    parquet_path = save_parquet(df, output_path)
+    if not EXCEL_EXPORT and parquet_path is not None:
+        return parquet_path
+
+    # 流式写入Excel：统计行写为合并整行、居中的单元格
+    summary_flags = df['Pos'].str.contains('Protein', na=False).tolist()
+    rows = (
+        SummaryRow(row[0]) if is_summary else row
+        for row, is_summary in zip(df.itertuples(index=False, name=None), summary_flags)
+    )
+    write_xlsx(output_path, columns, rows)
 
-    return output_path
\ No newline at end of file
+    return output_path
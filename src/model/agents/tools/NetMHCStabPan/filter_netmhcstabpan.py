@@ -48,6 +48,50 @@ def filter_netmhcstabpan_output(output_lines: list) -> str:
         except (IndexError, ValueError):
             continue
     
+    return _markdown_result(filtered_data, additional_data, header_line)
+
+
+def filter_netmhcstabpan_table(df) -> str:
+    """
+    过滤 netMHCstabpan 的结果表（Pos / HLA / peptide / Pred / Thalf(h) / %Rank_Stab / BindLevel 及末尾统计行），
+    生成与 filter_netmhcstabpan_output 相同格式的 Markdown 表格。
+
+    参数:
+        df (pd.DataFrame): 结果表，统计行的peptide列为空、Pos列为统计信息。
+
+    返回:
+        str: 包含标题、Markdown 表格及总结信息的字符串。
+    """
+    filtered_data = []
+    additional_data = []
+    header_line = ""
+
+    for row in df.to_dict("records"):
+        if not isinstance(row.get("peptide"), str):
+            if isinstance(row.get("Pos"), str) and "Allele" in row["Pos"]:
+                header_line = f"**{row['Pos'].strip()}**\n"
+            continue
+        try:
+            bind_level_match = re.search(r"(WB|SB)", str(row.get("BindLevel") or ""))
+            data_entry = {
+                "Peptide": row["peptide"],
+                "MHC": row["HLA"],
+                "Pred": float(row["Pred"]),
+                "T_half": float(row["Thalf(h)"]),
+                "Rank_Stab": float(row["%Rank_Stab"]),
+                "Bind_Level": bind_level_match.group(0) if bind_level_match else "-"
+            }
+        except (KeyError, TypeError, ValueError):
+            continue
+        if data_entry["Bind_Level"] in {"WB", "SB"}:
+            filtered_data.append(data_entry)
+        else:
+            additional_data.append(data_entry)
+
+    return _markdown_result(filtered_data, additional_data, header_line)
+
+
+def _markdown_result(filtered_data: list, additional_data: list, header_line: str) -> str:
     # 若无 WB/SB 但有其他数据，返回部分额外数据
     if not filtered_data and additional_data:
         filtered_data = additional_data[: min(5, len(additional_data))]
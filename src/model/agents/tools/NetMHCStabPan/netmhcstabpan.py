@@ -1,4 +1,3 @@
-import aiohttp
 import asyncio
 import json
 import sys
@@ -11,8 +10,15 @@ current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]                
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
+from src.model.agents.tools.NetMHCStabPan.filter_netmhcstabpan import filter_netmhcstabpan_table
+from src.utils.prediction_cache import cached_fasta_prediction
+from src.utils.remote_tool import call_remote_tool
 
 netmhcstabpan_url = CONFIG_YAML["TOOL"]["NETMHCSTABPAN"]["url"]
+RESULT_BUCKET = CONFIG_YAML["MINIO"]["netmhcstabpan_bucket"]
+# 结果表中用于缓存合并的列
+RESULT_COLUMNS = {"pos": "Pos", "allele": "HLA", "peptide": "peptide", "identity": "Identity", "bind_level": "BindLevel"}
+SUMMARY_TEMPLATE = "Protein {identity}. Allele {allele}. Number of high binders {strong}. Number of weak binders {weak}. Number of peptides {total}"
 
 @tool
 async def NetMHCstabpan(input_file: str,
@@ -40,12 +46,25 @@ async def NetMHCstabpan(input_file: str,
         "peptide_length": peptide_length
     }
 
-    timeout = aiohttp.ClientTimeout(total=60)
     try:
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(netmhcstabpan_url, json=payload) as response:
-                response.raise_for_status()
-                return await response.json()
+        async def call_upstream(upstream_input: str) -> str:
+            return await call_remote_tool("NetMHCstabpan", netmhcstabpan_url, {**payload, "input_file": upstream_input})
+
+        # 所有滑窗肽段均已缓存的序列不再发给上游，结果与上游返回的结果表合并
+        return await cached_fasta_prediction(
+            "NetMHCstabpan",
+            input_file,
+            alleles=[allele.strip() for allele in mhc_allele.split(",") if allele.strip()],
+            lengths=[int(length) for length in str(peptide_length).split(",") if length.strip()],
+            call_upstream=call_upstream,
+            result_bucket=RESULT_BUCKET,
+            columns=RESULT_COLUMNS,
+            summary_template=SUMMARY_TEMPLATE,
+            pos_base=0,
+            params={"high_threshold_of_bp": high_threshold_of_bp, "low_threshold_of_bp": low_threshold_of_bp},
+            summary_per_record=False,
+            content_builder=filter_netmhcstabpan_table,
+        )
     except Exception as e:
         print("发生异常类型：", type(e).__name__)
         print("异常信息：", str(e))
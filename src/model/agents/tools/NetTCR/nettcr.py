@@ -1,4 +1,3 @@
-import aiohttp
 import asyncio
 import json
 import sys
@@ -11,6 +10,7 @@ current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]                
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
+from src.utils.remote_tool import call_remote_tool
 
 nettcr_url = CONFIG_YAML["TOOL"]["NETTCR"]["url"]
 
@@ -28,12 +28,8 @@ async def NetTCR(input_file: str) -> str:
         "input_file": input_file
     }
 
-    timeout = aiohttp.ClientTimeout(total=120)
     try:
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(nettcr_url, json=payload) as response:
-                response.raise_for_status()
-                return await response.json()
+        return await call_remote_tool("NetTCR", nettcr_url, payload)
     except Exception as e:
         print("发生异常类型：", type(e).__name__)
         print("异常信息：", str(e))
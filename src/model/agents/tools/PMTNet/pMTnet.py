@@ -1,12 +1,9 @@
 import asyncio
 import json
 import sys
-import os
 import re
-import uuid
 import itertools
 import pandas as pd
-import aiohttp
 import traceback
 
 from minio import Minio
@@ -16,18 +13,18 @@ from langchain_core.tools import tool
 from urllib.parse import urlparse
 from typing import List, Dict, Optional
 
-from src.utils.minio_utils import upload_file_to_minio,download_from_minio_uri
 current_file = Path(__file__).resolve()
 current_script_dir = current_file.parent
 project_root = current_file.parents[5]
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
+from src.utils.async_storage import run_storage_op
+from src.utils.candidates import record_dedup, unique_keys
+from src.utils.fasta import read_fasta_sequences
+from src.utils.inline_payload import stage_tool_input
+from src.utils.remote_tool import call_remote_tool
 
 pmtnet_url = CONFIG_YAML["TOOL"]["PMTNET"]["url"]
-upload_dir = CONFIG_YAML["TOOL"]["PMTNET"]["upload_dir"]
-download_dir = CONFIG_YAML["TOOL"]["PMTNET"]["download_dir"]
-os.makedirs(upload_dir, exist_ok=True)
-os.makedirs(download_dir, exist_ok=True)
 
 # MinIO 配置:
 MINIO_CONFIG = CONFIG_YAML["MINIO"]
@@ -39,38 +36,13 @@ def extract_antigen_sequences(input_file) -> List[str]:
 
     if not (isinstance(input_file, str) and input_file.startswith("minio://")):
         raise ValueError("输入必须是MinIO路径 (格式: minio://bucket/path)")
-    local_path = None
-    try:
-        # 从MinIO下载文件
-        local_path = download_from_minio_uri(input_file, download_dir)
-        
-        sequences = []
-        current_seq = ""
-        with open(local_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith(">"):
-                    if current_seq:  # 保存上一个序列
-                        sequences.append(current_seq)
-                        current_seq = ""
-                else:
-                    current_seq += line
-            
-            if current_seq:  # 添加最后一个序列
-                sequences.append(current_seq)
-        
-        if not sequences:
-            raise ValueError("FASTA文件中未找到有效肽序列")
-            
-        return sequences
+    # 共享的流式FASTA解析器，直接读取MinIO对象，不落地临时文件
+    sequences = read_fasta_sequences(input_file)
+    
+    if not sequences:
+        raise ValueError("FASTA文件中未找到有效肽序列")
         
-    finally:
-        # 确保删除临时文件
-        if local_path and os.path.exists(local_path):
-            try:
-                os.remove(local_path)
-            except Exception as e:
-                raise(f"警告: 无法删除临时文件 {local_path}: {e}")
+    return sequences
     
 
 # def load_antigen_hla_pairs(input_source) -> List[Dict[str, str]]:
@@ -151,6 +123,7 @@ def prepare_pmtnet_input(
     input_file=str,
     mhc_alleles: Optional[List[str]] = None,
 ) -> str:
+    """构建 pMTnet 输入 CSV 内容（CDR3 × 抗原 × HLA）"""
     # if isinstance(uploaded_file, str) and uploaded_file.startswith("minio://"):
     #     if uploaded_file.lower().endswith((".fa", ".fasta", ".fas")):
     #         if not cdr3_list:
@@ -171,8 +144,15 @@ def prepare_pmtnet_input(
     #                 "HLA": pair["HLA"]
     #             })
     # else:
+    # 同一肽段在FASTA中按分型重复出现，只对唯一的 CDR3 × 抗原 × HLA 组合打分
     antigen_list = extract_antigen_sequences(input_file)
-    for cdr3, antigen, hla in itertools.product(cdr3_list, antigen_list, mhc_alleles):
+    unique_cdr3, unique_antigens, unique_alleles = unique_keys(cdr3_list), unique_keys(antigen_list), unique_keys(mhc_alleles)
+    record_dedup(
+        "pMTnet",
+        len(cdr3_list) * len(antigen_list) * len(mhc_alleles),
+        len(unique_cdr3) * len(unique_antigens) * len(unique_alleles),
+    )
+    for cdr3, antigen, hla in itertools.product(unique_cdr3, unique_antigens, unique_alleles):
         rows.append({
             "CDR3": cdr3,
             "Antigen": antigen,
@@ -180,15 +160,7 @@ def prepare_pmtnet_input(
         })
 
     df = pd.DataFrame(rows)
-    tmp_file = f"{upload_dir}/pmtnet_input_{uuid.uuid4()}.csv"
-    df.to_csv(tmp_file, index=False)
-
-    try:
-        object_name = f"inputs/{uuid.uuid4()}.csv"
-        return upload_file_to_minio(tmp_file,MINIO_BUCKET,object_name)
-    finally:
-        if os.path.exists(tmp_file):
-            os.remove(tmp_file)
+    return df.to_csv(index=False)
 
 
 @tool
@@ -214,19 +186,21 @@ async def pMTnet(
         str: pMTnet 服务返回的 JSON 格式结果
     """
     try:
-        input_file_path = prepare_pmtnet_input(
+        input_csv = await run_storage_op(
+                "pmtnet.prepare_input",
+                prepare_pmtnet_input,
                 cdr3_list=cdr3_list,
                 input_file=input_file,
                 mhc_alleles=mhc_alleles,
             )
+        # 小输入直接内联在请求体中；否则按内容寻址上传，相同的输入CSV复用同一个对象
+        input_file_path = await stage_tool_input(
+            "pMTnet", input_csv, MINIO_BUCKET, suffix=".csv", content_type="text/csv", content_addressed=True
+        )
         
-        timeout = aiohttp.ClientTimeout(total=30)
         payload = {"input_file_dir_minio": input_file_path}
     
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(pmtnet_url, json=payload) as response:
-                response.raise_for_status()
-                return await response.json()
+        return await call_remote_tool("pMTnet", pmtnet_url, payload)
     
     except Exception as e:
         print("发生异常类型：", type(e).__name__)
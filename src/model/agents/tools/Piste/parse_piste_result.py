@@ -5,7 +5,6 @@ import requests
 import sys
 
 from config import CONFIG_YAML
-from minio import Minio
 from minio.error import S3Error
 from pathlib import Path
 from urllib.parse import urlparse
@@ -14,20 +13,7 @@ current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]
 sys.path.append(str(project_root))
 from src.utils.log import logger
-
-# MinIO 配置
-MINIO_CONFIG = CONFIG_YAML["MINIO"]
-MINIO_ENDPOINT = MINIO_CONFIG["endpoint"]
-MINIO_ACCESS_KEY = os.getenv("ACCESS_KEY")
-MINIO_SECRET_KEY = os.getenv("SECRET_KEY")
-MINIO_SECURE = MINIO_CONFIG.get("secure", False)
-
-minio_client = Minio(
-    MINIO_ENDPOINT,
-    access_key=MINIO_ACCESS_KEY,
-    secret_key=MINIO_SECRET_KEY,
-    secure=MINIO_SECURE
-)
+from src.utils.minio_utils import download_from_minio_uri
 
 output_dir = CONFIG_YAML["TOOL"]["PISTE"]["output_tmp_piste_dir"]
 os.makedirs(output_dir, exist_ok=True)
@@ -52,13 +38,9 @@ def download_file_from_minio(minio_path: str, local_dir: str, local_file_name: s
         local_file_path = local_dir_path / \
             (local_file_name or Path(object_name).name)
 
-        if local_file_path.exists():
-            logger.info(f"File {local_file_path} already exists.")
-            return str(local_file_path)
-
+        # 经download_from_minio_uri的磁盘缓存读取，对象更新（ETag变化）后会重新下载
         logger.info(f"Downloading {minio_path} to {local_file_path}...")
-        minio_client.fget_object(
-            bucket_name, object_name, str(local_file_path))
+        download_from_minio_uri(minio_path, str(local_file_path))
         logger.info(f"Downloaded {minio_path} to {local_file_path}")
         return str(local_file_path)
 
@@ -76,22 +58,13 @@ def download_file_from_minio(minio_path: str, local_dir: str, local_file_name: s
         raise
 
 
-def check_minio_connection():
-    try:
-        minio_client.list_buckets()
-        return True
-    except S3Error as e:
-        print(f"MinIO连接或bucket操作失败: {e}")
-        return False
-
 def parse_piste_result(minio_path: str) -> str:
     """
     解析 MinIO 上的 PISTE 结果文件，返回按 predicted_score 降序排序后的 Markdown 表格。
     若结果超过 7 行，仅返回前 7 行，并附加提示信息。
     """
     # 下载文件内容
-    if check_minio_connection():
-        result_file_path = download_file_from_minio(minio_path, output_dir)
+    result_file_path = download_file_from_minio(minio_path, output_dir)
     
 # 解析文件内容
     try:
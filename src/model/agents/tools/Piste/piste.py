@@ -1,10 +1,7 @@
 import json
-import aiohttp
 import asyncio
-import os
 import sys
 import traceback
-import tempfile
 
 
 from langchain_core.tools import tool
@@ -12,54 +9,29 @@ from pathlib import Path
 import pandas as pd
 from typing import Optional,List
 
-from src.utils.minio_utils import upload_file_to_minio,download_from_minio_uri
-from src.utils.log import logger
 current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]                
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
+from src.utils.async_storage import run_storage_op
+from src.utils.fasta import read_fasta_sequences
+from src.utils.inline_payload import stage_tool_input
+from src.utils.remote_tool import call_remote_tool
 
 piste_url = CONFIG_YAML["TOOL"]["PISTE"]["url"]
-download_dir = CONFIG_YAML["TOOL"]["PISTE"]["output_tmp_piste_dir"]
 minio_bucket = CONFIG_YAML["MINIO"]["piste_bucket"]
 
 def extract_antigen_sequences(input_file) -> List[str]:
 
     if not (isinstance(input_file, str) and input_file.startswith("minio://")):
         raise ValueError("输入必须是MinIO路径 (格式: minio://bucket/path)")
-    local_path = None
-    try:
-        # 从MinIO下载文件
-        local_path = download_from_minio_uri(input_file, download_dir)
-        
-        sequences = []
-        current_seq = ""
-        with open(local_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith(">"):
-                    if current_seq:  # 保存上一个序列
-                        sequences.append(current_seq)
-                        current_seq = ""
-                else:
-                    current_seq += line
-            
-            if current_seq:  # 添加最后一个序列
-                sequences.append(current_seq)
-        
-        if not sequences:
-            raise ValueError("FASTA文件中未找到有效肽序列")
-            
-        return sequences
+    # 共享的流式FASTA解析器，直接读取MinIO对象，不落地临时文件
+    sequences = read_fasta_sequences(input_file)
     
+    if not sequences:
+        raise ValueError("FASTA文件中未找到有效肽序列")
         
-    finally:
-        # 确保删除临时文件
-        if local_path and os.path.exists(local_path):
-            try:
-                os.remove(local_path)
-            except Exception as e:
-                raise(f"警告: 无法删除临时文件 {local_path}: {e}")
+    return sequences
     
 def normalize_hla_alleles(allele_list):
     normalized = []
@@ -120,13 +92,11 @@ async def PISTE(
     # 验证输入长度是否一致
     if len(cdr3_list) != len(mhc_alleles):
         raise ValueError("cdr3_list和mhc_alleles长度必须一致")
-    peptides = extract_antigen_sequences(input_file)
+    peptides = await run_storage_op("piste.extract_antigens", extract_antigen_sequences, input_file)
     if len(peptides) != len(cdr3_list):
         raise ValueError(f"FASTA文件中的肽序列数量({len(peptides)})与CDR3序列数量({len(cdr3_list)})不匹配")
  #兼容各种hla写法   
     mhc_alleles = normalize_hla_alleles(mhc_alleles)
-    # 创建临时CSV文件
-    temp_csv = None
     try:
         # 创建DataFrame
         df = pd.DataFrame({
@@ -135,14 +105,9 @@ async def PISTE(
             "HLA_type": mhc_alleles
         })
         
-        # 创建临时文件
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as temp_file:
-            temp_csv = temp_file.name
-            df.to_csv(temp_file, index=False)
-
-        minio_path = upload_file_to_minio(
-            local_file_path=temp_csv,
-            bucket_name=minio_bucket,
+        # 小输入直接内联在请求体中，否则上传内存中的CSV内容
+        minio_path = await stage_tool_input(
+            "PISTE", df.to_csv(index=False), minio_bucket, suffix=".csv", content_type="text/csv"
         )
         
         payload = {"input_file_dir_minio": minio_path}
@@ -153,11 +118,7 @@ async def PISTE(
         if antigen_type:
             payload["antigen_type"] = antigen_type
 
-        timeout = aiohttp.ClientTimeout(total=30)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(piste_url, json=payload) as response:
-                response.raise_for_status()
-                return await response.json()
+        return await call_remote_tool("PISTE", piste_url, payload)
 
     except Exception as e:
         print("发生异常类型：", type(e).__name__)
@@ -167,13 +128,6 @@ async def PISTE(
             "type": "text",
             "content": f"调用远程 PISTE 服务失败: {type(e).__name__} - {str(e)}"
         }, ensure_ascii=False)
-    finally:
-        # 清理临时CSV文件
-        if temp_csv and os.path.exists(temp_csv):
-            try:
-                os.remove(temp_csv)
-            except Exception as e:
-                logger.warning(f"删除临时CSV文件失败: {e}")
 
 #  测试入口（本地运行）
 if __name__ == "__main__":
@@ -14,7 +14,6 @@ import uuid
 import warnings
 
 from collections import Counter
-from minio import Minio
 from minio.error import S3Error
 from pathlib import Path
 from sklearn.metrics import confusion_matrix
@@ -28,25 +27,13 @@ project_root = current_file.parents[5]
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
 from src.utils.log import logger
-from utils.minio_utils import upload_file_to_minio
+from src.utils.minio_utils import upload_file_to_minio
 
 sys.path.append('/mnt/softwares/PISTE')
 from Model.PISTE import Transformer
 # MinIO 配置:
 MINIO_CONFIG = CONFIG_YAML["MINIO"]
-MINIO_ENDPOINT = MINIO_CONFIG["endpoint"]
-MINIO_ACCESS_KEY = os.getenv("ACCESS_KEY")
-MINIO_SECRET_KEY = os.getenv("SECRET_KEY")
 MINIO_BUCKET = MINIO_CONFIG["piste_bucket"]
-MINIO_SECURE = MINIO_CONFIG.get("secure", False)
-
-# 初始化 MinIO 客户端
-minio_client = Minio(
-    MINIO_ENDPOINT,
-    access_key=MINIO_ACCESS_KEY,
-    secret_key=MINIO_SECRET_KEY,
-    secure=MINIO_SECURE
-)
 
 
 parser = argparse.ArgumentParser(usage = 'TCR-ANTIGEN-HLA binding prediction')
@@ -248,9 +235,7 @@ object_name = f"{uuid.uuid4()}_PISTE_results.csv"
 output_file_to_local = f"{args.output}/{object_name}"
 predict_data.to_csv(output_file_to_local, index=0)
 
-#upload to minio
-if not minio_client.bucket_exists(MINIO_BUCKET):
-    minio_client.make_bucket(MINIO_BUCKET)
+#upload to minio（upload_file_to_minio内部确保桶存在）
 minio_path = upload_file_to_minio(output_file_to_local,MINIO_BUCKET,object_name)
 if minio_path.startswith("minio://") :
     try:
@@ -1,10 +1,8 @@
 import re
-import pandas as pd
 from pathlib import Path
-from openpyxl.styles import Alignment
-from openpyxl import load_workbook
 
 from src.utils.log import logger
+from src.utils.xlsx_export import write_xlsx
 
 def save_excel(output_path_txt: str, output_dir: str, output_filename: str) -> bool:
     """
@@ -53,32 +51,9 @@ def save_excel(output_path_txt: str, output_dir: str, output_filename: str) -> b
         headers = data[0]
         rows = data[1:]
         
-        # 创建DataFrame
-        df = pd.DataFrame(rows, columns=headers)
-
-        # 准备输出路径
+        # 准备输出路径并流式写入Excel文件（列宽按前若干行估算）
         output_path = Path(output_dir) / output_filename
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-
-        # 写入Excel文件
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name="Results", index=False)
-            
-            # 获取workbook和worksheet对象
-            workbook = writer.book
-            worksheet = writer.sheets["Results"]
-            
-            # 调整列宽
-            for column in worksheet.columns:
-                max_length = max(
-                    len(str(cell.value)) if cell.value else 0
-                    for cell in column
-                )
-                adjusted_width = max_length + 2
-                worksheet.column_dimensions[column[0].column_letter].width = adjusted_width
-
-            # 显式保存文件
-            workbook.save(output_path)
+        write_xlsx(output_path, headers, rows)
 
         logger.info(f"Excel文件已成功保存至: {output_path}")
         return True
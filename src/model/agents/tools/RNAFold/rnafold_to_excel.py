@@ -1,10 +1,12 @@
 import os
 import pandas as pd
 from src.utils.log import logger
+from src.utils.result_tables import EXCEL_EXPORT, save_parquet
+from src.utils.xlsx_export import dataframe_rows, write_xlsx
 
 def save_excel(output: str, output_dir: str, output_filename: str) -> None:
     """
-    将特定格式的序列数据保存为Excel文件
+    将特定格式的序列数据保存为Excel文件，并在旁边写出同名的Parquet文件
     
     参数:
         output: 包含序列数据的字符串，格式如示例
@@ -72,8 +74,10 @@ def save_excel(output: str, output_dir: str, output_filename: str) -> None:
         # 创建DataFrame
         df = pd.DataFrame(data)
         
-        # 保存到Excel
-        df.to_excel(file_path, index=False)
+        # 机器读取的结果写为同名Parquet，Excel仅作为给用户的导出
+        parquet_path = save_parquet(df, file_path)
+        if EXCEL_EXPORT or parquet_path is None:
+            write_xlsx(file_path, list(df.columns), dataframe_rows(df), sheet_name="Sheet1")
     
     except pd.errors.EmptyDataError:
         error_msg = "无有效数据可保存，DataFrame为空"
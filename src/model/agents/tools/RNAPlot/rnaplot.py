@@ -21,6 +21,7 @@
 # # 将项目根目录添加到 sys.path
 # sys.path.append(str(project_root))
 # from config import CONFIG_YAML
+from src.utils.remote_tool import call_remote_tool
 
 # # MinIO 配置:
 # MINIO_CONFIG = CONFIG_YAML["MINIO"]
@@ -288,7 +289,6 @@
 # #     print("工具结果:", tool_result)
 
 
-import aiohttp
 import asyncio
 import json
 import sys
@@ -320,12 +320,8 @@ async def RNAPlot(
         "input_file": input_file,
     }
 
-    timeout = aiohttp.ClientTimeout(total=30)
     try:
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(rnaplot_url, json=payload) as response:
-                response.raise_for_status()
-                return await response.json()
+        return await call_remote_tool("RNAPlot", rnaplot_url, payload)
     except Exception as e:
         print("发生异常类型：", type(e).__name__)
         print("异常信息：", str(e))
@@ -1,4 +1,3 @@
-import aiohttp
 import asyncio
 import json
 import os
@@ -13,11 +12,13 @@ from minio.error import S3Error
 from langchain_core.tools import tool
 from pathlib import Path
 
-from utils.minio_utils import upload_file_to_minio
 current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]                
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
+from src.utils.async_storage import run_storage_op
+from src.utils.minio_utils import upload_bytes_to_minio
+from src.utils.remote_tool import call_remote_tool
 from src.utils.log import logger
 load_dotenv()
 
@@ -27,7 +28,6 @@ MOLLY_BUCKET = MINIO_CONFIG["molly_bucket"]
 
 
 transphla_url = CONFIG_YAML["TOOL"]["TRANSPHLA"]["url"]
-transphla_input_tmp_dir = CONFIG_YAML["TOOL"]["TRANSPHLA"]["input_tmp_dir"]
 hla_peptide_mapping_path = CONFIG_YAML["TOOL"]["TRANSPHLA"]["hla_peptide_mapping_path"]
 
 def generate_fasta(hla_list: List[str]):
@@ -45,26 +45,23 @@ def generate_fasta(hla_list: List[str]):
     # 1. 加载映射库
     with open(hla_peptide_mapping_path) as f:
         hla_map = json.load(f)
-    output_path = f"{transphla_input_tmp_dir}/{uuid.uuid4().hex}_output.fasta"
-
-    # 2. 处理并写入FASTA
-    with open(output_path, 'w') as out:
-        for i, hla in enumerate(hla_list):
-            if hla in hla_map:
-                peptide = hla_map[hla]
-                # 如果不是最后一个条目，才加换行符
-                line_end = "\n" if i < len(hla_list) - 1 else ""
-                out.write(f">{hla}\n{peptide}{line_end}")
-            else:
-                logger.warning(f"No peptide mapping found for {hla}")
-
-    # 3. FASTA写入minio存储系统中
+
+    # 2. 在内存中生成FASTA内容
+    records = []
+    for i, hla in enumerate(hla_list):
+        if hla in hla_map:
+            peptide = hla_map[hla]
+            # 如果不是最后一个条目，才加换行符
+            line_end = "\n" if i < len(hla_list) - 1 else ""
+            records.append(f">{hla}\n{peptide}{line_end}")
+        else:
+            logger.warning(f"No peptide mapping found for {hla}")
+
+    # 3. FASTA直接写入minio存储系统中
     try:
         random_id = uuid.uuid4().hex
         new_object_name = f"{random_id}_hlas.fasta"
-        upload_file_to_minio(output_path,MOLLY_BUCKET,new_object_name)
-        Path(output_path).unlink(missing_ok=True)
-        return f"minio://molly/{new_object_name}"
+        return upload_bytes_to_minio("".join(records), MOLLY_BUCKET, new_object_name, content_type="text/plain")
 
     except S3Error as e:
         raise Exception(f"MinIO操作失败: {e}")
@@ -95,7 +92,7 @@ async def TransPHLA_AOMP(
     返回：
     - JSON 字符串，包含 URL 及 markdown 格式的输出说明
     """
-    alleles=generate_fasta(alleles)
+    alleles=await run_storage_op("transphla.generate_fasta", generate_fasta, alleles)
     payload = {
         "peptide_file": peptide_file,
         "hla_file": alleles,
@@ -104,12 +101,8 @@ async def TransPHLA_AOMP(
         "cut_peptide": cut_peptide
     }
 
-    timeout = aiohttp.ClientTimeout(total=60)
     try:
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(transphla_url, json=payload) as response:
-                response.raise_for_status()
-                return await response.json()
+        return await call_remote_tool("TransPHLA_AOMP", transphla_url, payload)
     except Exception as e:
         print("发生异常类型：", type(e).__name__)
         print("异常信息：", str(e))
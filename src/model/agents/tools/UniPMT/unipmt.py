@@ -23,7 +23,7 @@ sys.path.append(str(project_root))
 from src.utils.log import logger
 from config import CONFIG_YAML
 from src.model.agents.tools.UniPMT.parse_unipmt_results import parse_unipmt_results
-from utils.minio_utils import upload_file_to_minio,download_from_minio_uri
+from src.utils.minio_utils import upload_file_to_minio,download_from_minio_uri
 
 # UniPMT 工具配置
 unipmt_script = CONFIG_YAML["TOOL"]["UNIPMT"]["script_path"]
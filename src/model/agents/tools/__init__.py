@@ -1,24 +1,11 @@
-from .MRNAVaccineResearchFlow.mrnaVaccineResearchFlow import mRNAResearchAndProduction
-from .NetMHCPan.netmhcpan import NetMHCpan
-from .ESM3.esm3 import ESM3
-from .FastaFileProcessor.fastaFileProcessor import FastaFileProcessor
-from .NetMHCStabPan.netmhcstabpan import NetMHCstabpan
-from .ExtractPeptide.extract_peptide_sequence import ExtractPeptides
-from .PMTNet.pMTnet import pMTnet
-from .NetChop.netchop import NetChop
-from .Prime.prime import Prime
-from .NetTCR.nettcr import NetTCR
-from .NetCTLPan.netctlpan import NetCTLpan
-from .Piste.piste import PISTE
-from .ImmuneApp.immuneapp import ImmuneApp
-from .RAG.query import  RAG
-from .BigMHC.bigmhc import BigMHC_EL, BigMHC_IM
-from .TransPHLA.transphla import TransPHLA_AOMP
-from .ImmuneAppNeo.immuneapp_neo import ImmuneApp_Neo
-from .UniPMT.unipmt import UniPMT
-from .CleavagePeptide.cleavage_peptide import NetChop_Cleavage
-from .NeoAntigenSelection.neoanigenselection import NeoAntigenSelection
-from .LinearDesign.lineardesign import LinearDesign
-from .RNAFold.rnafold import RNAFold 
-from .RNAPlot.rnaplot import RNAPlot 
-from .NeoantigenSelectionIntroduce.neoantigenselectionintroduce import NeoantigenSelectionIntroduce
\ No newline at end of file
+# 工具模块按需导入：`from src.model.agents.tools import NetMHCpan` 时才加载对应模块，
+# 模块路径、参数默认值等注册信息见 registry.TOOL_REGISTRY
+from .registry import TOOL_REGISTRY, ToolSpec, get_tool, get_tools, get_tool_specs, get_import_times
+
+__all__ = list(TOOL_REGISTRY) + ["TOOL_REGISTRY", "ToolSpec", "get_tool", "get_tools", "get_tool_specs", "get_import_times"]
+
+
+def __getattr__(name):
+    if name in TOOL_REGISTRY:
+        return get_tool(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
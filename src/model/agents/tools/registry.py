@@ -0,0 +1,216 @@
+import importlib
+import sys
+import threading
+import time
+
+from dataclasses import dataclass, field
+from langchain_core.tools import BaseTool
+from typing import Any, Dict, List, Optional
+
+from src.utils.log import logger
+
+IMMUNEAPP_DEFAULT_ALLELES = ["HLA-A*01:01", "HLA-A*02:01", "HLA-A*03:01", "HLA-B*07:02"]
+
+
+@dataclass
+class ToolSpec:
+    """
+    工具注册信息：工具名、所在模块（首次使用时才导入）、参数默认值及结果写回的state字段
+
+    Attributes:
+        name: 工具名，与LLM tool_call中的name一致
+        module: 工具所在模块（相对于src.model.agents.tools），例如 ".NetMHCPan.netmhcpan"
+        attr: 模块中的工具对象名，默认与name相同
+        arg_defaults: 从tool_call["args"]中读取的参数及其默认值（None表示无默认值）
+        fixed_args: 不从LLM参数中读取、固定传入的参数
+        state_key: 工具结果写回的AgentState字段，例如 "netmhcpan_result"
+    """
+    name: str
+    module: str
+    attr: Optional[str] = None
+    arg_defaults: Dict[str, Any] = field(default_factory=dict)
+    fixed_args: Dict[str, Any] = field(default_factory=dict)
+    state_key: Optional[str] = None
+    import_seconds: Optional[float] = field(default=None, init=False)
+    _tool: Optional[BaseTool] = field(default=None, init=False, repr=False)
+
+    @property
+    def tool(self) -> BaseTool:
+        if self._tool is None:
+            with _load_lock:
+                if self._tool is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self.module, __package__)
+                    self._tool = getattr(module, self.attr or self.name)
+                    # 导入子包会把同名子包（如 tools.NetChop）绑定到包属性上，这里与原先的
+                    # `from .NetChop.netchop import NetChop` 一致，改为绑定工具对象
+                    setattr(sys.modules[__package__], self.name, self._tool)
+                    self.import_seconds = time.perf_counter() - start
+                    logger.info(f"Tool {self.name} loaded from {self.module} in {self.import_seconds:.3f}s")
+        return self._tool
+
+    @property
+    def loaded(self) -> bool:
+        return self._tool is not None
+
+    def build_args(self, call_args: Dict[str, Any]) -> Dict[str, Any]:
+        args = {name: call_args.get(name, default) for name, default in self.arg_defaults.items()}
+        args.update(self.fixed_args)
+        return args
+
+
+# 多个线程（同步工具内的asyncio.run）可能同时触发首次加载
+_load_lock = threading.RLock()
+
+_NETMHC_ARGS = {
+    "input_file": None,
+    "mhc_allele": "HLA-A02:01",
+    "high_threshold_of_bp": 0.5,
+    "low_threshold_of_bp": 2.0,
+    "peptide_length": "9",
+}
+
+TOOL_REGISTRY: Dict[str, ToolSpec] = {spec.name: spec for spec in [
+    ToolSpec(
+        "mRNAResearchAndProduction",
+        ".MRNAVaccineResearchFlow.mrnaVaccineResearchFlow",
+        fixed_args={"input": "mRNA疫苗的研究生产过程"},
+    ),
+    ToolSpec("NetMHCpan", ".NetMHCPan.netmhcpan", arg_defaults=dict(_NETMHC_ARGS), state_key="netmhcpan_result"),
+    ToolSpec("ESM3", ".ESM3.esm3", arg_defaults={"protein_sequence": None}, state_key="esm3_result"),
+    ToolSpec("FastaFileProcessor", ".FastaFileProcessor.fastaFileProcessor", arg_defaults={"input_file": None}),
+    ToolSpec(
+        "NetMHCstabpan",
+        ".NetMHCStabPan.netmhcstabpan",
+        arg_defaults=dict(_NETMHC_ARGS),
+        state_key="netmhcstabpan_result",
+    ),
+    ToolSpec("ExtractPeptides", ".ExtractPeptide.extract_peptide_sequence", arg_defaults={"peptide_list": None}),
+    ToolSpec(
+        "pMTnet",
+        ".PMTNet.pMTnet",
+        arg_defaults={"cdr3_list": None, "input_file": None, "mhc_alleles": None},
+        state_key="pmtnet_result",
+    ),
+    ToolSpec(
+        "NetChop",
+        ".NetChop.netchop",
+        arg_defaults={"input_file": None, "cleavage_site_threshold": 0.5},
+        state_key="netchop_result",
+    ),
+    ToolSpec("Prime", ".Prime.prime", arg_defaults={"input_file": None, "mhc_alleles": None}, state_key="prime_result"),
+    ToolSpec("NetTCR", ".NetTCR.nettcr", arg_defaults={"input_file": None}, state_key="nettcr_result"),
+    ToolSpec(
+        "NetCTLpan",
+        ".NetCTLPan.netctlpan",
+        arg_defaults={
+            "input_file": None,
+            "mhc_allele": "HLA-A02:01",
+            "weight_of_clevage": 0.225,
+            "weight_of_tap": 0.025,
+            "peptide_length": "9",
+        },
+        state_key="netctlpan_result",
+    ),
+    ToolSpec(
+        "PISTE",
+        ".Piste.piste",
+        arg_defaults={
+            "cdr3_list": None,
+            "input_file": None,
+            "mhc_alleles": None,
+            "model_name": "random",
+            "threshold": 0.5,
+            "antigen_type": "MT",
+        },
+        state_key="piste_result",
+    ),
+    ToolSpec(
+        "ImmuneApp",
+        ".ImmuneApp.immuneapp",
+        arg_defaults={
+            "input_file_dir": None,
+            "alleles": IMMUNEAPP_DEFAULT_ALLELES,
+            "use_binding_score": True,
+            "peptide_lengths": [8, 9],
+        },
+        state_key="immuneapp_result",
+    ),
+    ToolSpec("RAG", ".RAG.query"),
+    ToolSpec(
+        "BigMHC_EL",
+        ".BigMHC.bigmhc",
+        arg_defaults={"input_file": None, "mhc_alleles": None},
+        state_key="bigmhc_el_result",
+    ),
+    ToolSpec(
+        "BigMHC_IM",
+        ".BigMHC.bigmhc",
+        arg_defaults={"input_file": None, "mhc_alleles": None},
+        state_key="bigmhc_im_result",
+    ),
+    ToolSpec(
+        "TransPHLA_AOMP",
+        ".TransPHLA.transphla",
+        arg_defaults={
+            "peptide_file": None,
+            "alleles": None,
+            "threshold": 0.5,
+            "cut_length": 10,
+            "cut_peptide": True,
+        },
+        state_key="transphla_aomp_result",
+    ),
+    ToolSpec(
+        "ImmuneApp_Neo",
+        ".ImmuneAppNeo.immuneapp_neo",
+        arg_defaults={"input_file": None, "alleles": IMMUNEAPP_DEFAULT_ALLELES},
+        state_key="immuneapp_neo_result",
+    ),
+    ToolSpec("UniPMT", ".UniPMT.unipmt", arg_defaults={"input_file": None}, state_key="unipmt_result"),
+    ToolSpec(
+        "NetChop_Cleavage",
+        ".CleavagePeptide.cleavage_peptide",
+        arg_defaults={"input_file": None, "cleavage_site_threshold": 0.5, "lengths": [8, 9, 10], "output_format": "fasta"},
+        state_key="netchop_cleavage_result",
+    ),
+    ToolSpec(
+        "NeoAntigenSelection",
+        ".NeoAntigenSelection.neoanigenselection",
+        arg_defaults={"input_file": None, "mhc_allele": None, "cdr3_sequence": None},
+    ),
+    ToolSpec(
+        "LinearDesign",
+        ".LinearDesign.lineardesign",
+        arg_defaults={"minio_input_fasta": None, "lambda_val": 1.0},
+        state_key="lineardesign_result",
+    ),
+    ToolSpec("RNAFold", ".RNAFold.rnafold", arg_defaults={"input_file": None}, state_key="rnafold_result"),
+    ToolSpec("RNAPlot", ".RNAPlot.rnaplot", arg_defaults={"input_file": None}, state_key="rnaplot_result"),
+    ToolSpec("NeoantigenSelectionIntroduce", ".NeoantigenSelectionIntroduce.neoantigenselectionintroduce"),
+]}
+
+
+def get_tool(name: str) -> BaseTool:
+    """按工具名获取工具对象，首次调用时才导入其模块"""
+    if name not in TOOL_REGISTRY:
+        raise KeyError(f"Unknown tool: {name}")
+    return TOOL_REGISTRY[name].tool
+
+
+def get_tools(names: List[str]) -> List[BaseTool]:
+    return [get_tool(name) for name in names]
+
+
+def get_tool_specs(names: List[str]) -> Dict[str, ToolSpec]:
+    """返回给定工具名的ToolSpec映射，供agent的should_continue分发使用（不触发模块导入）"""
+    return {name: TOOL_REGISTRY[name] for name in names}
+
+
+def get_import_times() -> Dict[str, Optional[float]]:
+    """
+    各工具模块的导入耗时（秒），未加载的工具为None
+
+    同一模块中的多个工具（如BigMHC_EL/BigMHC_IM）只有先加载的一个计入模块导入耗时
+    """
+    return {name: spec.import_seconds for name, spec in TOOL_REGISTRY.items()}
@@ -1,13 +1,12 @@
 import json
 from typing import Tuple, List
-from minio import Minio
-from io import BytesIO
 from src.model.agents.tools.NetChop.netchop import NetChop
 from src.model.agents.tools.CleavagePeptide.cleavage_peptide import NetChop_Cleavage
 import pandas as pd
 from minio.error import S3Error
+from src.utils.async_storage import aread_text
 
-async def step1_protein_cleavage(input_file: str, writer, mrna_design_process_result: list, minio_client: Minio) -> tuple:
+async def step1_protein_cleavage(input_file: str, writer, mrna_design_process_result: list) -> tuple:
     """
     第一步：蛋白切割位点预测
     
@@ -68,11 +67,7 @@ async def step1_protein_cleavage(input_file: str, writer, mrna_design_process_re
     
     # 验证文件内容
     try:
-        path_without_prefix = cleavage_result_file_path[len("minio://"):]
-        bucket_name, object_name = path_without_prefix.split("/", 1)
-        response = minio_client.get_object(bucket_name, object_name)
-        bytes_io = BytesIO(response.read())
-        netchop_final_result_str = bytes_io.getvalue().decode('utf-8')
+        netchop_final_result_str = await aread_text(cleavage_result_file_path)
         
         if len(netchop_final_result_str) == 0:
             raise Exception("蛋白切割位点阶段未找到符合长度和剪切条件的肽段")
@@ -1,11 +1,9 @@
+import asyncio
 import json
 import sys
 import uuid
 
 from typing import Tuple, List
-from minio import Minio
-from io import BytesIO
-import pandas as pd
 from pathlib import Path
 from minio.error import S3Error
 
@@ -16,7 +14,12 @@ current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
+from src.utils.async_storage import run_storage_op
+from src.utils.candidates import current_dedup, pair_fasta, read_provenance, unique_keys
+from src.utils.result_tables import read_result_table
+from src.utils.write_behind import persist_behind
 
+MOLLY_BUCKET = CONFIG_YAML["MINIO"]["molly_bucket"]
 NEOANTIGEN_CONFIG = CONFIG_YAML["TOOL"]["NEOANTIGEN_SELECTION"]
 BIND_LEVEL_ALTERNATIVE = NEOANTIGEN_CONFIG["bind_level_alternative"]  
 BIGMHC_EL_THRESHOLD = NEOANTIGEN_CONFIG["bigmhc_el_threshold"]
@@ -26,8 +29,7 @@ async def step2_pmhc_binding_affinity(
     netchop_final_result_str:str,
     mhc_allele: List[str],
     writer,
-    mrna_design_process_result: list,
-    minio_client: Minio
+    mrna_design_process_result: list
 ) -> tuple:
     """
     第二步：pMHC结合亲和力预测
@@ -66,6 +68,21 @@ async def step2_pmhc_binding_affinity(
 """
     writer(STEP2_DESC1)
     mrna_design_process_result.append(STEP2_DESC1)
+
+    # 切割结果只含唯一肽段，NetMHCpan对唯一肽段 × 等位基因打分；
+    # 来源映射载入紧凑候选表，统计去重前的候选数（每一次出现 × 等位基因）
+    dedup = current_dedup()
+    try:
+        provenance = await run_storage_op("candidates.read_provenance", read_provenance, cleavage_result_file_path)
+    except S3Error as e:
+        raise Exception(f"无法从MinIO读取切割肽段来源映射: {str(e)}")
+    if not provenance.empty:
+        await asyncio.to_thread(dedup.set_provenance, provenance)
+        dedup.record(
+            "NetMHCpan",
+            len(provenance) * len(mhc_allele),
+            len(dedup.store.peptides) * len(unique_keys(mhc_allele)),
+        )
     
     # 运行NetMHCpan工具
     netmhcpan_result = await NetMHCpan.arun({
@@ -82,13 +99,11 @@ async def step2_pmhc_binding_affinity(
     
     netmhcpan_result_file_path = netmhcpan_result_dict["url"]
     
-    # 读取NetMHCpan结果文件
+    # 读取NetMHCpan结果文件（优先读取Parquet，只加载筛选需要的列）
     try:
-        path_without_prefix = netmhcpan_result_file_path[len("minio://"):]
-        bucket_name, object_name = path_without_prefix.split("/", 1)
-        response = minio_client.get_object(bucket_name, object_name)
-        excel_data = BytesIO(response.read())
-        df = pd.read_excel(excel_data)
+        df = await run_storage_op(
+            "read_result_table", read_result_table, netmhcpan_result_file_path, ["Identity", "Peptide", "MHC", "BindLevel"]
+        )
     except S3Error as e:
         raise Exception(f"无法从MinIO读取NetMHCpan结果文件: {str(e)}")
     
@@ -118,29 +133,26 @@ pMHC结合亲和力预测结果已获取，结果如下：\n
         mrna_design_process_result.append(STEP2_DESC3)
         raise Exception("pMHC结合亲和力预测阶段结束，NetMHCpan工具未找到高亲和力肽段")
     
-    # 构建FASTA内容
-    fasta_content = []
-    for idx, row in sb_peptides.iterrows():
-        identity = row['Identity']
-        peptide = row['Peptide']
-        fasta_content.append(f">{identity}")
-        fasta_content.append(peptide)
-    
-    netmhcpan_fasta_str = "\n".join(fasta_content)
+    dedup.add_scores("NetMHCpan", sb_peptides, "Peptide", "MHC", ["BindLevel"])
+
+    # 同一肽段会在多个等位基因、多个切割肽段的子窗口中重复出现；BigMHC_EL只对唯一的
+    # (peptide, allele) 打分：每个组合写一条 >peptide|allele 记录，等位基因列表与记录一一对应
+    sb_peptide_list = dedup.alive_peptides()
+    el_pairs = dedup.add_pairs(
+        [peptide for peptide in sb_peptide_list for _ in mhc_allele],
+        [allele for _ in sb_peptide_list for allele in mhc_allele],
+    )
+    dedup.record("BigMHC_EL", len(sb_peptides) * len(mhc_allele), len(el_pairs))
+    netmhcpan_fasta_str = pair_fasta(el_pairs)
     
-    # 上传FASTA文件到MinIO
+    # 后台上传FASTA文件到MinIO，BigMHC_EL在本进程内直接读取内存中的内容
     uuid_name = str(uuid.uuid4())
     netmhcpan_result_fasta_filename = f"{uuid_name}_netmhcpan.fasta"
     
     try:
-        fasta_bytes = netmhcpan_fasta_str.encode('utf-8')
-        fasta_stream = BytesIO(fasta_bytes)
-        minio_client.put_object(
-            "molly",
-            netmhcpan_result_fasta_filename,
-            data=fasta_stream,
-            length=len(fasta_bytes),
-            content_type='text/plain'
+        netmhcpan_result_file_path = await persist_behind(
+            netmhcpan_fasta_str, MOLLY_BUCKET, netmhcpan_result_fasta_filename,
+            content_type='text/plain', stage="step2.netmhcpan_fasta"
         )
     except Exception as e:
         raise Exception(f"上传FASTA文件失败: {str(e)}")
@@ -164,10 +176,9 @@ f"""
     mrna_design_process_result.append(STEP2_DESC4)
 
     # 运行BigMHC_EL工具
-    netmhcpan_result_file_path = f"minio://molly/{netmhcpan_result_fasta_filename}"
     bigmhc_el_result = await BigMHC_EL.arun({
         "input_file": netmhcpan_result_file_path,
-        "mhc_alleles": mhc_allele
+        "mhc_alleles": [allele for _, allele in el_pairs]
     })
     
     try:
@@ -180,13 +191,11 @@ f"""
     
     bigmhc_el_result_file_path = bigmhc_el_result_dict["url"]
     
-    # 读取BigMHC_EL结果文件
+    # 读取BigMHC_EL结果文件（优先读取Parquet，只加载筛选需要的列）
     try:
-        path_without_prefix = bigmhc_el_result_file_path[len("minio://"):]
-        bucket_name, object_name = path_without_prefix.split("/", 1)
-        response = minio_client.get_object(bucket_name, object_name)
-        excel_data = BytesIO(response.read())
-        df = pd.read_excel(excel_data)
+        df = await run_storage_op(
+            "read_result_table", read_result_table, bigmhc_el_result_file_path, ["pep", "mhc", "BigMHC_EL"]
+        )
     except S3Error as e:
         raise Exception(f"无法从MinIO读取BigMHC_EL结果文件: {str(e)}")
     
@@ -217,38 +226,20 @@ f"""
         mrna_design_process_result.append(STEP2_DESC6)
         raise Exception(f"未找到高亲和力肽段(BigMHC_EL ≥ {BIGMHC_EL_THRESHOLD})")
     
-    # 构建FASTA文件内容
-    fasta_content = []
-    for idx, row in high_affinity_peptides.iterrows():
-        peptide = row['pep']
-        mhc_allele = row['mhc']
-        
-        # 标准化MHC等位基因格式
-        if 'HLA-' in mhc_allele and '*' not in mhc_allele.split('HLA-')[1][:2]:
-            parts = mhc_allele.split('HLA-')
-            if len(parts) > 1:
-                allele_part = parts[1]
-                if len(allele_part) > 1 and allele_part[1].isdigit():
-                    mhc_allele = f"HLA-{allele_part[0]}*{allele_part[1:]}"
-        
-        fasta_content.append(f">{peptide}|{mhc_allele}")
-        fasta_content.append(peptide)
-    
-    bigmhc_el_fasta_str = "\n".join(fasta_content)
+    dedup.add_scores("BigMHC_EL", high_affinity_peptides, "pep", "mhc", ["BigMHC_EL"])
+
+    # 构建FASTA文件内容：候选表中通过筛选的组合，每个 (peptide, allele) 一条记录，
+    # 等位基因统一为 HLA-A*02:01 写法
+    bigmhc_el_fasta_str = pair_fasta(dedup.alive_pairs())
     
-    # 上传FASTA文件到MinIO
+    # 后台上传FASTA文件到MinIO，下一步直接使用内存中的bigmhc_el_fasta_str
     uuid_name = str(uuid.uuid4())
     bigmhc_el_result_fasta_filename = f"{uuid_name}_bigmhc_el.fasta"
     
     try:
-        fasta_bytes = bigmhc_el_fasta_str.encode('utf-8')
-        fasta_stream = BytesIO(fasta_bytes)
-        minio_client.put_object(
-            "molly",
-            bigmhc_el_result_fasta_filename,
-            data=fasta_stream,
-            length=len(fasta_bytes),
-            content_type='text/plain'
+        bigmhc_el_fasta_path = await persist_behind(
+            bigmhc_el_fasta_str, MOLLY_BUCKET, bigmhc_el_result_fasta_filename,
+            content_type='text/plain', stage="step2.bigmhc_el_fasta"
         )
     except Exception as e:
         raise Exception(f"上传FASTA文件失败: {str(e)}")
@@ -276,4 +267,4 @@ f"""
 #        # writer(chunk.content) 
 #        continue
     
-    return f"minio://molly/{bigmhc_el_result_fasta_filename}", bigmhc_el_fasta_str
+    return bigmhc_el_fasta_path, bigmhc_el_fasta_str
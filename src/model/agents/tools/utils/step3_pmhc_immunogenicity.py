@@ -1,18 +1,16 @@
 import json
-import re
 import sys
 import uuid
-import tempfile
 
-from typing import Tuple, List
-from minio import Minio
-from io import BytesIO
-import pandas as pd
+from typing import List, Optional, Tuple
 from pathlib import Path
 from minio.error import S3Error
 from langgraph.config import get_stream_writer
 from src.model.agents.tools.BigMHC.bigmhc import BigMHC_IM
-from src.utils.minio_utils import download_from_minio_uri
+from src.utils.async_storage import aread_text, run_storage_op
+from src.utils.candidates import current_dedup, fasta_pairs, pair_fasta, record_dedup, unique_keys
+from src.utils.result_tables import read_result_table
+from src.utils.write_behind import persist_behind
 
 current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]
@@ -25,47 +23,46 @@ NEOANTIGEN_CONFIG = CONFIG_YAML["TOOL"]["NEOANTIGEN_SELECTION"]
 BIGMHC_IM_THRESHOLD = NEOANTIGEN_CONFIG["bigmhc_im_threshold"]
 
 
-def extract_hla_and_peptides_from_fasta(
-    fasta_minio_path: str
+async def extract_hla_and_peptides_from_fasta(
+    fasta_minio_path: str,
+    fasta_text: Optional[str] = None
 ) -> Tuple[str, List[str]]:
     """
-    解析 >peptide|HLA 格式的 FASTA 文件，返回原始FASTA的minio地址和所有HLA分型列表
+    解析 >peptide|HLA 格式的 FASTA 文件，返回只含唯一 (peptide, HLA) 组合的FASTA地址和与记录一一对应的HLA分型列表
+
+    BigMHC在肽段数与分型数相同时逐条配对，因此只对FASTA中出现的组合打分，
+    不再对全部肽段 × 全部分型做笛卡尔积；有重复组合时去重后重新写出FASTA。
     
     参数:
     - fasta_minio_path: MinIO路径，例如 minio://bucket/file.fasta
+    - fasta_text: 上一步在内存中的FASTA内容(可选)，提供时不再从MinIO读取
     
     返回:
-    - tuple: (原始FASTA的minio地址, 所有HLA分型的列表)
+    - tuple: (FASTA的minio地址, 与记录一一对应的HLA分型列表)
     """
-    local_path = tempfile.NamedTemporaryFile(delete=True).name
-    download_from_minio_uri(fasta_minio_path, local_path)
-
-    hla_list = []
-    HLA_REGEX = re.compile(r"^(HLA-)?[ABC]\*\d{2}:\d{2}$")
+    if fasta_text is None:
+        fasta_text = await aread_text(fasta_minio_path)
 
-    with open(local_path, "r") as f:
-        for line in f:
-            line = line.strip()
-            if line.startswith(">") and "|" in line:
-                parts = line[1:].split("|", 1)
-                if len(parts) == 2 and HLA_REGEX.fullmatch(parts[1].strip()):
-                    hla = parts[1].strip()
-                    if not hla.startswith("HLA-"):
-                        hla = "HLA-" + hla
-                    if hla not in hla_list:
-                        hla_list.append(hla)
-
-    if not hla_list:
+    pairs = fasta_pairs(fasta_text)
+    if not pairs:
         raise ValueError("未能从FASTA中解析出合法的HLA分型")
 
-    return (fasta_minio_path, hla_list)
+    unique_pairs = unique_keys(pairs)
+    record_dedup("BigMHC_IM", len(pairs) * len(unique_keys(allele for _, allele in pairs)), len(unique_pairs))
+    if len(unique_pairs) < len(pairs):
+        fasta_minio_path = await persist_behind(
+            pair_fasta(unique_pairs), MOLLY_BUCKET, f"{uuid.uuid4()}_bigmhc_im_input.fasta",
+            content_type='text/plain', stage="step3.bigmhc_im_input_fasta"
+        )
+
+    return (fasta_minio_path, [allele for _, allele in unique_pairs])
 
 
 async def step3_pmhc_immunogenicity(
     bigmhc_el_result_file_path: str,
     writer,
     mrna_design_process_result: list,
-    minio_client: Minio
+    bigmhc_el_fasta_str: Optional[str] = None
 ) -> tuple:
     """
     第三步：pMHC免疫原性预测
@@ -74,6 +71,7 @@ async def step3_pmhc_immunogenicity(
         bigmhc_el_result_file_path: BigMHC_EL结果文件路径
         writer: 流式输出写入器
         mrna_design_process_result: 过程结果记录列表
+        bigmhc_el_fasta_str: 第二步在内存中的FASTA内容(可选)，避免重新下载解析
     
     Returns:
         tuple: (bigmhc_im_result_file_path, fasta_str) 结果文件路径和FASTA内容
@@ -86,7 +84,7 @@ async def step3_pmhc_immunogenicity(
     writer(STEP3_DESC1)
     mrna_design_process_result.append(STEP3_DESC1)
 
-    input_file,mhc_alleles = extract_hla_and_peptides_from_fasta(bigmhc_el_result_file_path)
+    input_file,mhc_alleles = await extract_hla_and_peptides_from_fasta(bigmhc_el_result_file_path, bigmhc_el_fasta_str)
     
     # 运行BigMHC_IM工具
     bigmhc_im_result = await BigMHC_IM.arun({
@@ -117,13 +115,11 @@ pMHC免疫原性预测预测结果已获取，结果如下：\n
     writer(STEP3_DESC2)
     mrna_design_process_result.append(STEP3_DESC2)
     
-    # 读取BigMHC_IM结果文件
+    # 读取BigMHC_IM结果文件（优先读取Parquet，只加载筛选需要的列）
     try:
-        path_without_prefix = bigmhc_im_result_file_path[len("minio://"):]
-        bucket_name, object_name = path_without_prefix.split("/", 1)
-        response = minio_client.get_object(bucket_name, object_name)
-        excel_data = BytesIO(response.read())
-        df = pd.read_excel(excel_data)
+        df = await run_storage_op(
+            "read_result_table", read_result_table, bigmhc_im_result_file_path, ["pep", "mhc", "BigMHC_IM"]
+        )
     except S3Error as e:
         raise Exception(f"无法从MinIO读取BigMHC_IM结果文件: {str(e)}")
     
@@ -147,29 +143,20 @@ pMHC免疫原性预测预测结果已获取，结果如下：\n
         mrna_design_process_result.append(STEP3_DESC4)
         raise Exception(f"未找到高免疫原性肽段(BigMHC_IM ≥ {BIGMHC_IM_THRESHOLD})")
     
-    # 构建FASTA文件内容
-    fasta_content = []
-    for idx, row in high_affinity_peptides.iterrows():
-        peptide = row['pep']
-        mhc_allele = row['mhc']
-        fasta_content.append(f">{peptide}|{mhc_allele}")
-        fasta_content.append(peptide)
-    
-    bigmhc_im_fasta_str = "\n".join(fasta_content)
+    dedup = current_dedup()
+    dedup.add_scores("BigMHC_IM", high_affinity_peptides, "pep", "mhc", ["BigMHC_IM"])
+
+    # 构建FASTA文件内容：候选表中通过筛选的组合，每个 (peptide, allele) 一条记录
+    bigmhc_im_fasta_str = pair_fasta(dedup.alive_pairs())
     
-    # 上传FASTA文件到MinIO
+    # 后台上传FASTA文件到MinIO，下一步直接使用内存中的bigmhc_im_fasta_str
     uuid_name = str(uuid.uuid4())
     bigmhc_im_result_fasta_filename = f"{uuid_name}_bigmhc_im.fasta"
     
     try:
-        fasta_bytes = bigmhc_im_fasta_str.encode('utf-8')
-        fasta_stream = BytesIO(fasta_bytes)
-        minio_client.put_object(
-            MOLLY_BUCKET,
-            bigmhc_im_result_fasta_filename,
-            data=fasta_stream,
-            length=len(fasta_bytes),
-            content_type='text/plain'
+        bigmhc_im_fasta_path = await persist_behind(
+            bigmhc_im_fasta_str, MOLLY_BUCKET, bigmhc_im_result_fasta_filename,
+            content_type='text/plain', stage="step3.bigmhc_im_fasta"
         )
     except Exception as e:
         raise Exception(f"上传FASTA文件失败: {str(e)}")
@@ -185,4 +172,4 @@ pMHC免疫原性预测预测结果已获取，结果如下：\n
     writer(STEP3_DESC5)
     mrna_design_process_result.append(STEP3_DESC5)
     
-    return f"minio://molly/{bigmhc_im_result_fasta_filename}", bigmhc_im_fasta_str
+    return bigmhc_im_fasta_path, bigmhc_im_fasta_str
@@ -1,18 +1,17 @@
 import json
 import sys
 import uuid
-import re
-import os
 
-from typing import List, Optional
-from typing import List, Tuple
-from minio import Minio
+from typing import List, Optional, Tuple
 from io import BytesIO
 import pandas as pd
 from pathlib import Path
 from langgraph.config import get_stream_writer
 from src.model.agents.tools.PMTNet.pMTnet import pMTnet
-from src.utils.minio_utils import download_from_minio_uri
+from src.utils.async_storage import aread_bytes, aread_text
+from src.utils.candidates import current_dedup, pair_fasta
+from src.utils.fasta import fasta_hla_alleles, iter_fasta
+from src.utils.write_behind import persist_behind
 
 current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]
@@ -23,15 +22,16 @@ MINIO_CONFIG = CONFIG_YAML["MINIO"]
 MOLLY_BUCKET = MINIO_CONFIG["molly_bucket"]
 NEOANTIGEN_CONFIG = CONFIG_YAML["TOOL"]["NEOANTIGEN_SELECTION"]
 PMTNET_RANK = NEOANTIGEN_CONFIG["pmtnet_rank"]
-download_dir = CONFIG_YAML["TOOL"]["PMTNET"]["download_dir"]
 
-def extract_hla_from_fasta(
+async def extract_hla_from_fasta(
     uploaded_fasta_path: str,
+    fasta_text: Optional[str] = None,
 ) -> Tuple[str, List[str]]:
     """
     从FASTA文件中提取HLA分型列表
     参数:
         uploaded_fasta_path: MinIO文件路径 (格式: minio://bucket/path/to/file.fasta)
+        fasta_text: 上一步在内存中的FASTA内容(可选)，提供时不再从MinIO读取
     返回:
         tuple: (原始文件路径, HLA分型列表)
     异常:
@@ -44,31 +44,12 @@ def extract_hla_from_fasta(
     if not uploaded_fasta_path.lower().endswith((".fa", ".fasta", ".fas")):
         raise ValueError("文件不是FASTA格式 (.fa/.fasta/.fas)")
 
-    # HLA格式正则表达式
-    hla_pattern = re.compile(r"^[ABC]\*\d{2}:\d{2}$")
-    hla_list = []
-    # 下载文件（如果需要）
-    local_path = download_from_minio_uri(uploaded_fasta_path, download_dir)
+    # 读取文件内容（不落地本地文件）
+    if fasta_text is None:
+        fasta_text = await aread_text(uploaded_fasta_path)
     
-    try:
-        with open(local_path, "r") as f:
-            current_hla = ""
-            for line in f:
-                line = line.strip()
-                if line.startswith(">") and "|" in line:
-                    # 解析HLA部分
-                    hla_part = line.split("|")[-1].strip()
-                    if hla_part.startswith("HLA-"):
-                        hla_part = hla_part[4:]
-                    
-                    # 验证并记录HLA分型
-                    if hla_pattern.fullmatch(hla_part):
-                        if hla_part not in hla_list:  # 避免重复
-                            hla_list.append(hla_part)
-    
-    finally:
-        if os.path.exists(local_path):
-            os.remove(local_path)
+    # 解析 >peptide|HLA 表头，按首次出现顺序去重，不带HLA-前缀
+    hla_list = fasta_hla_alleles(iter_fasta(fasta_text), hla_prefix=False)
     
     return uploaded_fasta_path, hla_list
 
@@ -78,7 +59,7 @@ async def step4_pmhc_tcr_interaction(
     cdr3_sequence: List[str],
     writer,
     mrna_design_process_result: list,
-    minio_client: Minio
+    bigmhc_im_fasta_str: Optional[str] = None
 ) -> str:
     """
     第四步：pMHC-TCR相互作用预测
@@ -88,6 +69,7 @@ async def step4_pmhc_tcr_interaction(
         cdr3_sequence: CDR3序列列表
         writer: 流式输出写入器
         mrna_design_process_result: 过程结果记录列表
+        bigmhc_im_fasta_str: 第三步在内存中的FASTA内容(可选)，避免重新下载解析
     
     Returns:
         str: mRNA输入文件路径
@@ -117,7 +99,7 @@ f"""
     writer(STEP4_DESC2)
     mrna_design_process_result.append(STEP4_DESC2)
 
-    input_file,mhc_alleles=extract_hla_from_fasta(bigmhc_im_result_file_path)
+    input_file,mhc_alleles=await extract_hla_from_fasta(bigmhc_im_result_file_path, bigmhc_im_fasta_str)
     # 运行pMTnet工具
     pmtnet_result = await pMTnet.arun({
         "cdr3_list": cdr3_sequence,
@@ -150,10 +132,7 @@ f"""
     
     # 读取pMTnet结果文件
     try:
-        path_without_prefix = pmtnet_result_file_path[len("minio://"):]
-        bucket_name, object_name = path_without_prefix.split("/", 1)
-        response = minio_client.get_object(bucket_name, object_name)
-        csv_data = BytesIO(response.read())
+        csv_data = BytesIO(await aread_bytes(pmtnet_result_file_path))
         df = pd.read_csv(csv_data)
     except Exception as e:
         raise Exception(f"读取pMTnet结果文件失败: {str(e)}")
@@ -171,30 +150,25 @@ f"""
     
     if high_rank_peptides.empty:
         raise Exception(f"未找到Rank ≥ {PMTNET_RANK}的高亲和力肽段")
+
+    # 同一 (Antigen, HLA) 对多条CDR3打分，候选表保留Rank最高的一条
+    dedup = current_dedup()
+    dedup.add_scores(
+        "pMTnet", high_rank_peptides.sort_values('Rank', ascending=False, kind="stable"),
+        "Antigen", "HLA", ["CDR3", "Rank"]
+    )
+
+    # 构建FASTA文件内容：候选表中通过筛选的组合，每个 (peptide, allele) 一条记录
+    pmtnet_fasta_str = pair_fasta(dedup.alive_pairs())
     
-    # 构建FASTA文件内容
-    fasta_content = []
-    for idx, row in high_rank_peptides.iterrows():
-        peptide = row['Antigen']
-        mhc_allele = row['HLA']
-        fasta_content.append(f">{peptide}|{mhc_allele}")
-        fasta_content.append(peptide)
-    
-    pmtnet_fasta_str = "\n".join(fasta_content)
-    
-    # 上传FASTA文件到MinIO
+    # 后台上传FASTA文件到MinIO，第五步在本进程内直接读取内存中的内容
     uuid_name = str(uuid.uuid4())
     pmtnet_filtered_fasta_filename = f"{uuid_name}_pmtnet_filtered.fasta"
     
     try:
-        fasta_bytes = pmtnet_fasta_str.encode('utf-8')
-        fasta_stream = BytesIO(fasta_bytes)
-        minio_client.put_object(
-            MOLLY_BUCKET,
-            pmtnet_filtered_fasta_filename,
-            data=fasta_stream,
-            length=len(fasta_bytes),
-            content_type='text/plain'
+        pmtnet_filtered_fasta_path = await persist_behind(
+            pmtnet_fasta_str, MOLLY_BUCKET, pmtnet_filtered_fasta_filename,
+            content_type='text/plain', stage="step4.pmtnet_filtered_fasta"
         )
     except Exception as e:
         raise Exception(f"上传FASTA文件失败: {str(e)}")
@@ -210,4 +184,4 @@ f"""
     writer(STEP4_DESC5)
     mrna_design_process_result.append(STEP4_DESC5)
     
-    return f"minio://molly/{pmtnet_filtered_fasta_filename}"
\ No newline at end of file
+    return pmtnet_filtered_fasta_path
\ No newline at end of file
@@ -9,6 +9,7 @@ current_file = Path(__file__).resolve()
 project_root = current_file.parents[5]
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
+from src.utils.artifact_links import deliverable_uri
 
 MARKDOWN_DOWNLOAD_URL_PREFIX = CONFIG_YAML["TOOL"]["COMMON"]["markdown_download_url_prefix"]
 
@@ -104,7 +105,7 @@ async def step5_mrna_design(
 
     # 生成Markdown链接
     markdown_link = "\n"+"\n".join(
-        f"- [{file['name']}]({file['url']})" 
+        f"- [{file['name']}]({deliverable_uri(file['url'])})" 
         for file in files
     ) + "\n"
 
@@ -0,0 +1,131 @@
+import os
+import sys
+import threading
+
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from minio import Minio
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.minio_utils import (
+    MINIO_ACCESS_KEY,
+    MINIO_CONFIG,
+    MINIO_ENDPOINT,
+    MINIO_SECRET_KEY,
+    MINIO_SECURE,
+    split_minio_uri,
+)
+from src.utils.run_manifest import mark_deliverable
+
+
+ARTIFACT_LINKS_CONFIG = CONFIG_YAML.get("ARTIFACT_LINKS", {})
+# 预签名链接有效期（秒）；链接仅在客户端请求 /artifacts/link 时签发，不写入会话历史
+ARTIFACT_LINK_EXPIRES = ARTIFACT_LINKS_CONFIG.get("expires_seconds", 3600)
+ARTIFACT_LINK_MAX_EXPIRES = 7 * 24 * 3600
+# 客户端访问对象存储使用的地址（如经网关暴露的域名），为空时使用MINIO.endpoint
+ARTIFACT_PUBLIC_ENDPOINT = ARTIFACT_LINKS_CONFIG.get("public_endpoint") or MINIO_ENDPOINT
+ARTIFACT_PUBLIC_SECURE = ARTIFACT_LINKS_CONFIG.get("public_secure", MINIO_SECURE)
+# 签名使用的区域；设置后生成链接为纯本地计算，不再请求GetBucketLocation
+ARTIFACT_REGION = ARTIFACT_LINKS_CONFIG.get("region", "us-east-1")
+# /artifacts/link 允许签发的桶，默认为MINIO中配置的全部结果桶
+ARTIFACT_ALLOWED_BUCKETS = set(
+    ARTIFACT_LINKS_CONFIG.get("allowed_buckets")
+    or [value for key, value in MINIO_CONFIG.items() if key.endswith("_bucket")]
+)
+
+_signer: Optional[Minio] = None
+_signer_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"presigned": 0, "rejected": 0}
+
+
+def _get_signer() -> Minio:
+    # 签名中包含Host，因此用客户端实际访问的地址创建专用客户端，生成链接后不能再改写域名
+    global _signer
+    if _signer is None:
+        with _signer_lock:
+            if _signer is None:
+                _signer = Minio(
+                    ARTIFACT_PUBLIC_ENDPOINT,
+                    access_key=MINIO_ACCESS_KEY,
+                    secret_key=MINIO_SECRET_KEY,
+                    secure=ARTIFACT_PUBLIC_SECURE,
+                    region=ARTIFACT_REGION,
+                )
+    return _signer
+
+
+def _content_disposition(filename: str) -> str:
+    # 中文文件名按RFC 6266/5987编码，同时提供ASCII回退名
+    ascii_name = filename.encode("ascii", "ignore").decode() or "download"
+    ascii_name = ascii_name.replace('"', "")
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def presign_artifact(uri: str, filename: str = None, expires: int = None) -> str:
+    """
+    为MinIO中的结果文件生成短期有效的预签名下载链接
+
+    客户端直接从对象存储下载，支持Range请求与断点续传，不再经后端代理。
+
+    Args:
+        uri: MinIO路径 (格式: minio://bucket/object_name)
+        filename: 下载时保存的文件名，默认使用对象名
+        expires: 有效期（秒），默认ARTIFACT_LINKS.expires_seconds，最长7天
+
+    Returns:
+        str: 预签名的HTTP(S)地址
+
+    Raises:
+        ValueError: 无效的URI格式或桶不允许签发
+    """
+    bucket_name, object_name = split_minio_uri(uri)
+    if bucket_name not in ARTIFACT_ALLOWED_BUCKETS:
+        with _stats_lock:
+            _stats["rejected"] += 1
+        raise ValueError(f"不允许为桶 {bucket_name} 生成下载链接")
+    expires = min(int(expires or ARTIFACT_LINK_EXPIRES), ARTIFACT_LINK_MAX_EXPIRES)
+    filename = filename or os.path.basename(object_name)
+    url = _get_signer().presigned_get_object(
+        bucket_name,
+        object_name,
+        expires=timedelta(seconds=expires),
+        response_headers={"response-content-disposition": _content_disposition(filename)},
+    )
+    with _stats_lock:
+        _stats["presigned"] += 1
+    return url
+
+
+def deliverable_uri(uri: str) -> str:
+    """
+    把展示给用户下载的文件登记为交付物（运行清理时保留），返回写入消息中的地址
+
+    会话历史的保留时间远长于预签名链接的有效期，因此消息中只保存稳定的minio路径，
+    客户端下载时再通过 /artifacts/link 按需签发预签名链接（或由后端markdown_download代理下载）。
+
+    Args:
+        uri: MinIO路径
+
+    Returns:
+        str: 原始minio路径
+    """
+    mark_deliverable(uri)
+    return uri
+
+
+def get_artifact_link_stats() -> Dict[str, Any]:
+    """预签名链接的签发及拒绝次数"""
+    with _stats_lock:
+        stats = dict(_stats)
+    return {
+        "public_endpoint": ARTIFACT_PUBLIC_ENDPOINT,
+        "expires_seconds": ARTIFACT_LINK_EXPIRES,
+        **stats,
+    }
@@ -0,0 +1,193 @@
+import asyncio
+import contextvars
+import sys
+import threading
+import time
+
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.log import logger
+
+
+ASYNC_STORAGE_CONFIG = CONFIG_YAML.get("ASYNC_STORAGE", {})
+# 同时进行的MinIO操作上限（专用线程池大小），超出的操作排队等待，不占用事件循环
+STORAGE_MAX_WORKERS = ASYNC_STORAGE_CONFIG.get("max_workers", 16)
+# 每种操作保留最近N次耗时用于计算分位数
+STORAGE_LATENCY_WINDOW = ASYNC_STORAGE_CONFIG.get("latency_window", 512)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_op_stats: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"count": 0, "errors": 0, "bytes": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+_op_latencies: Dict[str, deque] = defaultdict(lambda: deque(maxlen=STORAGE_LATENCY_WINDOW))
+_pool_state = {"inflight": 0, "queued": 0}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # 与asyncio默认线程池隔离：大文件传输不会挤占同步工具、sqlite等其他to_thread任务
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=STORAGE_MAX_WORKERS, thread_name_prefix="minio-io")
+    return _executor
+
+
+def _record(op: str, seconds: float, size: int, failed: bool):
+    with _stats_lock:
+        stats = _op_stats[op]
+        stats["count"] += 1
+        stats["errors"] += int(failed)
+        stats["bytes"] += size
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        _op_latencies[op].append(seconds)
+
+
+def _result_size(result: Any) -> int:
+    if isinstance(result, (bytes, bytearray)):
+        return len(result)
+    return 0
+
+
+def submit_storage_op(op: str, func: Callable[..., Any], *args, **kwargs) -> Future:
+    """
+    将同步的MinIO操作提交到专用线程池并立即返回Future，统计方式同run_storage_op
+
+    返回的是线程安全的concurrent.futures.Future，不依赖调用方的事件循环：
+    工具内asyncio.run结束后，已提交的操作仍会执行完成（供后台写入使用）。
+    """
+    submitted = time.perf_counter()
+    with _stats_lock:
+        _pool_state["queued"] += 1
+
+    def run():
+        with _stats_lock:
+            _pool_state["queued"] -= 1
+            _pool_state["inflight"] += 1
+        started = time.perf_counter()
+        failed = True
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            with _stats_lock:
+                _pool_state["inflight"] -= 1
+            elapsed = time.perf_counter() - started
+            _record(op, elapsed, _result_size(result), failed)
+            wait = started - submitted
+            if wait > 1:
+                logger.warning(f"Storage op {op} waited {wait:.2f}s for a worker (max_workers={STORAGE_MAX_WORKERS})")
+
+    # 带上调用方的上下文（如当前运行清单），线程池中的上传同样能登记到所属运行
+    return _get_executor().submit(contextvars.copy_context().run, run)
+
+
+async def run_storage_op(op: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在专用的有界线程池中执行同步的MinIO操作，并记录该类操作的耗时
+
+    异步流水线步骤和工具封装中的所有MinIO读写都应经由此函数（或下方的a*便捷函数），
+    避免大文件传输阻塞事件循环、拖慢其他会话的SSE输出。
+
+    Args:
+        op: 操作名，用于分组统计，例如 "get_object"、"put_object"、"pmtnet.prepare_input"
+        func: 同步函数
+        *args, **kwargs: 传给func的参数
+
+    Returns:
+        Any: func的返回值
+    """
+    return await asyncio.wrap_future(submit_storage_op(op, func, *args, **kwargs))
+
+
+async def aread_bytes(uri: str) -> bytes:
+    from src.utils.minio_utils import read_minio_bytes
+
+    return await run_storage_op("get_object", read_minio_bytes, uri)
+
+
+async def aread_text(uri: str, encoding: str = "utf-8") -> str:
+    return (await aread_bytes(uri)).decode(encoding)
+
+
+async def aupload_bytes(
+    data: Union[bytes, str],
+    bucket_name: str,
+    minio_object_name: str = None,
+    suffix: str = "",
+    content_type: str = "application/octet-stream",
+    content_addressed: bool = None,
+) -> str:
+    from src.utils.minio_utils import upload_bytes_to_minio
+
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    uri = await run_storage_op(
+        "put_object", upload_bytes_to_minio, data, bucket_name, minio_object_name, suffix, content_type, content_addressed
+    )
+    # put_object的返回值是URI，字节数按上传内容单独累计
+    with _stats_lock:
+        _op_stats["put_object"]["bytes"] += len(data)
+    return uri
+
+
+async def adownload(uri: str, local_path: str = None) -> str:
+    from src.utils.minio_utils import download_from_minio_uri
+
+    return await run_storage_op("download", download_from_minio_uri, uri, local_path)
+
+
+async def aupload_file(
+    local_file_path: str,
+    bucket_name: str,
+    minio_object_name: str = None,
+    content_addressed: bool = None,
+) -> str:
+    from src.utils.minio_utils import upload_file_to_minio
+
+    return await run_storage_op(
+        "upload_file", upload_file_to_minio, local_file_path, bucket_name, minio_object_name, content_addressed
+    )
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def get_storage_stats() -> Dict[str, Any]:
+    """各MinIO操作的次数、错误数、字节数及耗时（平均/p50/p95/最大，毫秒），以及线程池占用情况"""
+    def ms(seconds: Optional[float]) -> Optional[float]:
+        return round(seconds * 1000, 2) if seconds is not None else None
+
+    with _stats_lock:
+        ops = {}
+        for op, stats in _op_stats.items():
+            latencies = list(_op_latencies[op])
+            ops[op] = {
+                "count": stats["count"],
+                "errors": stats["errors"],
+                "bytes": stats["bytes"],
+                "avg_ms": ms(stats["total_seconds"] / stats["count"]) if stats["count"] else None,
+                "p50_ms": ms(_percentile(latencies, 0.5)),
+                "p95_ms": ms(_percentile(latencies, 0.95)),
+                "max_ms": ms(stats["max_seconds"]),
+            }
+        return {
+            "max_workers": STORAGE_MAX_WORKERS,
+            "inflight": _pool_state["inflight"],
+            "queued": _pool_state["queued"],
+            "operations": ops,
+        }
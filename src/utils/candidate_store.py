@@ -0,0 +1,296 @@
+import re
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# HLA-A*02:01 / HLA-A02:01 / A*02:01 -> HLA-A*02:01
+_ALLELE_PATTERN = re.compile(r"^(?:HLA-)?([A-Z]+[0-9]*?)\*?(\d{2,3}:\d{2,3}.*)$")
+# 组合键中等位基因id所占的位数（最多65536个等位基因）
+_ALLELE_BITS = 16
+
+
+def allele_label(allele: str) -> str:
+    """等位基因的统一写法：HLA-A*02:01 / HLA-A02:01 / A*02:01 -> HLA-A*02:01；无法识别时只做去空白和大写"""
+    allele = str(allele).strip().upper()
+    match = _ALLELE_PATTERN.match(allele)
+    if match is None:
+        return allele
+    return f"HLA-{match.group(1)}*{match.group(2)}"
+
+
+def _as_bytes(values: Iterable[str]) -> np.ndarray:
+    array = np.asarray(list(values) if not isinstance(values, (np.ndarray, pd.Series)) else values, dtype=object)
+    if array.size == 0:
+        return np.empty(0, dtype="S1")
+    return np.char.encode(array.astype(str), "ascii")
+
+
+class Vocabulary:
+    """
+    字符串驻留表：排好序的定长字节数组，下标即id
+
+    新增字符串时与原数组合并排序，返回旧id到新id的映射（单调递增，已有的有序id数组映射后仍有序）。
+    """
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values = np.unique(_as_bytes(values))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    def add(self, values: Iterable[str]) -> Optional[np.ndarray]:
+        """加入字符串；词表有变化时返回旧id -> 新id的映射数组，否则返回None"""
+        encoded = np.unique(_as_bytes(values))
+        merged = np.union1d(self.values, encoded) if len(self.values) else encoded
+        if len(merged) == len(self.values):
+            return None
+        remap = np.searchsorted(merged, self.values).astype(np.int32)
+        self.values = merged
+        return remap
+
+    def lookup(self, values: Iterable[str]) -> np.ndarray:
+        """字符串 -> id，不存在时为-1"""
+        encoded = _as_bytes(values)
+        if not len(self.values) or not len(encoded):
+            return np.full(len(encoded), -1, dtype=np.int32)
+        index = np.minimum(np.searchsorted(self.values, encoded), len(self.values) - 1)
+        return np.where(self.values[index] == encoded, index, -1).astype(np.int32)
+
+    def strings(self, ids: np.ndarray) -> np.ndarray:
+        return np.char.decode(self.values[ids], "ascii").astype(object)
+
+
+class CandidateStore:
+    """
+    紧凑的候选表：肽段、等位基因、蛋白驻留为整数id，打分为定长numpy列，来源映射为偏移量
+
+    - 组合 (peptide, allele) 按组合键排序存放：pair_peptide(int32) / pair_allele(uint16)，alive标记通过当前筛选的组合
+    - 打分列：数值为float32（缺失为NaN），文本（如BindLevel、CDR3）为int32编码 + 类别表
+    - 来源映射按肽段id分组（CSR）：肽段i的全部出现为 occ_*[offsets[i]:offsets[i+1]]
+    """
+
+    def __init__(self):
+        self.peptides = Vocabulary()
+        self.alleles = Vocabulary()
+        self.pair_peptide = np.empty(0, dtype=np.int32)
+        self.pair_allele = np.empty(0, dtype=np.uint16)
+        self.alive = np.empty(0, dtype=bool)
+        self.columns: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, np.ndarray] = {}
+        # 来源映射
+        self.proteins = np.empty(0, dtype=object)
+        self.protein_mutations = np.empty(0, dtype=object)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.occ_protein = np.empty(0, dtype=np.int32)
+        self.occ_start = np.empty(0, dtype=np.int32)
+        self.occ_length = np.empty(0, dtype=np.int16)
+
+    def __len__(self) -> int:
+        return len(self.pair_peptide)
+
+    @property
+    def nbytes(self) -> int:
+        """数组部分占用的内存（蛋白名等类别表按Python字符串另计）"""
+        arrays = [
+            self.pair_peptide, self.pair_allele, self.alive, self.offsets,
+            self.occ_protein, self.occ_start, self.occ_length, *self.columns.values(),
+        ]
+        return self.peptides.nbytes + self.alleles.nbytes + sum(array.nbytes for array in arrays)
+
+    # ---- 来源映射 ----
+
+    @classmethod
+    def from_occurrences(cls, occurrences: pd.DataFrame) -> "CandidateStore":
+        """由切割肽段的全部出现（protein / start / length / sequence / mutation）构建来源映射"""
+        store = cls()
+        store.set_occurrences(occurrences)
+        return store
+
+    def set_occurrences(self, occurrences: pd.DataFrame):
+        """设置来源映射（在加入任何组合之前调用一次）"""
+        if occurrences.empty:
+            return
+        sequence_codes, sequences = self._factorize(occurrences['sequence'].astype(str))
+        self._add_peptides(sequences)
+        peptide_ids = self.peptides.lookup(sequences)[sequence_codes]
+        protein_codes, proteins = pd.factorize(occurrences['protein'].astype(str))
+        if 'mutation' in occurrences:
+            mutations = occurrences['mutation'].astype(str).groupby(protein_codes).first().reindex(range(len(proteins)))
+        else:
+            mutations = pd.Series([""] * len(proteins))
+        order = np.argsort(peptide_ids, kind="stable")
+        self.proteins = np.asarray(proteins, dtype=object)
+        self.protein_mutations = mutations.fillna("").to_numpy(dtype=object)
+        self.occ_protein = protein_codes[order].astype(np.int32)
+        self.occ_start = occurrences['start'].to_numpy(dtype=np.int32)[order]
+        self.occ_length = occurrences['length'].to_numpy(dtype=np.int16)[order]
+        counts = np.bincount(peptide_ids, minlength=len(self.peptides))
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+    def occurrence_count(self) -> int:
+        return len(self.occ_protein)
+
+    def _add_peptides(self, peptides: Iterable[str]):
+        remap = self.peptides.add(peptides)
+        if remap is None:
+            return
+        # 旧id按映射换成新id（单调，组合键顺序与出现分组不变），偏移量按新词表重建
+        self.pair_peptide = remap[self.pair_peptide] if len(self.pair_peptide) else self.pair_peptide
+        counts = np.zeros(len(self.peptides), dtype=np.int64)
+        counts[remap] = np.diff(self.offsets)
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+    def _add_alleles(self, alleles: Iterable[str]):
+        remap = self.alleles.add(alleles)
+        if remap is None:
+            return
+        if len(self.alleles) > 1 << _ALLELE_BITS:
+            raise ValueError(f"等位基因数超过上限 {1 << _ALLELE_BITS}")
+        self.pair_allele = remap[self.pair_allele].astype(np.uint16) if len(self.pair_allele) else self.pair_allele
+
+    # ---- 组合与打分 ----
+
+    def _keys(self, peptide_ids: np.ndarray, allele_ids: np.ndarray) -> np.ndarray:
+        return (peptide_ids.astype(np.int64) << _ALLELE_BITS) | allele_ids.astype(np.int64)
+
+    @staticmethod
+    def _factorize(values: Sequence[str], label=None) -> Tuple[np.ndarray, np.ndarray]:
+        """重复值只编码一次：返回 (每个值在唯一值中的下标, 唯一值)，label用于规范化唯一值"""
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        uniques = np.asarray(uniques, dtype=object)
+        if label is not None:
+            uniques = np.asarray([label(value) for value in uniques], dtype=object)
+        return codes, uniques
+
+    def _upsert_pairs(self, peptides: Sequence[str], alleles: Sequence[str]) -> np.ndarray:
+        """加入组合（已存在的不重复加入），返回每个输入组合在组合表中的下标"""
+        peptide_codes, unique_peptides = self._factorize(peptides)
+        allele_codes, unique_alleles = self._factorize(alleles, allele_label)
+        self._add_peptides(unique_peptides)
+        self._add_alleles(unique_alleles)
+        keys = self._keys(
+            self.peptides.lookup(unique_peptides)[peptide_codes],
+            self.alleles.lookup(unique_alleles)[allele_codes],
+        )
+        existing = self._keys(self.pair_peptide, self.pair_allele)
+        merged = np.union1d(existing, keys)
+        if len(merged) != len(existing):
+            position = np.searchsorted(merged, existing)
+            self.alive = self._scatter(self.alive, position, len(merged), False)
+            for name, values in self.columns.items():
+                self.columns[name] = self._scatter(values, position, len(merged), np.nan if values.dtype.kind == "f" else -1)
+            self.pair_peptide = (merged >> _ALLELE_BITS).astype(np.int32)
+            self.pair_allele = (merged & ((1 << _ALLELE_BITS) - 1)).astype(np.uint16)
+        return np.searchsorted(merged, keys)
+
+    @staticmethod
+    def _scatter(values: np.ndarray, position: np.ndarray, size: int, fill) -> np.ndarray:
+        scattered = np.full(size, fill, dtype=values.dtype)
+        scattered[position] = values
+        return scattered
+
+    def add_pairs(self, peptides: Sequence[str], alleles: Sequence[str]):
+        """登记待打分的组合并设为通过（如下一预测阶段的输入）"""
+        index = self._upsert_pairs(peptides, alleles)
+        self.alive[:] = False
+        self.alive[index] = True
+
+    def add_scores(self, df: pd.DataFrame, peptide_column: str, allele_column: str, score_columns: Sequence[str]):
+        """
+        合并一个预测阶段（已筛选）的结果：写入打分列，alive只保留该结果中的组合
+
+        同一组合有多行时保留第一行（调用方先按需要排序，如pMTnet保留Rank最高的CDR3）
+        """
+        df = df.drop_duplicates([peptide_column, allele_column])
+        peptides = df[peptide_column].astype(str).str.strip().to_numpy(dtype=object)
+        index = self._upsert_pairs(peptides, df[allele_column].to_numpy(dtype=object))
+        for column in score_columns:
+            values = df[column]
+            if pd.api.types.is_numeric_dtype(values):
+                target = self.columns.setdefault(column, np.full(len(self), np.nan, dtype=np.float32))
+                target[index] = values.to_numpy(dtype=np.float32)
+            else:
+                codes, categories = self._encode(column, values.astype(str).str.strip())
+                target = self.columns.setdefault(column, np.full(len(self), -1, dtype=np.int32))
+                target[index] = codes
+        self.alive[:] = False
+        self.alive[index] = True
+
+    def _encode(self, column: str, values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        known = self.categories.get(column, np.empty(0, dtype=object))
+        categories = pd.Index(known).append(pd.Index(values.unique())).unique()
+        self.categories[column] = np.asarray(categories, dtype=object)
+        return categories.get_indexer(values).astype(np.int32), self.categories[column]
+
+    # ---- 读取 ----
+
+    def alive_index(self) -> np.ndarray:
+        return np.flatnonzero(self.alive)
+
+    def alive_peptides(self) -> List[str]:
+        """通过当前筛选的唯一肽段"""
+        return self.peptides.strings(np.unique(self.pair_peptide[self.alive])).tolist()
+
+    def alive_pairs(self) -> List[Tuple[str, str]]:
+        """通过当前筛选的 (peptide, allele) 组合"""
+        index = self.alive_index()
+        return list(zip(
+            self.peptides.strings(self.pair_peptide[index]).tolist(),
+            self.alleles.strings(self.pair_allele[index]).tolist(),
+        ))
+
+    def column_values(self, name: str, index: np.ndarray) -> np.ndarray:
+        values = self.columns[name][index]
+        if name in self.categories:
+            categories = np.append(self.categories[name], None)
+            return categories[values]
+        return values
+
+    def fan_out(self) -> pd.DataFrame:
+        """
+        通过筛选的组合展开到每一次出现，每个 (组合, 蛋白位置) 一行
+
+        来源映射中没有的肽段（如NetMHCpan在切割肽段内部取的子窗口）保留一行，来源列为空。
+        """
+        index = self.alive_index()
+        peptide_ids = self.pair_peptide[index]
+        counts = self.offsets[peptide_ids + 1] - self.offsets[peptide_ids]
+        repeats = np.maximum(counts, 1)
+        rows = np.repeat(np.arange(len(index)), repeats)
+        within = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        occurrence = np.repeat(self.offsets[peptide_ids], repeats) + within
+        has_source = np.repeat(counts > 0, repeats)
+        occurrence = np.where(has_source, occurrence, 0)
+
+        table = pd.DataFrame({
+            'peptide': self.peptides.strings(peptide_ids[rows]),
+            'allele': self.alleles.strings(self.pair_allele[index][rows]),
+        })
+        for name in self.columns:
+            table[name] = self.column_values(name, index)[rows]
+        if len(self.occ_protein):
+            protein = self.occ_protein[occurrence]
+            start = self.occ_start[occurrence]
+            length = self.occ_length[occurrence]
+            table['protein'] = np.where(has_source, self.proteins[protein], None)
+            table['start'] = pd.arrays.IntegerArray(start, ~has_source)
+            table['end'] = pd.arrays.IntegerArray((start + length - 1).astype(np.int32), ~has_source)
+            table['mutation'] = np.where(has_source, self.protein_mutations[protein], None)
+        return table
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "peptides": len(self.peptides),
+            "alleles": len(self.alleles),
+            "pairs": len(self),
+            "alive": int(self.alive.sum()),
+            "occurrences": self.occurrence_count(),
+            "nbytes": self.nbytes,
+        }
@@ -0,0 +1,252 @@
+import asyncio
+import io
+import sys
+import threading
+
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from minio.error import S3Error
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.async_storage import run_storage_op
+from src.utils.candidate_store import CandidateStore
+from src.utils.cleavage import PEPTIDE_COLUMNS
+from src.utils.fasta import decode_peptide_hla_header, iter_fasta
+from src.utils.log import logger
+from src.utils.run_manifest import mark_deliverable
+
+
+CANDIDATES_CONFIG = CONFIG_YAML.get("CANDIDATES", {})
+# 流程结束时是否把最终打分按来源展开（每个蛋白位置一行）并发布为结果表
+PROVENANCE_TABLE = CANDIDATES_CONFIG.get("provenance_table", True)
+
+# 切割肽段结果旁的来源映射：xxx_cleavage_result.fasta -> xxx_cleavage_result.provenance.csv
+PROVENANCE_SUFFIX = ".provenance.csv"
+# 来源映射的列：肽段每一次出现的蛋白与位置（mutation为蛋白标识中的突变注释，没有时为空）
+PROVENANCE_COLUMNS = PEPTIDE_COLUMNS + ['mutation']
+
+_current_dedup: ContextVar[Optional["CandidateDedup"]] = ContextVar("candidate_dedup", default=None)
+_stats_lock = threading.Lock()
+_stats = {"runs": 0, "candidates": 0, "unique": 0}
+
+
+def provenance_name(path: str) -> str:
+    """切割肽段结果对应的来源映射文件名/URI"""
+    return path.rsplit(".", 1)[0] + PROVENANCE_SUFFIX
+
+
+def protein_mutation(protein: str) -> str:
+    """从蛋白标识中取突变注释：>GENE|p.G12D 形式的最后一段（以p.开头或形如G12D），没有时返回空字符串"""
+    _, separator, tail = str(protein).rstrip("|").rpartition("|")
+    if not separator:
+        return ""
+    tail = tail.strip()
+    if tail.startswith("p.") or (len(tail) >= 3 and tail[0].isalpha() and tail[-1].isalpha() and tail[1:-1].isdigit()):
+        return tail
+    return ""
+
+
+def provenance_csv(occurrences: pd.DataFrame) -> str:
+    """肽段的全部出现（含重复序列）序列化为来源映射CSV"""
+    provenance = occurrences.assign(mutation=occurrences['protein'].map(protein_mutation))
+    return provenance.to_csv(index=False, columns=PROVENANCE_COLUMNS)
+
+
+def read_provenance(uri: str) -> pd.DataFrame:
+    """
+    读取切割肽段结果的来源映射（同步，应在存储线程池中调用）
+
+    尚在后台写入的映射直接使用内存中的数据；没有映射文件（旧结果）时返回空表。
+    """
+    from src.utils.minio_utils import open_minio_object
+
+    try:
+        with open_minio_object(provenance_name(uri)) as f:
+            return pd.read_csv(io.BytesIO(f.read()), dtype={'protein': str, 'mutation': str}, keep_default_na=False)
+    except S3Error as e:
+        if e.code not in ("NoSuchKey", "NoSuchObject"):
+            raise
+    logger.info(f"No provenance for {uri}, occurrences are not tracked")
+    return pd.DataFrame(columns=PROVENANCE_COLUMNS)
+
+
+def unique_keys(keys: Iterable) -> List:
+    """按首次出现顺序去重（肽段或 (peptide, allele) 组合）"""
+    return list(dict.fromkeys(keys))
+
+
+def fasta_pairs(fasta_text: str) -> List[Tuple[str, str]]:
+    """按记录顺序取出 >peptide|HLA 格式FASTA中的 (peptide, HLA-分型)，不去重；表头不符合格式的记录跳过"""
+    pairs = []
+    for record in iter_fasta(fasta_text):
+        decoded = decode_peptide_hla_header(record.header)
+        if decoded is not None:
+            pairs.append((record.sequence or decoded[0], f"HLA-{decoded[1]}"))
+    return pairs
+
+
+def pair_fasta(pairs: Iterable[Tuple[str, str]]) -> str:
+    """(peptide, allele) 写为 >peptide|allele 格式的FASTA，每个组合一条记录"""
+    return "\n".join(f">{peptide}|{allele}\n{peptide}" for peptide, allele in pairs)
+
+
+class CandidateDedup:
+    """
+    一次流程运行中的候选去重记录
+
+    候选保存在紧凑的CandidateStore中（肽段/等位基因驻留为整数id，打分为numpy列，来源映射为偏移量）；
+    各预测阶段只对唯一的 (peptide, allele) 打分，流程结束时把通过全部筛选的组合展开到每一次出现。
+    """
+
+    def __init__(self):
+        self.store = CandidateStore()
+        self.stages: List[Dict[str, Any]] = []
+        # 已写入打分的预测阶段
+        self.scored_stages: List[str] = []
+        # 按来源展开的候选打分表地址（publish_fan_out生成）
+        self.table_uri: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def set_provenance(self, occurrences: pd.DataFrame):
+        """登记切割肽段的全部出现（read_provenance的结果）"""
+        with self._lock:
+            self.store.set_occurrences(occurrences)
+
+    def record(self, stage: str, candidates: int, unique: int):
+        with self._lock:
+            self.stages.append({"stage": stage, "candidates": candidates, "unique": unique})
+        logger.info(f"Candidate dedup [{stage}]: {candidates} -> {unique}")
+
+    def add_pairs(self, peptides: Sequence[str], alleles: Sequence[str]) -> List[Tuple[str, str]]:
+        """登记下一预测阶段要打分的组合，返回去重后的 (peptide, allele)（等位基因为统一写法）"""
+        with self._lock:
+            self.store.add_pairs(peptides, alleles)
+            return self.store.alive_pairs()
+
+    def add_scores(self, stage: str, df: pd.DataFrame, peptide_column: str, allele_column: str, score_columns: Sequence[str]):
+        """写入预测阶段（已筛选）的打分，之后只有该结果中的组合视为通过"""
+        with self._lock:
+            self.store.add_scores(df, peptide_column, allele_column, score_columns)
+            self.scored_stages.append(stage)
+
+    def alive_peptides(self) -> List[str]:
+        with self._lock:
+            return self.store.alive_peptides()
+
+    def alive_pairs(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return self.store.alive_pairs()
+
+    def fan_out(self) -> pd.DataFrame:
+        """
+        把通过全部筛选的组合及其各阶段打分展开到每一次出现（protein / start / end / mutation）
+
+        来源映射中没有的肽段（如NetMHCpan在切割肽段内部取的子窗口）保留一行，来源列为空。
+        """
+        with self._lock:
+            return self.store.fan_out()
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = [
+                {**stage, "ratio": round(stage["candidates"] / stage["unique"], 2) if stage["unique"] else 0.0}
+                for stage in self.stages
+            ]
+        candidates = sum(stage["candidates"] for stage in stages)
+        unique = sum(stage["unique"] for stage in stages)
+        return {
+            "stages": stages,
+            "candidates": candidates,
+            "unique": unique,
+            "ratio": round(candidates / unique, 2) if unique else 0.0,
+        }
+
+    def markdown(self) -> str:
+        """去重统计报告：每个预测阶段的候选数、唯一键数及去重比（候选数/唯一键数）"""
+        summary = self.summary()
+        if not summary["stages"]:
+            return ""
+        lines = [
+            "### 候选去重统计",
+            "| 阶段 | 候选数 | 唯一键数 | 去重比 |",
+            "| --- | --- | --- | --- |",
+        ]
+        lines += [
+            f"| {stage['stage']} | {stage['candidates']} | {stage['unique']} | {stage['ratio']:.2f}x |"
+            for stage in summary["stages"]
+        ]
+        lines.append(f"| 合计 | {summary['candidates']} | {summary['unique']} | {summary['ratio']:.2f}x |")
+        with self._lock:
+            store = self.store.summary()
+        lines.append(
+            f"\n候选表: {store['peptides']} 条肽段 × {store['alleles']} 个等位基因，{store['pairs']} 个组合、"
+            f"{store['occurrences']} 处出现，占用 {store['nbytes'] / 1024:.1f} KB"
+        )
+        if self.table_uri:
+            lines.append(f"\n按来源（蛋白、位置、突变）展开的候选打分表: {self.table_uri}")
+        return "\n".join(lines) + "\n"
+
+
+def current_dedup() -> CandidateDedup:
+    """当前流程运行的去重记录；不在运行中时（单独调用某个步骤）返回一个新的临时记录"""
+    return _current_dedup.get() or CandidateDedup()
+
+
+def record_dedup(stage: str, candidates: int, unique: int):
+    """把一个预测阶段的去重统计登记到当前运行；不在运行中时忽略"""
+    dedup = _current_dedup.get()
+    if dedup is not None:
+        dedup.record(stage, candidates, unique)
+
+
+async def publish_fan_out(dedup: CandidateDedup, bucket: str) -> Optional[str]:
+    """把最终候选的打分展开到每一次出现并发布为结果表（CANDIDATES.provenance_table），返回minio路径"""
+    from src.utils.result_tables import publish_result_table
+
+    if not PROVENANCE_TABLE or not dedup.scored_stages:
+        return None
+    table = await asyncio.to_thread(dedup.fan_out)
+    dedup.table_uri = await run_storage_op(
+        "candidates.publish_fan_out", publish_result_table, table, bucket, "candidate_provenance"
+    )
+    # 报告中给出该表的下载地址，连同Parquet/Excel兄弟文件作为交付物保留
+    mark_deliverable(dedup.table_uri)
+    return dedup.table_uri
+
+
+@asynccontextmanager
+async def candidate_dedup() -> AsyncIterator[CandidateDedup]:
+    """
+    在一次流水线运行期间记录候选去重：来源映射、各阶段的去重统计和唯一键打分
+
+    Example:
+        async with candidate_dedup() as dedup:
+            ...
+            report.append(dedup.markdown())
+    """
+    dedup = CandidateDedup()
+    token = _current_dedup.set(dedup)
+    try:
+        yield dedup
+    finally:
+        _current_dedup.reset(token)
+        summary = dedup.summary()
+        with _stats_lock:
+            _stats["runs"] += 1
+            _stats["candidates"] += summary["candidates"]
+            _stats["unique"] += summary["unique"]
+
+
+def get_candidate_dedup_stats() -> Dict[str, Any]:
+    """累计的运行次数、候选数、唯一键数及去重比"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["ratio"] = round(stats["candidates"] / stats["unique"], 2) if stats["unique"] else 0.0
+    return stats
@@ -0,0 +1,277 @@
+import asyncio
+import re
+import sys
+
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.cpu_pool import submit_cpu_op
+from src.utils.log import logger
+
+
+CLEAVAGE_CONFIG = CONFIG_YAML.get("CLEAVAGE", {})
+# 每个进程池任务处理的残基数上限：多个小蛋白合并为一个分片，减少进程间传输次数
+CLEAVAGE_SHARD_RESIDUES = CLEAVAGE_CONFIG.get("shard_residues", 200000)
+# 总残基数不超过该值时直接在当前线程计算，不启动进程池
+CLEAVAGE_INLINE_RESIDUES = CLEAVAGE_CONFIG.get("inline_residues", 50000)
+
+# 肽段表的列；protein为NetChop输出的Ident列（序列名），与start/end一起作为肽段来源
+PEPTIDE_COLUMNS = ['protein', 'start', 'end', 'length', 'sequence']
+
+# protein -> (完整序列, 升序的剪切位点（1-based）)
+Proteins = Dict[str, Tuple[str, np.ndarray]]
+
+# NetChop文本输出的数据行：pos AA C score Ident
+NETCHOP_ROW_PATTERN = re.compile(r"^[ \t]*(\d+)[ \t]+(\S)[ \t]+(\S)[ \t]+[-+\d.eE]+[ \t]+(\S+)[ \t]*\r?$", re.MULTILINE)
+NETCHOP_READ_BLOCK_SIZE = 1024 * 1024
+# NetChop工具服务在Excel结果旁写出的原始文本：xxx.xlsx -> xxx.txt
+NETCHOP_TEXT_SUFFIX = ".txt"
+
+
+def netchop_text_name(path: str) -> str:
+    """NetChop结果对应的原始文本文件名/URI：xxx.xlsx -> xxx.txt"""
+    if path.endswith(".xlsx"):
+        return path[:-len(".xlsx")] + NETCHOP_TEXT_SUFFIX
+    return path + NETCHOP_TEXT_SUFFIX
+
+
+def _netchop_blocks(source: Union[str, bytes, BinaryIO]) -> Iterator[str]:
+    # 按块读取并在最后一个换行处切开，保证每块只含完整的行
+    if isinstance(source, str):
+        yield source
+        return
+    if isinstance(source, (bytes, bytearray)):
+        yield bytes(source).decode("utf-8", errors="replace")
+        return
+    carry = b""
+    while True:
+        block = source.read(NETCHOP_READ_BLOCK_SIZE)
+        if not block:
+            break
+        block = carry + block
+        cut = block.rfind(b"\n") + 1
+        carry = block[cut:]
+        if cut:
+            yield block[:cut].decode("utf-8", errors="replace")
+    if carry:
+        yield carry.decode("utf-8", errors="replace")
+
+
+def parse_netchop_text(source: Union[str, bytes, BinaryIO]) -> Proteins:
+    """
+    直接把NetChop文本输出解析为各蛋白的序列和剪切位点数组，供切割肽段生成使用
+
+    逐块用正则一次取出全部数据行，再按Ident连续段整体拼接序列、用numpy筛选剪切位点，
+    不构造逐位置的字典，也不需要先转换为Excel。source可以是文本或二进制流（如MinIO响应）。
+
+    Returns:
+        Proteins: protein -> (完整序列, 升序的剪切位点（C列为S的位置，1-based）)
+    """
+    residues: Dict[str, List[str]] = {}
+    positions: Dict[str, List[np.ndarray]] = {}
+    sites: Dict[str, List[np.ndarray]] = {}
+    for block in _netchop_blocks(source):
+        rows = NETCHOP_ROW_PATTERN.findall(block)
+        if not rows:
+            continue
+        pos_col, aa_col, c_col, ident_col = zip(*rows)
+        block_positions = np.array(pos_col, dtype=np.int64)
+        is_site = np.array(c_col) == "S"
+        idents = np.array(ident_col, dtype=object)
+        # NetChop按蛋白逐段输出，Ident相同的连续行为同一蛋白
+        bounds = np.concatenate(([0], np.flatnonzero(idents[1:] != idents[:-1]) + 1, [len(rows)]))
+        for begin, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            protein = ident_col[begin]
+            residues.setdefault(protein, []).append("".join(aa_col[begin:end]))
+            positions.setdefault(protein, []).append(block_positions[begin:end])
+            sites.setdefault(protein, []).append(block_positions[begin:end][is_site[begin:end]])
+
+    proteins = {}
+    for protein, parts in residues.items():
+        sequence = "".join(parts)
+        protein_positions = np.concatenate(positions[protein])
+        cut_sites = np.unique(np.concatenate(sites[protein]))
+        if not np.array_equal(protein_positions, np.arange(1, len(sequence) + 1)):
+            # 位置不连续或重复时按位置重建（同一位置以最后一次出现为准）
+            by_position = dict(zip(protein_positions.tolist(), sequence))
+            sequence = "".join(by_position[pos] for pos in sorted(by_position))
+        proteins[protein] = (sequence, cut_sites)
+    logger.info(
+        f"Parsed {len(proteins)} proteins with {sum(len(cut_sites) for _, cut_sites in proteins.values())} "
+        f"cut sites from NetChop text."
+    )
+    return proteins
+
+
+def cleavage_windows(cut_sites: np.ndarray, seq_len: int, lengths) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    一次numpy计算全部 (start, length) 窗口：肽段从剪切位点之后开始，结束位置也必须是剪切位点
+
+    Args:
+        cut_sites: 升序的剪切位点（1-based，即肽段在序列中的0-based起点）
+        seq_len: 序列长度
+        lengths: 肽段长度列表
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (0-based起点, 长度)，按剪切位点、再按lengths顺序排列
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    if cut_sites.size == 0 or lengths.size == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    ends = cut_sites[:, None] + lengths[None, :]
+    # 剪切位点已排序，用searchsorted判断结束位置是否也是剪切位点
+    index = np.minimum(np.searchsorted(cut_sites, ends), cut_sites.size - 1)
+    valid = (ends <= seq_len) & (cut_sites[index] == ends)
+    starts = np.broadcast_to(cut_sites[:, None], ends.shape)[valid]
+    return starts, np.broadcast_to(lengths[None, :], ends.shape)[valid]
+
+
+def window_sequences(sequence: str, starts: np.ndarray, window_lengths: np.ndarray) -> np.ndarray:
+    """按长度分组，用花式索引一次取出同长度的全部窗口，返回与starts顺序一致的肽段序列数组"""
+    residues = np.frombuffer(sequence.encode('ascii'), dtype=np.uint8)
+    peptides = np.empty(starts.size, dtype=object)
+    for length in np.unique(window_lengths):
+        selected = window_lengths == length
+        windows = residues[starts[selected, None] + np.arange(length)]
+        peptides[selected] = np.ascontiguousarray(windows).view(f'S{length}').ravel().astype(str)
+    return peptides
+
+
+def protein_peptides(protein: str, sequence: str, cut_sites: np.ndarray, lengths=[8, 9, 10]) -> pd.DataFrame:
+    """生成单个蛋白的全部合法肽段（未去重）"""
+    starts, window_lengths = cleavage_windows(cut_sites, len(sequence), lengths)
+    return pd.DataFrame({
+        'protein': protein,
+        'start': starts + 1,
+        'end': starts + window_lengths,
+        'length': window_lengths,
+        'sequence': window_sequences(sequence, starts, window_lengths),
+    }, columns=PEPTIDE_COLUMNS)
+
+
+def shard_peptides(shard: List[Tuple[str, str, np.ndarray]], lengths) -> pd.DataFrame:
+    """
+    生成一个分片内各蛋白的肽段（进程池任务）
+
+    保留重复序列的每一次出现，供来源映射使用；去重在合并时进行
+    """
+    frames = [protein_peptides(protein, sequence, cut_sites, lengths) for protein, sequence, cut_sites in shard]
+    if not frames:
+        return pd.DataFrame(columns=PEPTIDE_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def make_shards(proteins: Proteins, shard_residues: int = CLEAVAGE_SHARD_RESIDUES) -> List[List[Tuple[str, str, np.ndarray]]]:
+    """按输入顺序把蛋白装入分片，每个分片的残基总数不超过shard_residues（单个超长蛋白独占一个分片）"""
+    shards, current, residues = [], [], 0
+    for protein, (sequence, cut_sites) in proteins.items():
+        if current and residues + len(sequence) > shard_residues:
+            shards.append(current)
+            current, residues = [], 0
+        current.append((protein, sequence, cut_sites))
+        residues += len(sequence)
+    if current:
+        shards.append(current)
+    return shards
+
+
+def merge_occurrences(frames: List[pd.DataFrame], proteins: Proteins) -> pd.DataFrame:
+    """合并各分片的肽段表并按输入蛋白顺序、起点、长度排序（保留重复序列），结果与完成顺序无关"""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=PEPTIDE_COLUMNS)
+    occurrences = pd.concat(frames, ignore_index=True)
+    order = pd.Categorical(occurrences['protein'], categories=list(proteins), ordered=True)
+    return (
+        occurrences.assign(_order=order.codes)
+        .sort_values(['_order', 'start', 'length'], kind='stable')
+        .drop(columns='_order')
+        .reset_index(drop=True)
+    )
+
+
+def unique_peptides(occurrences: pd.DataFrame) -> pd.DataFrame:
+    """按序列去重，重复肽段保留第一个蛋白中的来源"""
+    return occurrences.drop_duplicates('sequence', keep='first', ignore_index=True)
+
+
+def merge_peptides(frames: List[pd.DataFrame], proteins: Proteins) -> pd.DataFrame:
+    """
+    合并各分片的肽段表：按输入蛋白顺序、起点、长度排序后按序列去重，
+    结果与完成顺序无关，重复肽段保留第一个蛋白中的来源
+    """
+    return unique_peptides(merge_occurrences(frames, proteins))
+
+
+async def iter_cleavage_shards(proteins: Proteins, lengths) -> AsyncIterator[Tuple[int, pd.DataFrame]]:
+    """
+    把蛋白分片提交到共享进程池，按完成顺序逐个产出 (分片内蛋白数, 分片的肽段表)
+
+    总残基数不超过CLEAVAGE.inline_residues时直接在当前线程计算，省去进程池的启动与传输开销。
+    """
+    total_residues = sum(len(sequence) for sequence, _ in proteins.values())
+    shards = make_shards(proteins)
+    if total_residues <= CLEAVAGE_INLINE_RESIDUES:
+        for shard in shards:
+            yield len(shard), shard_peptides(shard, lengths)
+        return
+
+    logger.info(f"Cleaving {len(proteins)} proteins ({total_residues} residues) in {len(shards)} shards")
+
+    async def run(shard):
+        return len(shard), await submit_cpu_op("cleavage.shard_peptides", shard_peptides, shard, list(lengths))
+
+    tasks = [asyncio.ensure_future(run(shard)) for shard in shards]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        # 调用方提前退出或出错时取消尚未开始的分片
+        for task in tasks:
+            task.cancel()
+
+
+async def batch_cleavage_occurrences(
+    proteins: Proteins,
+    lengths=[8, 9, 10],
+    on_shard: Optional[Callable[[pd.DataFrame], None]] = None,
+) -> pd.DataFrame:
+    """
+    多蛋白批量生成肽段：分片在进程池中并行计算，完成一个处理一个，最后合并为按蛋白顺序排列的肽段表
+
+    Args:
+        proteins: protein -> (完整序列, 升序剪切位点)
+        lengths: 肽段长度列表
+        on_shard: 每个分片完成时回调（参数为该分片的肽段表），用于流式展示进度
+
+    Returns:
+        pd.DataFrame: 列为PEPTIDE_COLUMNS的肽段表，重复序列的每一次出现各占一行
+    """
+    frames = []
+    done_proteins = 0
+    async for shard_proteins, frame in iter_cleavage_shards(proteins, lengths):
+        frames.append(frame)
+        done_proteins += shard_proteins
+        logger.info(f"Cleavage shard done: {len(frame)} peptides, {done_proteins}/{len(proteins)} proteins")
+        if on_shard is not None:
+            on_shard(frame)
+    return merge_occurrences(frames, proteins)
+
+
+async def batch_cleavage_peptides(
+    proteins: Proteins,
+    lengths=[8, 9, 10],
+    on_shard: Optional[Callable[[pd.DataFrame], None]] = None,
+) -> pd.DataFrame:
+    """与batch_cleavage_occurrences相同，但按序列去重（保留首次出现）"""
+    peptides = unique_peptides(await batch_cleavage_occurrences(proteins, lengths, on_shard))
+    logger.info(f"Generated {len(peptides)} unique peptides from {len(proteins)} proteins.")
+    return peptides
@@ -0,0 +1,136 @@
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.log import logger
+
+
+CPU_POOL_CONFIG = CONFIG_YAML.get("CPU_POOL", {})
+# 关闭时CPU密集任务在调用线程内直接执行
+CPU_POOL_ENABLED = CPU_POOL_CONFIG.get("enabled", True)
+# 进程池大小（同时执行的CPU密集任务上限），超出的任务排队
+CPU_POOL_MAX_WORKERS = CPU_POOL_CONFIG.get("max_workers") or min(4, os.cpu_count() or 1)
+# 子进程启动方式；服务进程内有大量线程，默认spawn，避免fork复制锁状态
+CPU_POOL_START_METHOD = CPU_POOL_CONFIG.get("start_method", "spawn")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_op_stats: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"count": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+_pool_state = {"inflight": 0}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=CPU_POOL_MAX_WORKERS,
+                    mp_context=multiprocessing.get_context(CPU_POOL_START_METHOD),
+                )
+                logger.info(f"Started CPU process pool ({CPU_POOL_MAX_WORKERS} workers, {CPU_POOL_START_METHOD})")
+    return _pool
+
+
+def _record(op: str, seconds: float, failed: bool):
+    with _stats_lock:
+        stats = _op_stats[op]
+        stats["count"] += 1
+        stats["errors"] += int(failed)
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+
+def submit_cpu_op(op: str, func: Callable[..., Any], *args) -> asyncio.Future:
+    """
+    将CPU密集的纯函数提交到共享进程池，返回当前事件循环上的Future
+
+    func及参数、返回值需可pickle，且func应定义在轻量模块中（spawn的子进程按模块路径导入）。
+    进程池关闭（CPU_POOL.enabled=false）时在调用线程中直接执行。
+
+    Args:
+        op: 操作名称，用于统计
+        func: 模块级函数
+        *args: 位置参数
+
+    Returns:
+        asyncio.Future: 任务结果
+    """
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    if not CPU_POOL_ENABLED:
+        future = loop.create_future()
+        try:
+            future.set_result(func(*args))
+            _record(op, time.perf_counter() - started, False)
+        except Exception as e:
+            future.set_exception(e)
+            _record(op, time.perf_counter() - started, True)
+        return future
+
+    with _stats_lock:
+        _pool_state["inflight"] += 1
+    try:
+        try:
+            pool_future = _get_pool().submit(func, *args)
+        except BrokenProcessPool:
+            # 子进程异常退出后进程池不可再用，重建后重试一次
+            logger.warning("CPU process pool is broken, restarting it")
+            shutdown_cpu_pool()
+            pool_future = _get_pool().submit(func, *args)
+    except Exception:
+        with _stats_lock:
+            _pool_state["inflight"] -= 1
+        raise
+
+    def done(f):
+        with _stats_lock:
+            _pool_state["inflight"] -= 1
+        _record(op, time.perf_counter() - started, f.cancelled() or f.exception() is not None)
+
+    pool_future.add_done_callback(done)
+    return asyncio.wrap_future(pool_future, loop=loop)
+
+
+def shutdown_cpu_pool():
+    """关闭进程池（服务退出时调用）"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def get_cpu_pool_stats() -> Dict[str, Any]:
+    """进程池配置、执行中的任务数及各类操作的次数与耗时"""
+    with _stats_lock:
+        ops = {
+            op: {
+                **stats,
+                "avg_seconds": round(stats["total_seconds"] / stats["count"], 4) if stats["count"] else 0.0,
+            }
+            for op, stats in _op_stats.items()
+        }
+        inflight = _pool_state["inflight"]
+    return {
+        "enabled": CPU_POOL_ENABLED,
+        "max_workers": CPU_POOL_MAX_WORKERS,
+        "start_method": CPU_POOL_START_METHOD,
+        "started": _pool is not None,
+        "inflight": inflight,
+        "ops": ops,
+    }
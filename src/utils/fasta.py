@@ -0,0 +1,214 @@
+import io
+import mmap
+import os
+import re
+
+from itertools import islice, repeat
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+
+# 20种标准氨基酸；validate时可另外传入允许的字符集（如含X/*的扩展字母表）
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+NUCLEOTIDES = "ACGTU"
+# >peptide|HLA 表头中的HLA分型，如 A*02:01 / HLA-A*02:01
+HLA_ALLELE_REGEX = re.compile(r"^(?:HLA-)?([ABC]\*\d{2}:\d{2})$")
+# 流式读取时每次读取的块大小
+READ_BLOCK_SIZE = 1024 * 1024
+
+# 记录分隔：表头行前的换行加'>'（_text_pieces保证首条记录前也有换行）
+_RECORD_SEP = "\n>"
+
+
+class FastaRecord(NamedTuple):
+    """FASTA记录：header不含'>'并去除首尾空白，sequence已去除全部空白；可直接按(header, sequence)解包"""
+
+    header: str
+    sequence: str
+
+
+class FastaFormatError(ValueError):
+    """序列中含有字母表以外的字符"""
+
+
+def _text_pieces(blocks: Iterable[bytes]) -> Iterator[str]:
+    # 在块内最后一个"\n>"处切开，每段只含完整记录，可整段解码、整段解析；
+    # 开头补一个换行，使文件首条记录与后续记录一样以"\n>"开始
+    parts = [b"\n"]
+    for block in blocks:
+        if not block:
+            continue
+        cut = block.rfind(b"\n>")
+        if cut < 0:
+            parts.append(block)
+            continue
+        parts.append(block[:cut])
+        yield b"".join(parts).decode("utf-8", errors="replace")
+        parts = [block[cut:]]
+    tail = b"".join(parts)
+    if tail.strip():
+        yield tail.decode("utf-8", errors="replace")
+
+
+def _allowed_bytes(alphabet: str) -> bytes:
+    # 校验不区分大小写：字母表的大小写两种形式都允许
+    return (alphabet.upper() + alphabet.lower()).encode("ascii")
+
+
+def _check_alphabet(chunks: List[str], sequences: List[str], allowed: bytes):
+    # 整段一次校验（bytes.translate删除合法字符后应为空），出错时再定位到具体记录
+    if not "".join(sequences).encode("utf-8").translate(None, allowed):
+        return
+    for chunk, sequence in zip(chunks, sequences):
+        invalid = sequence.encode("utf-8").translate(None, allowed)
+        if invalid:
+            header = chunk.partition("\n")[0].strip()
+            chars = "".join(sorted(set(invalid.decode("utf-8", errors="replace"))))
+            raise FastaFormatError(f"记录 {header or '(无表头)'} 含有非法字符: {chars}")
+
+
+def _read_blocks(stream: BinaryIO, block_size: int) -> Iterator[bytes]:
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            return
+        yield block
+
+
+def _mmap_blocks(mapped: mmap.mmap, block_size: int) -> Iterator[bytes]:
+    for offset in range(0, len(mapped), block_size):
+        yield mapped[offset:offset + block_size]
+
+
+def _source_pieces(source: Union[str, bytes, BinaryIO], use_mmap: bool) -> Iterator[str]:
+    if isinstance(source, str):
+        yield "\n" + source
+        return
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield from _text_pieces([bytes(source)])
+        return
+
+    mapped = None
+    if use_mmap:
+        try:
+            if os.fstat(source.fileno()).st_size > 0:
+                mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            mapped = None
+    if mapped is None:
+        yield from _text_pieces(_read_blocks(source, READ_BLOCK_SIZE))
+        return
+    try:
+        yield from _text_pieces(_mmap_blocks(mapped, READ_BLOCK_SIZE))
+    finally:
+        mapped.close()
+
+
+def iter_fasta(
+    source: Union[str, bytes, BinaryIO],
+    validate: bool = False,
+    alphabet: str = AMINO_ACIDS,
+    use_mmap: bool = True,
+) -> Iterator[FastaRecord]:
+    """
+    流式解析FASTA，逐条产出 (header, sequence)
+
+    source可以是FASTA文本（str/bytes）或二进制文件对象。文件对象对应真实文件时用mmap映射，
+    否则按块读取；内存中只保留当前块（READ_BLOCK_SIZE）内的记录。
+
+    Args:
+        source: FASTA内容或二进制文件对象
+        validate: 是否校验序列字符（不区分大小写）属于alphabet
+        alphabet: 允许的字符集，默认20种标准氨基酸
+        use_mmap: 文件对象可映射时是否使用mmap
+
+    Yields:
+        FastaRecord: 记录；第一个'>'之前的内容以空表头产出
+
+    Raises:
+        FastaFormatError: validate为True且序列含有字母表以外的字符
+    """
+    allowed = _allowed_bytes(alphabet) if validate else None
+    # 绕过NamedTuple的Python层__new__，直接构造元组子类
+    new_record = tuple.__new__
+    for piece in _source_pieces(source, use_mmap):
+        # 整段按"\n>"切分，表头与序列的拆分和去空白都在推导式内完成，不逐行循环；
+        # 首个切片是第一个表头之前的内容（多数情况下为空），以空表头产出
+        chunks = piece.split(_RECORD_SEP)
+        records = [
+            new_record(FastaRecord, (header.strip(), "".join(body.split())))
+            for header, _, body in map(str.partition, chunks, repeat("\n"))
+        ]
+        if allowed is not None:
+            _check_alphabet(chunks, [record.sequence for record in records], allowed)
+        if records[0].sequence:
+            yield records[0]
+        yield from islice(records, 1, None)
+
+
+def iter_fasta_sequences(
+    source: Union[str, bytes, BinaryIO],
+    validate: bool = False,
+    alphabet: str = AMINO_ACIDS,
+    use_mmap: bool = True,
+) -> Iterator[str]:
+    """与iter_fasta相同，但只产出非空序列，不构造表头（只需要序列的调用方使用）"""
+    allowed = _allowed_bytes(alphabet) if validate else None
+    for piece in _source_pieces(source, use_mmap):
+        chunks = piece.split(_RECORD_SEP)
+        sequences = ["".join(chunk.partition("\n")[2].split()) for chunk in chunks]
+        if allowed is not None:
+            _check_alphabet(chunks, sequences, allowed)
+        yield from filter(None, sequences)
+
+
+def iter_fasta_path(path: Union[str, os.PathLike], validate: bool = False, alphabet: str = AMINO_ACIDS) -> Iterator[FastaRecord]:
+    """流式解析本地FASTA文件（mmap）"""
+    with open(path, "rb") as f:
+        yield from iter_fasta(f, validate=validate, alphabet=alphabet)
+
+
+def iter_fasta_uri(uri: str, validate: bool = False, alphabet: str = AMINO_ACIDS) -> Iterator[FastaRecord]:
+    """
+    流式解析MinIO上的FASTA文件（同步，应在存储线程池中调用）
+
+    开启下载缓存时直接mmap缓存中的本地副本；尚在后台上传的产物使用内存中的数据。
+    """
+    from src.utils.minio_utils import open_minio_object
+
+    with open_minio_object(uri) as f:
+        yield from iter_fasta(f, validate=validate, alphabet=alphabet)
+
+
+def read_fasta_sequences(uri: str, validate: bool = False, alphabet: str = AMINO_ACIDS) -> List[str]:
+    """读取MinIO上FASTA文件的全部非空序列（同步，应在存储线程池中调用）"""
+    from src.utils.minio_utils import open_minio_object
+
+    with open_minio_object(uri) as f:
+        return list(iter_fasta_sequences(f, validate=validate, alphabet=alphabet))
+
+
+def decode_peptide_hla_header(header: str) -> Optional[Tuple[str, str]]:
+    """
+    解析 >peptide|HLA 格式的表头
+
+    Returns:
+        Optional[Tuple[str, str]]: (表头中的肽段, 不带HLA-前缀的分型如 A*02:01)；格式不符时返回None
+    """
+    peptide, separator, allele = header.rpartition("|")
+    if not separator:
+        return None
+    match = HLA_ALLELE_REGEX.fullmatch(allele.strip())
+    if match is None:
+        return None
+    return peptide.strip(), match.group(1)
+
+
+def fasta_hla_alleles(records: Iterable[FastaRecord], hla_prefix: bool = True) -> List[str]:
+    """按首次出现顺序返回 >peptide|HLA 表头中的全部HLA分型（去重）"""
+    alleles = {}
+    for record in records:
+        decoded = decode_peptide_hla_header(record.header)
+        if decoded is not None:
+            allele = f"HLA-{decoded[1]}" if hla_prefix else decoded[1]
+            alleles.setdefault(allele, None)
+    return list(alleles)
@@ -0,0 +1,175 @@
+import aiohttp
+import asyncio
+import sys
+
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.log import logger
+
+
+HTTP_CONFIG = CONFIG_YAML.get("HTTP_CLIENT", {})
+HTTP_LIMIT = HTTP_CONFIG.get("limit", 100)
+HTTP_LIMIT_PER_HOST = HTTP_CONFIG.get("limit_per_host", 16)
+HTTP_KEEPALIVE_TIMEOUT = HTTP_CONFIG.get("keepalive_timeout", 60)
+HTTP_DNS_CACHE_TTL = HTTP_CONFIG.get("ttl_dns_cache", 300)
+HTTP_DEFAULT_TIMEOUT = HTTP_CONFIG.get("default_timeout", 60)
+HTTP_TOOL_TIMEOUTS = HTTP_CONFIG.get("timeouts", {}) or {}
+
+# 应用级共享会话及其所属事件循环，由app.py的lifespan创建/关闭
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+_stats = {
+    "requests": 0,
+    "new_connections": 0,
+    "reused_connections": 0,
+    "fallback_sessions": 0,
+}
+_host_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"requests": 0, "new_connections": 0, "reused_connections": 0})
+
+
+def get_tool_timeout(tool_name: str) -> aiohttp.ClientTimeout:
+    """读取config.yaml中HTTP_CLIENT.timeouts.<tool_name>，未配置则使用default_timeout"""
+    return aiohttp.ClientTimeout(total=HTTP_TOOL_TIMEOUTS.get(tool_name, HTTP_DEFAULT_TIMEOUT))
+
+
+async def _on_request_start(session, ctx, params):
+    _stats["requests"] += 1
+    _host_stats[params.url.host]["requests"] += 1
+    ctx.host = params.url.host
+
+
+async def _on_connection_create_end(session, ctx, params):
+    _stats["new_connections"] += 1
+    _host_stats[getattr(ctx, "host", None)]["new_connections"] += 1
+
+
+async def _on_connection_reuseconn(session, ctx, params):
+    _stats["reused_connections"] += 1
+    _host_stats[getattr(ctx, "host", None)]["reused_connections"] += 1
+
+
+def _build_trace_config() -> aiohttp.TraceConfig:
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+    return trace_config
+
+
+def _build_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_LIMIT,
+        limit_per_host=HTTP_LIMIT_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=HTTP_DEFAULT_TIMEOUT),
+        trace_configs=[_build_trace_config()],
+    )
+
+
+async def init_http_session() -> aiohttp.ClientSession:
+    """在FastAPI lifespan中调用，创建应用级共享的连接池会话"""
+    global _session, _session_loop
+    if _session is None or _session.closed:
+        _session = _build_session()
+        _session_loop = asyncio.get_running_loop()
+        logger.info(
+            f"HTTP session initialized: limit={HTTP_LIMIT}, limit_per_host={HTTP_LIMIT_PER_HOST}, "
+            f"keepalive_timeout={HTTP_KEEPALIVE_TIMEOUT}s"
+        )
+    return _session
+
+
+async def close_http_session():
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info(f"HTTP session closed, stats: {get_http_stats()}")
+    _session = None
+    _session_loop = None
+
+
+async def _request_json(
+    session: aiohttp.ClientSession,
+    method: str,
+    url: str,
+    timeout: aiohttp.ClientTimeout,
+    payload: Optional[Dict[str, Any]] = None,
+) -> Any:
+    async with session.request(method, url, json=payload, timeout=timeout) as response:
+        response.raise_for_status()
+        return await response.json()
+
+
+async def _request(
+    method: str,
+    tool_name: str,
+    url: str,
+    payload: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None,
+) -> Any:
+    client_timeout = aiohttp.ClientTimeout(total=timeout) if timeout is not None else get_tool_timeout(tool_name)
+    session, session_loop = _session, _session_loop
+    if session is not None and not session.closed and session_loop is not None and not session_loop.is_closed():
+        current_loop = asyncio.get_running_loop()
+        if current_loop is session_loop:
+            return await _request_json(session, method, url, client_timeout, payload)
+        future = asyncio.run_coroutine_threadsafe(
+            _request_json(session, method, url, client_timeout, payload), session_loop
+        )
+        return await asyncio.wrap_future(future)
+
+    _stats["fallback_sessions"] += 1
+    async with _build_session() as fallback_session:
+        return await _request_json(fallback_session, method, url, client_timeout, payload)
+
+
+async def post_json(tool_name: str, url: str, payload: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+    """
+    向远程工具服务发送POST请求并返回JSON响应
+
+    优先复用lifespan中创建的共享会话。同步工具（asyncio.run）运行在其他线程的事件循环中，
+    此时请求会提交到共享会话所在的事件循环执行；没有共享会话时（如脚本直接运行）
+    退化为单次请求的临时会话。
+
+    Args:
+        tool_name: 工具名，用于读取超时配置，例如 "NetMHCpan"
+        url: 工具服务地址
+        payload: 请求体
+        timeout: 总超时（秒），默认读取HTTP_CLIENT.timeouts.<tool_name>
+
+    Returns:
+        Any: response.json() 的结果
+
+    Raises:
+        aiohttp.ClientError / asyncio.TimeoutError: 请求失败或超时
+    """
+    return await _request("POST", tool_name, url, payload, timeout)
+
+
+async def get_json(tool_name: str, url: str, timeout: Optional[float] = None) -> Any:
+    """向远程工具服务发送GET请求并返回JSON响应，会话复用规则同post_json"""
+    return await _request("GET", tool_name, url, None, timeout)
+
+
+def get_http_stats() -> Dict[str, Any]:
+    """连接复用统计：请求数、新建连接数、复用连接数及复用率（总体与按host）"""
+    def with_ratio(stats: Dict[str, int]) -> Dict[str, Any]:
+        acquired = stats["new_connections"] + stats["reused_connections"]
+        return {**stats, "reuse_ratio": round(stats["reused_connections"] / acquired, 4) if acquired else None}
+
+    return {
+        **with_ratio(_stats),
+        "session_active": _session is not None and not _session.closed,
+        "hosts": {host: with_ratio(stats) for host, stats in _host_stats.items()},
+    }
@@ -0,0 +1,178 @@
+import base64
+import json
+import os
+import sys
+import threading
+
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Union
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.async_storage import aupload_bytes
+from src.utils.log import logger
+from src.utils.write_behind import pending_bytes, persist_behind
+
+
+INLINE_PAYLOAD_CONFIG = CONFIG_YAML.get("INLINE_PAYLOAD", {})
+INLINE_PAYLOAD_ENABLED = INLINE_PAYLOAD_CONFIG.get("enabled", True)
+# 不超过该大小的输入文件直接放进请求体，不经MinIO中转
+INLINE_MAX_BYTES = INLINE_PAYLOAD_CONFIG.get("max_bytes", 64 * 1024)
+# 告知工具服务：不超过该大小的结果可直接在响应中返回
+INLINE_RESULT_MAX_BYTES = INLINE_PAYLOAD_CONFIG.get("result_max_bytes", 256 * 1024)
+# 各工具服务是否支持内联协议（需服务端升级后开启）
+INLINE_TOOLS = INLINE_PAYLOAD_CONFIG.get("tools", {})
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = defaultdict(
+    lambda: {"inline_inputs": 0, "inline_input_bytes": 0, "uploaded_inputs": 0, "inline_results": 0, "inline_result_bytes": 0}
+)
+
+
+class InlineFile:
+    """随请求体发送的小文件（代替minio路径），由call_remote_tool编码"""
+
+    __slots__ = ("name", "data")
+
+    def __init__(self, name: str, data: bytes):
+        self.name = name
+        self.data = data
+
+
+def inline_enabled(tool_name: str) -> bool:
+    return INLINE_PAYLOAD_ENABLED and bool(INLINE_TOOLS.get(tool_name, False))
+
+
+def _count(tool_name: str, key: str, value: int = 1):
+    with _stats_lock:
+        _stats[tool_name][key] += value
+
+
+async def stage_tool_input(
+    tool_name: str,
+    data: Union[bytes, str],
+    bucket_name: str,
+    minio_object_name: str = None,
+    suffix: str = "",
+    content_type: str = "application/octet-stream",
+    content_addressed: bool = None,
+) -> Union[str, InlineFile]:
+    """
+    准备发给远程工具的输入文件：工具支持内联且不超过INLINE_MAX_BYTES时返回InlineFile，否则上传MinIO返回路径
+
+    返回值直接作为payload中的文件字段交给call_remote_tool。
+
+    Args:
+        tool_name: 工具名，与INLINE_PAYLOAD.tools的键一致
+        data: 文件内容，str按UTF-8编码
+        bucket_name / minio_object_name / suffix / content_type / content_addressed: 需要上传时的参数，同aupload_bytes
+
+    Returns:
+        Union[str, InlineFile]: minio路径或内联文件
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if inline_enabled(tool_name) and len(data) <= INLINE_MAX_BYTES:
+        name = minio_object_name or f"input{suffix}"
+        return InlineFile(os.path.basename(name), data)
+    _count(tool_name, "uploaded_inputs")
+    return await aupload_bytes(
+        data, bucket_name, minio_object_name, suffix=suffix, content_type=content_type, content_addressed=content_addressed
+    )
+
+
+def _encode_file(name: str, data: bytes) -> Dict[str, Any]:
+    try:
+        return {"inline": True, "name": name, "encoding": "utf-8", "content": data.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"inline": True, "name": name, "encoding": "base64", "content": base64.b64encode(data).decode("ascii")}
+
+
+def encode_inline_payload(tool_name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    把payload中的InlineFile以及尚在后台上传的小文件（write-behind）编码为内联文件，返回新的请求体
+
+    内联文件格式：{"inline": true, "name": ..., "encoding": "utf-8"|"base64", "content": ...}；
+    同时带上inline_result_max_bytes，允许工具服务直接返回小结果。
+    工具未开启内联时原样返回。
+
+    Raises:
+        ValueError: 工具未开启内联却传入了InlineFile
+    """
+    if not inline_enabled(tool_name):
+        if any(isinstance(value, InlineFile) for value in payload.values()):
+            raise ValueError(f"{tool_name} 未开启内联输入")
+        return payload
+
+    encoded = {}
+    for key, value in payload.items():
+        if isinstance(value, InlineFile):
+            encoded[key] = _encode_file(value.name, value.data)
+            _count(tool_name, "inline_inputs")
+            _count(tool_name, "inline_input_bytes", len(value.data))
+            continue
+        if isinstance(value, str) and value.strip().startswith("minio://"):
+            # 流水线中间产物仍在内存中，直接内联，无需等待上传完成
+            data = pending_bytes(value.strip())
+            if data is not None and len(data) <= INLINE_MAX_BYTES:
+                encoded[key] = _encode_file(os.path.basename(value.strip()), data)
+                _count(tool_name, "inline_inputs")
+                _count(tool_name, "inline_input_bytes", len(data))
+                continue
+        encoded[key] = value
+    encoded["inline_result_max_bytes"] = INLINE_RESULT_MAX_BYTES
+    return encoded
+
+
+async def decode_inline_result(tool_name: str, result: Any) -> Any:
+    """
+    处理工具服务内联返回的结果：{"type": "link", "url": ..., "inline": {"encoding", "content"}}
+
+    结果内容按url后台写入MinIO（write-behind），本进程内对该url的读取直接使用内存数据；
+    去掉inline字段后按原类型（JSON字符串或dict）返回，工具封装无需区分。
+    """
+    if not inline_enabled(tool_name):
+        return result
+    result_dict = result
+    if isinstance(result, str):
+        try:
+            result_dict = json.loads(result)
+        except ValueError:
+            return result
+    if not isinstance(result_dict, dict) or not isinstance(result_dict.get("inline"), dict):
+        return result
+
+    from src.utils.minio_utils import split_minio_uri
+
+    inline = result_dict.pop("inline")
+    content = inline.get("content", "")
+    if inline.get("encoding") == "base64":
+        data = base64.b64decode(content)
+    else:
+        data = content.encode("utf-8")
+    bucket_name, object_name = split_minio_uri(result_dict["url"])
+    await persist_behind(
+        data, bucket_name, object_name,
+        content_type=inline.get("content_type", "application/octet-stream"),
+        stage=f"{tool_name}.inline_result",
+    )
+    _count(tool_name, "inline_results")
+    _count(tool_name, "inline_result_bytes", len(data))
+    logger.info(f"{tool_name} returned {len(data)} bytes inline for {result_dict['url']}")
+    return json.dumps(result_dict, ensure_ascii=False) if isinstance(result, str) else result_dict
+
+
+def get_inline_payload_stats() -> Dict[str, Any]:
+    """各工具内联输入/结果的次数与字节数，以及仍经MinIO上传的输入数"""
+    with _stats_lock:
+        tools = {tool: dict(stats) for tool, stats in _stats.items()}
+    return {
+        "enabled": INLINE_PAYLOAD_ENABLED,
+        "max_bytes": INLINE_MAX_BYTES,
+        "result_max_bytes": INLINE_RESULT_MAX_BYTES,
+        "tools_enabled": sorted(tool for tool, enabled in INLINE_TOOLS.items() if enabled),
+        "tools": tools,
+    }
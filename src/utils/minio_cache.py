@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.log import logger
+from src.utils.minio_transfer import fget_object_parallel
+
+
+DOWNLOAD_CACHE_CONFIG = CONFIG_YAML.get("MINIO_DOWNLOAD_CACHE", {})
+DOWNLOAD_CACHE_ENABLED = DOWNLOAD_CACHE_CONFIG.get("enabled", True)
+DOWNLOAD_CACHE_DIR = DOWNLOAD_CACHE_CONFIG.get("cache_dir", os.path.join(tempfile.gettempdir(), "minio_cache"))
+DOWNLOAD_CACHE_MAX_BYTES = DOWNLOAD_CACHE_CONFIG.get("max_bytes", 2 * 1024 ** 3)
+# 内容寻址对象（sha256/前缀）内容不可变，命中时无需再向MinIO校验ETag
+IMMUTABLE_PREFIX = "sha256/"
+
+_DATA_SUFFIX = ".data"
+_META_SUFFIX = ".meta"
+
+
+class DownloadCache:
+    """
+    download_from_minio_uri 的本地磁盘读穿缓存
+
+    以 bucket/object 为键，每次读取先stat_object比对ETag与Last-Modified，一致则直接使用本地副本，
+    否则重新下载。下载先写入缓存目录内的临时文件，完成后os.replace原子替换，并发读取不会看到半个文件。
+    总字节数超过max_bytes时按最近访问时间淘汰（LRU）。
+    """
+
+    def __init__(self, cache_dir: str = DOWNLOAD_CACHE_DIR, max_bytes: int = DOWNLOAD_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # 同一对象的并发未命中只下载一次
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "evictions": 0,
+            "bytes_downloaded": 0,
+            "bytes_served": 0,
+        }
+        self._load_index()
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key)
+        return base + _DATA_SUFFIX, base + _META_SUFFIX
+
+    def _load_index(self):
+        """进程重启后从 *.meta 恢复索引，按数据文件的mtime（最近访问时间）排序"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(_META_SUFFIX):
+                continue
+            key = name[:-len(_META_SUFFIX)]
+            data_path, meta_path = self._paths(key)
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                meta["size"] = os.path.getsize(data_path)
+                entries.append((os.path.getmtime(data_path), key, meta))
+            except (OSError, ValueError):
+                self._remove_files(key)
+        for _, key, meta in sorted(entries):
+            self._entries[key] = meta
+            self._total_bytes += meta["size"]
+        if entries:
+            logger.info(f"MinIO download cache loaded {len(entries)} entries ({self._total_bytes} bytes)")
+        self._evict_locked()
+
+    def _remove_files(self, key: str):
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _lookup(self, key: str, etag: Optional[str], last_modified: Optional[str]) -> Optional[BinaryIO]:
+        with self._lock:
+            meta = self._entries.get(key)
+            if meta is None:
+                return None
+            if etag is not None and (meta.get("etag") != etag or meta.get("last_modified") != last_modified):
+                self._stats["stale"] += 1
+                return None
+            data_path, _ = self._paths(key)
+            # 在锁内打开：淘汰同样持有该锁，打开后的文件即使随后被淘汰删除也仍可完整读取
+            try:
+                f = open(data_path, "rb")
+            except FileNotFoundError:
+                self._total_bytes -= meta["size"]
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            self._stats["bytes_served"] += meta["size"]
+        try:
+            os.utime(data_path)
+        except OSError:
+            pass
+        return f
+
+    def open(self, minio_client, bucket_name: str, object_name: str) -> BinaryIO:
+        """
+        以只读二进制方式打开对象在缓存目录中的本地副本，调用方负责关闭
+
+        返回已打开的文件而不是路径：其他线程随后淘汰该条目时，已打开的文件仍可完整读取。
+
+        Raises:
+            S3Error: 对象不存在或MinIO操作失败
+        """
+        uri = f"minio://{bucket_name}/{object_name}"
+        key = hashlib.sha256(uri.encode("utf-8")).hexdigest()
+        immutable = object_name.startswith(IMMUTABLE_PREFIX)
+
+        if immutable:
+            cached = self._lookup(key, None, None)
+            if cached:
+                return cached
+
+        with self._key_lock(key):
+            stat = minio_client.stat_object(bucket_name, object_name)
+            etag = stat.etag
+            last_modified = stat.last_modified.isoformat() if stat.last_modified else None
+            cached = self._lookup(key, etag, last_modified)
+            if cached:
+                return cached
+
+            data_path, meta_path = self._paths(key)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+            os.close(fd)
+            try:
+                # 大对象按Range分片并行下载，stat结果复用，不再重复请求
+                size = fget_object_parallel(minio_client, bucket_name, object_name, tmp_path, stat.size, etag)
+                meta = {"uri": uri, "etag": etag, "last_modified": last_modified, "size": size}
+                with self._lock:
+                    old = self._entries.pop(key, None)
+                    if old is not None:
+                        self._total_bytes -= old["size"]
+                    os.replace(tmp_path, data_path)
+                    with open(meta_path, "w", encoding="utf-8") as f:
+                        json.dump(meta, f)
+                    cached = open(data_path, "rb")
+                    self._entries[key] = meta
+                    self._total_bytes += size
+                    self._stats["misses"] += 1
+                    self._stats["bytes_downloaded"] += size
+                    self._evict_locked(keep=key)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            logger.info(f"MinIO download cache miss: {uri} ({size} bytes)")
+            return cached
+
+    def _evict_locked(self, keep: Optional[str] = None):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, meta = next(iter(self._entries.items()))
+            if key == keep:
+                # 单个对象超过容量上限时保留它本身
+                break
+            del self._entries[key]
+            self._total_bytes -= meta["size"]
+            self._stats["evictions"] += 1
+            self._remove_files(key)
+            logger.info(f"MinIO download cache evicted {meta.get('uri')} ({meta['size']} bytes)")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else None,
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_cache: Optional[DownloadCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_download_cache() -> DownloadCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DownloadCache()
+    return _cache
+
+
+def get_download_cache_stats() -> Dict[str, Any]:
+    if not DOWNLOAD_CACHE_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **get_download_cache().stats()}
+
+
+def copy_atomic(src: BinaryIO, dst_path: str):
+    """把已打开的文件先复制到目标目录内的临时文件再os.replace，目标路径上不会出现写了一半的文件"""
+    dst_dir = os.path.dirname(os.path.abspath(dst_path))
+    fd, tmp_path = tempfile.mkstemp(dir=dst_dir, prefix=f".{os.path.basename(dst_path)}.", suffix=".part")
+    os.close(fd)
+    try:
+        with open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, dst_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,140 @@
+import os
+import sys
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.log import logger
+
+
+MINIO_CONFIG = CONFIG_YAML["MINIO"]
+# 分片大小：multipart上传的part大小，同时也是并行下载每个Range的大小（MinIO要求不小于5MiB）
+TRANSFER_PART_SIZE = max(MINIO_CONFIG.get("part_size", 16 * 1024 * 1024), 5 * 1024 * 1024)
+# 单个对象同时传输的分片数
+TRANSFER_CONCURRENCY = MINIO_CONFIG.get("transfer_concurrency", 4)
+# 不小于该大小的对象按Range分片并行下载，较小的对象单连接下载
+PARALLEL_DOWNLOAD_THRESHOLD = MINIO_CONFIG.get("parallel_download_threshold", 32 * 1024 * 1024)
+_READ_CHUNK = 1024 * 1024
+
+_stats_lock = threading.Lock()
+_stats = {
+    "parallel_downloads": 0,
+    "single_downloads": 0,
+    "ranges": 0,
+    "bytes": 0,
+    "seconds": 0.0,
+}
+
+
+def upload_options() -> Dict[str, int]:
+    """fput_object/put_object的multipart参数：超过part_size的对象分片并行上传"""
+    return {"part_size": TRANSFER_PART_SIZE, "num_parallel_uploads": TRANSFER_CONCURRENCY}
+
+
+def _ranges(size: int, part_size: int) -> List[Tuple[int, int]]:
+    return [(offset, min(part_size, size - offset)) for offset in range(0, size, part_size)]
+
+
+def _download_range(minio_client, bucket_name: str, object_name: str, fd: int, offset: int, length: int, etag: str):
+    # If-Match保证各分片来自同一版本的对象，下载期间对象被覆盖时失败而不是拼出混合内容
+    response = minio_client.get_object(
+        bucket_name, object_name, offset=offset, length=length,
+        request_headers={"If-Match": etag} if etag else None,
+    )
+    try:
+        position = offset
+        for chunk in response.stream(_READ_CHUNK):
+            os.pwrite(fd, chunk, position)
+            position += len(chunk)
+    finally:
+        response.close()
+        response.release_conn()
+    if position != offset + length:
+        raise IOError(f"Range {offset}-{offset + length - 1} of {bucket_name}/{object_name} truncated at {position}")
+
+
+def fget_object_parallel(
+    minio_client,
+    bucket_name: str,
+    object_name: str,
+    file_path: str,
+    size: Optional[int] = None,
+    etag: Optional[str] = None,
+) -> int:
+    """
+    下载对象到本地文件：大对象按Range分片并行下载，小对象退化为单连接的fget_object
+
+    各分片用os.pwrite写入预分配文件的对应位置；调用方负责在失败时清理file_path（通常是临时文件）。
+
+    Args:
+        minio_client: MinIO客户端
+        bucket_name / object_name: 对象
+        file_path: 本地文件路径
+        size / etag: 对象大小和ETag，调用方已stat_object时传入可省去一次请求
+
+    Returns:
+        int: 下载的字节数
+
+    Raises:
+        S3Error: MinIO操作失败（含下载期间对象被修改导致的PreconditionFailed）
+        IOError: 分片内容不完整
+    """
+    if size is None or etag is None:
+        stat = minio_client.stat_object(bucket_name, object_name)
+        size, etag = stat.size, stat.etag
+
+    started = time.perf_counter()
+    if size < PARALLEL_DOWNLOAD_THRESHOLD or TRANSFER_CONCURRENCY <= 1:
+        minio_client.fget_object(bucket_name, object_name, file_path)
+        with _stats_lock:
+            _stats["single_downloads"] += 1
+            _stats["bytes"] += size
+            _stats["seconds"] += time.perf_counter() - started
+        return size
+
+    ranges = _ranges(size, TRANSFER_PART_SIZE)
+    fd = os.open(file_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.ftruncate(fd, size)
+        with ThreadPoolExecutor(max_workers=min(TRANSFER_CONCURRENCY, len(ranges)), thread_name_prefix="minio-range") as pool:
+            futures = [
+                pool.submit(_download_range, minio_client, bucket_name, object_name, fd, offset, length, etag)
+                for offset, length in ranges
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        os.close(fd)
+
+    elapsed = time.perf_counter() - started
+    with _stats_lock:
+        _stats["parallel_downloads"] += 1
+        _stats["ranges"] += len(ranges)
+        _stats["bytes"] += size
+        _stats["seconds"] += elapsed
+    logger.info(
+        f"Parallel download minio://{bucket_name}/{object_name}: {size} bytes in {len(ranges)} ranges, "
+        f"{size / max(elapsed, 1e-6) / 1024 / 1024:.1f} MiB/s"
+    )
+    return size
+
+
+def get_transfer_stats() -> Dict[str, Any]:
+    """分片并行传输的配置及下载统计（次数、分片数、字节数、平均吞吐）"""
+    with _stats_lock:
+        stats = dict(_stats)
+    seconds = stats.pop("seconds")
+    return {
+        "part_size": TRANSFER_PART_SIZE,
+        "concurrency": TRANSFER_CONCURRENCY,
+        "parallel_download_threshold": PARALLEL_DOWNLOAD_THRESHOLD,
+        **stats,
+        "avg_mib_per_s": round(stats["bytes"] / seconds / 1024 / 1024, 2) if seconds else None,
+    }
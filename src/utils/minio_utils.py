@@ -1,10 +1,16 @@
+import hashlib
+import io
 import os
 import uuid
 import sys
 import tempfile
+import threading
+import urllib3
 
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Set, Union
 from minio import Minio
 from minio.error import S3Error
 from urllib.parse import urlparse
@@ -12,10 +18,14 @@ from urllib.parse import urlparse
 
 load_dotenv()
 current_file = Path(__file__).resolve()
-project_root = current_file.parents[5]
+project_root = current_file.parents[2]
 sys.path.append(str(project_root))
 from config import CONFIG_YAML
 from src.utils.log import logger
+from src.utils.minio_cache import DOWNLOAD_CACHE_ENABLED, copy_atomic, get_download_cache
+from src.utils.minio_transfer import fget_object_parallel, get_transfer_stats, upload_options
+from src.utils.run_manifest import record_artifact, upload_tags
+from src.utils.write_behind import pending_bytes
 
 
 MINIO_CONFIG = CONFIG_YAML["MINIO"]
@@ -24,29 +34,140 @@ MINIO_ACCESS_KEY = os.getenv("ACCESS_KEY")
 MINIO_SECRET_KEY = os.getenv("SECRET_KEY")
 MINIO_BUCKET = MINIO_CONFIG["molly_bucket"]
 MINIO_SECURE = MINIO_CONFIG.get("secure", False)
+# 内容寻址模式：对象名由文件内容的SHA-256决定，相同内容只上传一次
+MINIO_CONTENT_ADDRESSED = MINIO_CONFIG.get("content_addressed", False)
+CONTENT_ADDRESSED_PREFIX = "sha256/"
 
 
-# # 初始化 MinIO 客户端
-minio_client = Minio(
-    MINIO_ENDPOINT,
-    access_key=MINIO_ACCESS_KEY,
-    secret_key=MINIO_SECRET_KEY,
-    secure=MINIO_SECURE
-)
+# 连接池大小应不小于并发MinIO操作数（ASYNC_STORAGE.max_workers + 同步工具线程，分片传输时再乘以transfer_concurrency），
+# 否则urllib3会丢弃多余连接
+MINIO_POOL_MAXSIZE = MINIO_CONFIG.get("pool_maxsize", 32)
+MINIO_CONNECT_TIMEOUT = MINIO_CONFIG.get("connect_timeout", 10)
+MINIO_READ_TIMEOUT = MINIO_CONFIG.get("read_timeout", 300)
+MINIO_MAX_RETRIES = MINIO_CONFIG.get("max_retries", 3)
+
+_client: Optional[Minio] = None
+_client_lock = threading.Lock()
+# 已确认存在的桶，进程内只检查/创建一次
+_known_buckets: Set[str] = set()
+_buckets_lock = threading.Lock()
+
+
+def get_minio_client() -> Minio:
+    """
+    进程内共享的MinIO客户端，首次调用时创建（导入模块时不建立任何连接）
+
+    Minio客户端本身线程安全，所有模块、线程池中的操作都复用同一个urllib3连接池。
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                http_client = urllib3.PoolManager(
+                    maxsize=MINIO_POOL_MAXSIZE,
+                    timeout=urllib3.Timeout(connect=MINIO_CONNECT_TIMEOUT, read=MINIO_READ_TIMEOUT),
+                    retries=urllib3.Retry(
+                        total=MINIO_MAX_RETRIES,
+                        backoff_factor=0.2,
+                        status_forcelist=[500, 502, 503, 504],
+                    ),
+                )
+                _client = Minio(
+                    MINIO_ENDPOINT,
+                    access_key=MINIO_ACCESS_KEY,
+                    secret_key=MINIO_SECRET_KEY,
+                    secure=MINIO_SECURE,
+                    http_client=http_client,
+                )
+                logger.info(f"MinIO client created: {MINIO_ENDPOINT} (pool_maxsize={MINIO_POOL_MAXSIZE})")
+    return _client
+
+
+def ensure_bucket(bucket_name: str):
+    """
+    确保桶存在，不存在则创建；结果缓存在进程内，同一个桶之后的上传不再发起bucket_exists请求
+
+    Raises:
+        S3Error: MinIO操作相关的错误
+    """
+    if bucket_name in _known_buckets:
+        return
+    client = get_minio_client()
+    if not client.bucket_exists(bucket_name):
+        try:
+            client.make_bucket(bucket_name)
+            logger.info(f"MinIO bucket created: {bucket_name}")
+        except S3Error as e:
+            # 并发创建时其他进程/线程已抢先创建
+            if e.code not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+                raise
+    with _buckets_lock:
+        _known_buckets.add(bucket_name)
+
+
+def _forget_bucket_on_error(bucket_name: str, error: S3Error):
+    # 桶被外部删除后清除缓存，下次上传重新检查/创建
+    if error.code == "NoSuchBucket":
+        with _buckets_lock:
+            _known_buckets.discard(bucket_name)
+
+
+def get_minio_client_stats() -> Dict[str, Any]:
+    """共享客户端的连接池配置、已确认存在的桶及分片并行传输统计"""
+    with _buckets_lock:
+        buckets = sorted(_known_buckets)
+    return {
+        "endpoint": MINIO_ENDPOINT,
+        "initialized": _client is not None,
+        "pool_maxsize": MINIO_POOL_MAXSIZE,
+        "connect_timeout": MINIO_CONNECT_TIMEOUT,
+        "read_timeout": MINIO_READ_TIMEOUT,
+        "max_retries": MINIO_MAX_RETRIES,
+        "known_buckets": buckets,
+        "transfer": get_transfer_stats(),
+    }
+
+
+def file_sha256(local_file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """分块计算文件的SHA-256"""
+    digest = hashlib.sha256()
+    with open(local_file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_addressed_object_name(sha256_hex: str, suffix: str = "") -> str:
+    """内容寻址的对象名：sha256/<digest><扩展名>"""
+    return f"{CONTENT_ADDRESSED_PREFIX}{sha256_hex}{suffix}"
+
+
+def object_exists(bucket_name: str, object_name: str) -> bool:
+    try:
+        get_minio_client().stat_object(bucket_name, object_name)
+        return True
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject", "NoSuchBucket"):
+            return False
+        raise
+
 
 def upload_file_to_minio(
     local_file_path: str,
     bucket_name: str,
     minio_object_name: str = None,
+    content_addressed: bool = None,
 ) -> str:
     """
     上传本地文件到MinIO存储
     
     Args:
-        minio_client: 已初始化的MinIO客户端实例
         local_file_path: 本地文件路径
         bucket_name: MinIO桶名称
         minio_object_name: 在MinIO中存储的文件名(可选)，如果不指定则使用随机UUID+原文件名
+        content_addressed: 是否按内容寻址(可选，默认读取MINIO.content_addressed)。开启后忽略
+                           minio_object_name，对象名为 sha256/<digest><扩展名>，对象已存在时跳过上传，
+                           相同内容总是返回同一个URI
         
     Returns:
         str: MinIO访问地址 (格式: minio://bucket/object_name)
@@ -61,32 +182,114 @@ def upload_file_to_minio(
     if not local_path.exists():
         raise FileNotFoundError(f"本地文件不存在: {local_file_path}")
     
+    if content_addressed is None:
+        content_addressed = MINIO_CONTENT_ADDRESSED
+    sha256_hex = None
+    if content_addressed:
+        sha256_hex = file_sha256(str(local_path))
+        minio_object_name = content_addressed_object_name(sha256_hex, local_path.suffix)
     # 如果没有指定MinIO中的文件名，则生成一个
-    if minio_object_name is None:
+    elif minio_object_name is None:
         file_ext = local_path.suffix  # 获取文件扩展名
         minio_object_name = f"{uuid.uuid4().hex}{file_ext}"
     
     try:
-        # 确保桶存在
-        if not minio_client.bucket_exists(bucket_name):
-            minio_client.make_bucket(bucket_name)
+        # 确保桶存在（进程内缓存，只检查一次）
+        ensure_bucket(bucket_name)
+
+        # 内容相同的对象已存在，无需重复上传
+        if content_addressed and object_exists(bucket_name, minio_object_name):
+            logger.info(f"MinIO object exists, skip upload: minio://{bucket_name}/{minio_object_name}")
+            return f"minio://{bucket_name}/{minio_object_name}"
         
-        # 上传文件
-        minio_client.fput_object(
+        # 上传文件（流水线运行中的产物带上run-id/artifact-role标签，并登记到运行清单）
+        tags = None if content_addressed else upload_tags()
+        get_minio_client().fput_object(
             bucket_name,
             minio_object_name,
-            str(local_path)
+            str(local_path),
+            metadata={"sha256": sha256_hex} if sha256_hex else None,
+            tags=tags,
+            # 大文件（如全蛋白组FASTA）按part_size分片，多个分片并行上传
+            **upload_options(),
         )
         logger.info(f"MinIO path: minio://{bucket_name}/{minio_object_name}")
+        if tags is not None:
+            record_artifact(f"minio://{bucket_name}/{minio_object_name}", tagged=True)
         # 返回MinIO地址
         return f"minio://{bucket_name}/{minio_object_name}"
         
     except S3Error as e:
+        _forget_bucket_on_error(bucket_name, e)
         logger.error(f"MinIO S3 Error: {e}")
         raise S3Error(f"上传文件到MinIO失败: {e}") from e
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}")
         raise
+
+
+def upload_bytes_to_minio(
+    data: Union[bytes, str],
+    bucket_name: str,
+    minio_object_name: str = None,
+    suffix: str = "",
+    content_type: str = "application/octet-stream",
+    content_addressed: bool = None,
+) -> str:
+    """
+    将内存中的数据直接上传到MinIO（put_object + BytesIO），不经过本地临时文件
+
+    Args:
+        data: 文件内容，str按UTF-8编码
+        bucket_name: MinIO桶名称
+        minio_object_name: 在MinIO中存储的文件名(可选)，不指定则使用随机UUID+suffix
+        suffix: 扩展名，如 ".csv"，用于自动生成的对象名
+        content_type: 对象的Content-Type
+        content_addressed: 是否按内容寻址，规则同upload_file_to_minio
+
+    Returns:
+        str: MinIO访问地址 (格式: minio://bucket/object_name)
+
+    Raises:
+        S3Error: MinIO操作相关的错误
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    if content_addressed is None:
+        content_addressed = MINIO_CONTENT_ADDRESSED
+    sha256_hex = None
+    if content_addressed:
+        sha256_hex = hashlib.sha256(data).hexdigest()
+        minio_object_name = content_addressed_object_name(sha256_hex, suffix)
+    elif minio_object_name is None:
+        minio_object_name = f"{uuid.uuid4().hex}{suffix}"
+
+    ensure_bucket(bucket_name)
+
+    if content_addressed and object_exists(bucket_name, minio_object_name):
+        logger.info(f"MinIO object exists, skip upload: minio://{bucket_name}/{minio_object_name}")
+        return f"minio://{bucket_name}/{minio_object_name}"
+
+    tags = None if content_addressed else upload_tags()
+    try:
+        get_minio_client().put_object(
+            bucket_name,
+            minio_object_name,
+            io.BytesIO(data),
+            length=len(data),
+            content_type=content_type,
+            metadata={"sha256": sha256_hex} if sha256_hex else None,
+            tags=tags,
+            **upload_options(),
+        )
+    except S3Error as e:
+        _forget_bucket_on_error(bucket_name, e)
+        raise
+    logger.info(f"MinIO path: minio://{bucket_name}/{minio_object_name}")
+    if tags is not None:
+        record_artifact(f"minio://{bucket_name}/{minio_object_name}", tagged=True)
+    return f"minio://{bucket_name}/{minio_object_name}"
         
 
 
@@ -94,6 +297,14 @@ def upload_file_to_minio(
 
 
 
+def split_minio_uri(uri: str):
+    """minio://bucket/path/to/object -> (bucket, path/to/object)"""
+    parsed = urlparse(uri)
+    if parsed.scheme != 'minio':
+        raise ValueError("无效的MinIO URI，必须以 minio:// 开头")
+    return parsed.netloc, parsed.path.lstrip('/')
+
+
 def download_from_minio_uri(uri: str, local_path: str = None) -> str:
     """
     通过MinIO路径下载文件
@@ -113,12 +324,7 @@ def download_from_minio_uri(uri: str, local_path: str = None) -> str:
         IOError: 本地文件错误
     """
     # 解析URI
-    parsed = urlparse(uri)
-    if parsed.scheme != 'minio':
-        raise ValueError("无效的MinIO URI，必须以 minio:// 开头")
-    
-    bucket_name = parsed.netloc
-    object_name = parsed.path.lstrip('/')
+    bucket_name, object_name = split_minio_uri(uri)
     original_filename = os.path.basename(object_name)
     
     # 生成带UUID的新文件名
@@ -138,14 +344,67 @@ def download_from_minio_uri(uri: str, local_path: str = None) -> str:
     # 确保目录存在
     os.makedirs(os.path.dirname(local_path), exist_ok=True)
     
-    # 执行下载
-    minio_client.fget_object(
-        bucket_name=bucket_name,
-        object_name=object_name,
-        file_path=local_path
-    )
+    # 执行下载：尚在后台上传的产物直接写出内存中的数据；
+    # 否则经本地磁盘缓存读取（ETag校验），复制一份给调用方，调用方可自由修改或删除
+    data = pending_bytes(uri)
+    if data is not None:
+        with open(local_path, "wb") as f:
+            f.write(data)
+    elif DOWNLOAD_CACHE_ENABLED:
+        with get_download_cache().open(get_minio_client(), bucket_name, object_name) as cached:
+            copy_atomic(cached, local_path)
+    else:
+        # 大对象按Range分片并行下载；先写入临时文件，完成后原子替换
+        tmp_path = f"{local_path}.{uuid.uuid4().hex}.part"
+        try:
+            fget_object_parallel(get_minio_client(), bucket_name, object_name, tmp_path)
+            os.replace(tmp_path, local_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
     
     # 返回绝对路径
     return os.path.abspath(local_path)
 
+
+@contextmanager
+def open_minio_object(uri: str) -> Iterator[BinaryIO]:
+    """
+    以只读二进制流打开MinIO对象，供解析器直接读取，不在调用方目录落地临时文件
+
+    尚在后台上传（write-behind）的产物直接读取内存中的数据；开启下载缓存时打开缓存中的本地副本
+    （ETag校验），否则直接流式读取get_object的响应。
+
+    Example:
+        with open_minio_object(uri) as f:
+            df = pd.read_csv(f)
+    """
+    bucket_name, object_name = split_minio_uri(uri)
+    data = pending_bytes(uri)
+    if data is not None:
+        yield io.BytesIO(data)
+        return
+    if DOWNLOAD_CACHE_ENABLED:
+        with get_download_cache().open(get_minio_client(), bucket_name, object_name) as f:
+            yield f
+        return
+
+    response = get_minio_client().get_object(bucket_name, object_name)
+    try:
+        yield response
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def read_minio_bytes(uri: str) -> bytes:
+    """读取MinIO对象的全部内容"""
+    with open_minio_object(uri) as f:
+        return f.read()
+
+
+def read_minio_text(uri: str, encoding: str = "utf-8") -> str:
+    """读取MinIO文本对象（FASTA/CSV/TXT）"""
+    return read_minio_bytes(uri).decode(encoding)
+
 # download_from_minio_uri("minio://molly/96083419-f950-43ea-99cf-35bc97b4cc17_bigmhc_im.fasta","/mnt/workspace/dev/ljs/dev_0.4/mRNAPredictionAgent/src/utils")
@@ -0,0 +1,436 @@
+import asyncio
+import hashlib
+import json
+import math
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.async_storage import run_storage_op
+from src.utils.inline_payload import stage_tool_input
+from src.utils.log import logger
+from src.utils.result_tables import publish_result_table, read_result_table
+
+
+CACHE_CONFIG = CONFIG_YAML.get("PREDICTION_CACHE", {})
+CACHE_ENABLED = CACHE_CONFIG.get("enabled", True)
+CACHE_DB_PATH = CACHE_CONFIG.get("db_path", "prediction_cache.sqlite")
+CACHE_MAX_ENTRIES = CACHE_CONFIG.get("max_entries", 2000000)
+CACHE_TOOL_VERSIONS = CACHE_CONFIG.get("tool_versions", {}) or {}
+MINIO_BUCKET = CONFIG_YAML["MINIO"]["molly_bucket"]
+
+# 单条SQL中IN列表的最大长度，避免超过SQLite变量数限制
+_QUERY_CHUNK = 500
+
+_CREATE_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS predictions (
+        tool TEXT NOT NULL,
+        version TEXT NOT NULL,
+        params TEXT NOT NULL,
+        allele TEXT NOT NULL,
+        peptide TEXT NOT NULL,
+        row TEXT NOT NULL,
+        accessed_at REAL NOT NULL,
+        PRIMARY KEY (tool, version, params, allele, peptide)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_predictions_accessed_at ON predictions (accessed_at)",
+]
+
+
+def normalize_allele(allele: str) -> str:
+    """HLA-A*02:01 / HLA-A02:01 视为同一等位基因"""
+    return str(allele).strip().replace("*", "").upper()
+
+
+def params_hash(params: Optional[Dict[str, Any]]) -> str:
+    raw = json.dumps(params or {}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _json_safe(value: Any) -> Any:
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, "item"):
+        # numpy标量
+        return _json_safe(value.item())
+    return value
+
+
+class PredictionCache:
+    """
+    持久化的肽段-等位基因预测结果缓存（SQLite）
+
+    键为 (tool, tool版本, 参数hash, allele, peptide)，值为工具输出表中该肽段的一整行。
+    条目数超过max_entries时按最近访问时间淘汰（LRU），并记录各工具的命中/未命中次数。
+    """
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, max_entries: int = CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for sql in _CREATE_SQL:
+            self._conn.execute(sql)
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0, "writes": 0})
+        self._evictions = 0
+
+    def get_many(
+        self,
+        tool: str,
+        pairs: Iterable[Tuple[str, str]],
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        批量查询 (allele, peptide)，返回命中的 {(规范化allele, peptide): row}
+        """
+        version = str(CACHE_TOOL_VERSIONS.get(tool, ""))
+        params_key = params_hash(params)
+        by_allele: Dict[str, set] = defaultdict(set)
+        for allele, peptide in pairs:
+            by_allele[normalize_allele(allele)].add(peptide)
+
+        found: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        total = sum(len(peptides) for peptides in by_allele.values())
+        now = time.time()
+        with self._lock:
+            for allele, peptides in by_allele.items():
+                peptides = list(peptides)
+                for i in range(0, len(peptides), _QUERY_CHUNK):
+                    chunk = peptides[i:i + _QUERY_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._conn.execute(
+                        f"SELECT peptide, row FROM predictions WHERE tool = ? AND version = ? AND params = ? "
+                        f"AND allele = ? AND peptide IN ({placeholders})",
+                        [tool, version, params_key, allele, *chunk],
+                    ).fetchall()
+                    for peptide, row in rows:
+                        found[(allele, peptide)] = json.loads(row)
+            if found:
+                self._conn.executemany(
+                    "UPDATE predictions SET accessed_at = ? WHERE tool = ? AND version = ? AND params = ? "
+                    "AND allele = ? AND peptide = ?",
+                    [(now, tool, version, params_key, allele, peptide) for allele, peptide in found],
+                )
+                self._conn.commit()
+            self._stats[tool]["hits"] += len(found)
+            self._stats[tool]["misses"] += total - len(found)
+        return found
+
+    def put_many(
+        self,
+        tool: str,
+        rows: Dict[Tuple[str, str], Dict[str, Any]],
+        params: Optional[Dict[str, Any]] = None,
+    ):
+        """写入 {(allele, peptide): row}，超出容量时淘汰最久未访问的条目"""
+        if not rows:
+            return
+        version = str(CACHE_TOOL_VERSIONS.get(tool, ""))
+        params_key = params_hash(params)
+        now = time.time()
+        records = [
+            (
+                tool, version, params_key, normalize_allele(allele), peptide,
+                json.dumps({key: _json_safe(value) for key, value in row.items()}, ensure_ascii=False),
+                now,
+            )
+            for (allele, peptide), row in rows.items()
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO predictions (tool, version, params, allele, peptide, row, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                records,
+            )
+            self._conn.commit()
+            self._stats[tool]["writes"] += len(records)
+            # INSERT OR REPLACE对已存在的键同样计数，这里重新统计以保持准确
+            if self._conn.total_changes - before:
+                self._entries = self._conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+            self._evict_locked()
+
+    def _evict_locked(self):
+        if self._entries <= self.max_entries:
+            return
+        # 淘汰到容量的90%，避免每次写入都触发淘汰
+        target = int(self.max_entries * 0.9)
+        to_delete = self._entries - target
+        self._conn.execute(
+            "DELETE FROM predictions WHERE rowid IN "
+            "(SELECT rowid FROM predictions ORDER BY accessed_at ASC LIMIT ?)",
+            (to_delete,),
+        )
+        self._conn.commit()
+        self._entries = target
+        self._evictions += to_delete
+        logger.info(f"Prediction cache evicted {to_delete} entries")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = {}
+            for tool, counters in self._stats.items():
+                lookups = counters["hits"] + counters["misses"]
+                tools[tool] = {**counters, "hit_rate": round(counters["hits"] / lookups, 4) if lookups else None}
+            return {
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+                "evictions": self._evictions,
+                "tools": tools,
+            }
+
+
+_cache: Optional[PredictionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache() -> PredictionCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache()
+    return _cache
+
+
+def get_prediction_cache_stats() -> Dict[str, Any]:
+    if not CACHE_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **get_prediction_cache().stats()}
+
+
+def markdown_table(df: pd.DataFrame, max_rows: int = 50) -> str:
+    if df.empty:
+        return "**警告**: 没有符合条件的结果"
+    headers = [str(col) for col in df.columns]
+    lines = ["| " + " | ".join(headers) + " |", "| " + " | ".join(["---"] * len(headers)) + " |"]
+    for _, row in df.head(max_rows).iterrows():
+        lines.append("| " + " | ".join("" if pd.isna(row[col]) else str(row[col]) for col in df.columns) + " |")
+    if len(df) > max_rows:
+        lines.append(f"\n共 {len(df)} 行，仅展示前 {max_rows} 行，完整结果见结果文件")
+    return "\n".join(lines)
+
+
+def _link_result(uri: str, content: str) -> str:
+    return json.dumps({"type": "link", "url": uri, "content": content}, ensure_ascii=False)
+
+
+async def cached_pair_prediction(
+    tool: str,
+    pairs: List[Tuple[str, str]],
+    call_upstream: Callable[[List[Tuple[str, str]]], Awaitable[str]],
+    result_bucket: str,
+    allele_column: str = "mhc",
+    peptide_column: str = "pep",
+    params: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    对 (allele, peptide) 列表逐对打分的工具（BigMHC）加缓存：只把未命中的组合发给上游
+
+    Args:
+        tool: 缓存中的工具名，例如 "BigMHC_EL"
+        pairs: 需要预测的 (allele, peptide)
+        call_upstream: 以未命中组合调用上游工具，返回工具原始JSON结果
+        result_bucket: 合并结果表的上传桶
+        allele_column / peptide_column: 结果表中allele、肽段所在列
+        params: 影响打分结果的参数
+
+    Returns:
+        str: 与上游一致的 {"type": "link", "url": ..., "content": ...} JSON字符串
+    """
+    if not CACHE_ENABLED:
+        return await call_upstream(pairs)
+
+    cache = get_prediction_cache()
+    cached = await asyncio.to_thread(cache.get_many, tool, pairs, params)
+    misses = list(dict.fromkeys(
+        (allele, peptide) for allele, peptide in pairs if (normalize_allele(allele), peptide) not in cached
+    ))
+    logger.info(f"{tool} prediction cache: {len(pairs) - len(misses)}/{len(pairs)} pairs cached")
+
+    fresh_rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    columns: List[str] = []
+    if misses:
+        result = await call_upstream(misses)
+        result_dict = json.loads(result)
+        if result_dict.get("type") != "link":
+            return result
+        df = await run_storage_op("prediction_cache.read_result", read_result_table, result_dict["url"])
+        columns = list(df.columns)
+        for row in df.to_dict("records"):
+            fresh_rows[(normalize_allele(row[allele_column]), str(row[peptide_column]))] = row
+        await asyncio.to_thread(cache.put_many, tool, fresh_rows, params)
+        if not cached:
+            # 全部未命中时上游结果即完整结果
+            return result
+
+    merged = []
+    for allele, peptide in pairs:
+        key = (normalize_allele(allele), peptide)
+        row = fresh_rows.get(key) or cached.get(key)
+        if row is not None:
+            merged.append(row)
+            if not columns:
+                columns = list(row.keys())
+    df = pd.DataFrame(merged, columns=columns or None)
+    uri = await run_storage_op("prediction_cache.publish_result", publish_result_table, df, result_bucket, tool.lower())
+    return _link_result(uri, markdown_table(df))
+
+
+def read_fasta_records(uri: str) -> List[Tuple[str, str]]:
+    """读取minio上的FASTA文件，返回 [(header, sequence)]"""
+    from src.utils.fasta import iter_fasta_uri
+
+    # 第一个'>'之前的内容没有表头，不参与预测
+    return [record for record in iter_fasta_uri(uri) if record.header]
+
+
+def _windows(sequence: str, lengths: List[int]) -> List[Tuple[int, str]]:
+    return [
+        (start, sequence[start:start + length])
+        for length in lengths
+        for start in range(len(sequence) - length + 1)
+    ]
+
+
+async def cached_fasta_prediction(
+    tool: str,
+    input_file: str,
+    alleles: List[str],
+    lengths: List[int],
+    call_upstream: Callable[[str], Awaitable[str]],
+    result_bucket: str,
+    columns: Dict[str, str],
+    summary_template: str,
+    pos_base: int = 1,
+    params: Optional[Dict[str, Any]] = None,
+    summary_per_record: bool = True,
+    content_builder: Optional[Callable[[pd.DataFrame], str]] = None,
+) -> str:
+    """
+    对FASTA序列按滑窗切肽后打分的工具（NetMHCpan / NetMHCstabpan）加缓存
+
+    一条序列的所有滑窗肽段在所有allele下都命中时不再发给上游；其余序列组成精简FASTA
+    调用上游，结果写回缓存后与命中部分合并成同样结构的结果表。
+    无论缓存命中多少（包括全部未命中），结果表和content都由同一份逐行结果重建，
+    同样的输入得到同样的输出。
+
+    Args:
+        tool: 缓存中的工具名
+        input_file: 输入FASTA的minio路径
+        alleles: 等位基因列表
+        lengths: 肽段长度列表
+        call_upstream: 以给定输入FASTA（minio路径或内联的InlineFile）调用上游工具，返回工具原始JSON结果
+        result_bucket: 合并结果表的上传桶
+        columns: 结果表列名映射，需包含 pos / allele / peptide / identity / bind_level
+        summary_template: 统计行的格式，可用 {identity} {allele} {strong} {weak} {total}
+        pos_base: 结果表Pos列的起始编号
+        params: 影响打分结果的参数（如结合阈值）
+        summary_per_record: True时每条序列、每个allele的结果之后各一条统计行（NetMHCpan）；
+            False时只在表末保留第一条序列、第一个allele的统计行（NetMHCstabpan的结果表）
+        content_builder: 由结果表生成content（与上游工具相同格式），默认列出WB/SB肽段
+
+    Returns:
+        str: 与上游一致的 {"type": "link", "url": ..., "content": ...} JSON字符串
+    """
+    if not CACHE_ENABLED or not input_file.startswith("minio://"):
+        return await call_upstream(input_file)
+    try:
+        records = await run_storage_op("prediction_cache.read_fasta", read_fasta_records, input_file)
+    except Exception as e:
+        logger.warning(f"{tool} prediction cache skipped, failed to read {input_file}: {e}")
+        return await call_upstream(input_file)
+    if not records:
+        return await call_upstream(input_file)
+
+    cache = get_prediction_cache()
+    record_windows = [_windows(seq, lengths) for _, seq in records]
+    pairs = {(allele, peptide) for windows in record_windows for _, peptide in windows for allele in alleles}
+    cached = await asyncio.to_thread(cache.get_many, tool, pairs, params)
+    logger.info(f"{tool} prediction cache: {len(cached)}/{len(pairs)} allele-peptide pairs cached")
+
+    fresh_rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    table_columns: List[str] = []
+    miss_records = [
+        record for record, windows in zip(records, record_windows)
+        if any((normalize_allele(allele), peptide) not in cached for _, peptide in windows for allele in alleles)
+    ]
+    if miss_records:
+        upstream_input = input_file
+        if cached:
+            fasta = "\n".join(f">{header}\n{seq}" for header, seq in miss_records) + "\n"
+            # 未命中序列较少时直接内联在请求体中，否则上传MinIO
+            upstream_input = await stage_tool_input(
+                tool, fasta, MINIO_BUCKET, f"{uuid.uuid4().hex}_{tool.lower()}_cache_miss.fasta", content_type="text/plain",
+            )
+        result = await call_upstream(upstream_input)
+        result_dict = json.loads(result)
+        if result_dict.get("type") != "link":
+            return result
+        df = await run_storage_op("prediction_cache.read_result", read_result_table, result_dict["url"])
+        table_columns = list(df.columns)
+        peptide_column, allele_column = columns["peptide"], columns["allele"]
+        # 统计行的peptide列为空，据此过滤
+        for row in df[df[peptide_column].notna()].to_dict("records"):
+            fresh_rows[(normalize_allele(row[allele_column]), str(row[peptide_column]))] = row
+        await asyncio.to_thread(cache.put_many, tool, fresh_rows, params)
+
+    merged = []
+    summaries = []
+    bind_level_column = columns["bind_level"]
+    for allele in alleles:
+        for (header, _), windows in zip(records, record_windows):
+            identity = header.split()[0][:15] if header else ""
+            # 统计行中的allele与结果行一致（上游输出的写法，如HLA-A*02:01）
+            allele_label = allele
+            strong = weak = total = 0
+            for start, peptide in windows:
+                key = (normalize_allele(allele), peptide)
+                row = fresh_rows.get(key) or cached.get(key)
+                if row is None:
+                    continue
+                row = dict(row)
+                row[columns["pos"]] = start + pos_base
+                row[columns["identity"]] = identity
+                merged.append(row)
+                if not table_columns:
+                    table_columns = list(row.keys())
+                if not total:
+                    allele_label = row.get(columns["allele"]) or allele
+                bind_level = str(row.get(bind_level_column) or "")
+                strong += "SB" in bind_level
+                weak += "WB" in bind_level
+                total += 1
+            summary = {columns["pos"]: summary_template.format(
+                identity=identity, allele=allele_label, strong=strong, weak=weak, total=total,
+            )}
+            if summary_per_record:
+                merged.append(summary)
+            summaries.append(summary)
+    if not summary_per_record and summaries:
+        merged.append(summaries[0])
+
+    df = pd.DataFrame(merged, columns=table_columns or None)
+    uri = await run_storage_op("prediction_cache.publish_result", publish_result_table, df, result_bucket, tool.lower())
+    if content_builder is not None:
+        return _link_result(uri, content_builder(df))
+    binders = df[df[bind_level_column].astype(str).str.contains("SB|WB", na=False)]
+    return _link_result(uri, markdown_table(binders))
@@ -0,0 +1,52 @@
+import sys
+
+from pathlib import Path
+from typing import Any, Dict
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from src.utils.http_client import post_json
+from src.utils.inline_payload import decode_inline_result, encode_inline_payload
+from src.utils.resilience import call_with_retry
+from src.utils.run_manifest import record_result_uris
+from src.utils.single_flight import single_flight
+from src.utils.tool_jobs import job_mode_enabled, run_tool_job
+from src.utils.write_behind import wait_persisted
+
+
+async def call_remote_tool(tool_name: str, url: str, payload: Dict[str, Any]) -> Any:
+    """
+    远程工具调用入口，各工具客户端统一通过这里访问工具服务
+
+    Args:
+        tool_name: 工具名，与config.yaml中HTTP_CLIENT.timeouts / TOOL_JOBS.tools / INLINE_PAYLOAD.tools的键一致
+        url: 同步接口地址
+        payload: 请求体，文件字段可以是minio路径或stage_tool_input返回的InlineFile
+
+    Returns:
+        Any: 工具服务返回的结果（通常为 {"type": "link", "url": ...} JSON字符串）
+
+    Raises:
+        CircuitOpenError: 工具服务端点熔断中，立即失败
+    """
+    # 小文件（InlineFile及仍在内存中的后台上传产物）直接放进请求体，不经MinIO中转
+    payload = encode_inline_payload(tool_name, payload)
+    # 其余引用的后台上传产物须先写入MinIO，工具服务才能读取
+    await wait_persisted(payload)
+
+    async def call():
+        if job_mode_enabled(tool_name):
+            # 长时间任务：提交作业后轮询结果，不长时间占用连接；
+            # 重试时run_tool_job会接着轮询已提交的作业而不是重新提交
+            result = await call_with_retry(tool_name, url, lambda: run_tool_job(tool_name, payload))
+        else:
+            result = await call_with_retry(tool_name, url, lambda: post_json(tool_name, url, payload))
+        # 内联返回的小结果在本进程内直接使用，MinIO写入在后台进行
+        return await decode_inline_result(tool_name, result)
+
+    # 并发的相同调用（同工具、同参数、同输入内容）共享一次上游请求
+    result = await single_flight(tool_name, payload, call)
+    # 工具服务写入的结果对象登记到当前运行清单
+    record_result_uris(result, tool_name)
+    return result
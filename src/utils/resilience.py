@@ -0,0 +1,207 @@
+import aiohttp
+import asyncio
+import random
+import sys
+import threading
+import time
+
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.log import logger
+
+
+RESILIENCE_CONFIG = CONFIG_YAML.get("RESILIENCE", {})
+RETRY_CONFIG = RESILIENCE_CONFIG.get("retry", {})
+RETRY_MAX_RETRIES = RETRY_CONFIG.get("max_retries", 2)
+RETRY_BACKOFF_BASE = RETRY_CONFIG.get("backoff_base", 0.5)
+RETRY_BACKOFF_MAX = RETRY_CONFIG.get("backoff_max", 8)
+RETRY_IDEMPOTENT_TOOLS = set(RETRY_CONFIG.get("idempotent_tools", []) or [])
+BREAKER_CONFIG = RESILIENCE_CONFIG.get("circuit_breaker", {})
+BREAKER_FAILURE_THRESHOLD = BREAKER_CONFIG.get("failure_threshold", 5)
+BREAKER_RECOVERY_TIMEOUT = BREAKER_CONFIG.get("recovery_timeout", 30)
+BREAKER_HALF_OPEN_MAX_CALLS = BREAKER_CONFIG.get("half_open_max_calls", 1)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """工具服务处于熔断状态，调用被直接拒绝"""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super().__init__(f"工具服务 {endpoint} 暂时不可用（已熔断），请约 {int(retry_after) + 1} 秒后重试")
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """连接错误、超时、5xx/429 视为服务端暂时性故障：可重试，并计入熔断失败次数"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    单个工具服务端点（host:port）的熔断器
+
+    closed: 正常放行，连续暂时性失败达到failure_threshold后进入open
+    open: 直接拒绝调用（CircuitOpenError），recovery_timeout后进入half_open
+    half_open: 最多放行half_open_max_calls个探测请求，成功则closed，失败则重新open
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        recovery_timeout: float = BREAKER_RECOVERY_TIMEOUT,
+        half_open_max_calls: int = BREAKER_HALF_OPEN_MAX_CALLS,
+    ):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.half_open_calls = 0
+        self.total_failures = 0
+        self.total_rejected = 0
+        # 同步工具在各自线程的事件循环中调用，状态修改需加锁
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == STATE_OPEN:
+                elapsed = time.monotonic() - self.opened_at
+                if elapsed < self.recovery_timeout:
+                    self.total_rejected += 1
+                    raise CircuitOpenError(self.endpoint, self.recovery_timeout - elapsed)
+                self.state = STATE_HALF_OPEN
+                self.half_open_calls = 0
+                logger.info(f"Circuit breaker {self.endpoint} half-open, probing")
+            if self.state == STATE_HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    self.total_rejected += 1
+                    raise CircuitOpenError(self.endpoint, self.recovery_timeout)
+                self.half_open_calls += 1
+
+    def record_success(self):
+        with self._lock:
+            if self.state != STATE_CLOSED:
+                logger.info(f"Circuit breaker {self.endpoint} closed")
+            self.state = STATE_CLOSED
+            self.consecutive_failures = 0
+            self.half_open_calls = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.total_failures += 1
+            if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != STATE_OPEN:
+                    logger.warning(
+                        f"Circuit breaker {self.endpoint} opened after {self.consecutive_failures} consecutive failures"
+                    )
+                self.state = STATE_OPEN
+                self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """非暂时性错误（如4xx）不影响熔断状态，但需释放half_open的探测名额"""
+        with self._lock:
+            if self.state == STATE_HALF_OPEN and self.half_open_calls > 0:
+                self.half_open_calls -= 1
+
+    async def call(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        self.before_call()
+        try:
+            result = await func()
+        except Exception as e:
+            if is_transient_error(e):
+                self.record_failure()
+            else:
+                self.release_probe()
+            raise
+        except BaseException:
+            # 任务被取消等情况同样释放探测名额
+            self.release_probe()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_after = None
+            if self.state == STATE_OPEN:
+                retry_after = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "total_failures": self.total_failures,
+                "total_rejected": self.total_rejected,
+                "retry_after": retry_after,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def endpoint_of(url: str) -> str:
+    return urlparse(url).netloc or url
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """按端点（host:port）获取熔断器，同一工具服务器上的多个工具共享一个熔断器"""
+    endpoint = endpoint_of(url)
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker(endpoint)
+        return _breakers[endpoint]
+
+
+def get_breaker_states() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.endpoint: breaker.snapshot() for breaker in breakers}
+
+
+def is_endpoint_available(url: str) -> bool:
+    """端点未熔断（closed/half_open或熔断已到恢复时间）时返回True，不占用探测名额"""
+    snapshot = get_breaker(url).snapshot()
+    return snapshot["state"] != STATE_OPEN or snapshot["retry_after"] == 0
+
+
+async def call_with_retry(tool_name: str, url: str, func: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    经熔断器调用func；幂等工具（RESILIENCE.retry.idempotent_tools）遇暂时性故障时按带抖动的指数退避重试
+
+    Raises:
+        CircuitOpenError: 端点熔断中，直接失败不等待超时
+        其余异常: 重试耗尽后抛出最后一次的异常
+    """
+    breaker = get_breaker(url)
+    max_retries = RETRY_MAX_RETRIES if tool_name in RETRY_IDEMPOTENT_TOOLS else 0
+    attempt = 0
+    while True:
+        try:
+            return await breaker.call(func)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            if attempt >= max_retries or not is_transient_error(e):
+                raise
+            # full jitter
+            delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** attempt)))
+            attempt += 1
+            logger.warning(
+                f"{tool_name} call failed ({type(e).__name__}: {e}), retry {attempt}/{max_retries} in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
@@ -0,0 +1,139 @@
+import sys
+import uuid
+
+from io import BytesIO
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+from minio.error import S3Error
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.log import logger
+from src.utils.xlsx_export import dataframe_rows, write_xlsx
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+RESULT_TABLES_CONFIG = CONFIG_YAML.get("RESULT_TABLES", {})
+# 是否同时生成给用户下载的Excel；机器读取一律使用Parquet
+EXCEL_EXPORT = RESULT_TABLES_CONFIG.get("excel_export", True)
+
+PARQUET_SUFFIX = ".parquet"
+EXCEL_SUFFIX = ".xlsx"
+PARQUET_CONTENT_TYPE = "application/vnd.apache.parquet"
+EXCEL_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def typed_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    把正则解析得到的字符串列转换为数值列（空字符串视为缺失），其余文本列统一为string类型
+
+    只有非空值全部可以转换为数值的列才会转换，例如NetMHCpan的Pos列含统计行文本，保持字符串。
+    """
+    df = df.copy()
+    for column in df.columns:
+        if df[column].dtype != object and not pd.api.types.is_string_dtype(df[column]):
+            continue
+        values = df[column].replace("", pd.NA)
+        non_empty = values.notna().sum()
+        converted = pd.to_numeric(values, errors="coerce")
+        if non_empty and converted.notna().sum() == non_empty:
+            df[column] = converted
+        else:
+            df[column] = df[column].astype("string")
+    return df
+
+
+def parquet_name(path: str) -> str:
+    """结果文件对应的Parquet文件名/URI：xxx.xlsx -> xxx.parquet"""
+    if path.endswith(EXCEL_SUFFIX):
+        return path[:-len(EXCEL_SUFFIX)] + PARQUET_SUFFIX
+    return path + PARQUET_SUFFIX
+
+
+def to_parquet_bytes(df: pd.DataFrame) -> bytes:
+    buffer = BytesIO()
+    typed_columns(df).to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def to_excel_bytes(df: pd.DataFrame, sheet_name: str = "Results") -> bytes:
+    buffer = BytesIO()
+    write_xlsx(buffer, [str(column) for column in df.columns], dataframe_rows(df), sheet_name=sheet_name)
+    return buffer.getvalue()
+
+
+def save_parquet(df: pd.DataFrame, excel_path) -> Optional[Path]:
+    """
+    在Excel结果旁写出同名的Parquet文件，供*_to_excel转换器使用
+
+    Returns:
+        Optional[Path]: Parquet文件路径；未安装pyarrow时返回None
+    """
+    if not PARQUET_AVAILABLE:
+        return None
+    parquet_path = Path(parquet_name(str(excel_path)))
+    parquet_path.write_bytes(to_parquet_bytes(df))
+    return parquet_path
+
+
+def read_result_table(uri: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    读取工具输出的结果表，只加载需要的列
+
+    .parquet 直接读取；.xlsx 先读取同名的 .parquet（工具服务或publish_result_table生成），
+    不存在时才回退到pd.read_excel。
+
+    Args:
+        uri: 结果文件的minio路径
+        columns: 需要的列，None表示全部
+
+    Returns:
+        pd.DataFrame: 结果表
+    """
+    from src.utils.minio_utils import read_minio_bytes
+    from src.utils.write_behind import pending_bytes
+
+    parquet_uri = uri if uri.endswith(PARQUET_SUFFIX) else parquet_name(uri)
+    # 内联返回、尚在后台写入的结果表只在内存中，没有Parquet兄弟文件，不再请求MinIO
+    in_memory_only = parquet_uri != uri and pending_bytes(uri) is not None and pending_bytes(parquet_uri) is None
+    if PARQUET_AVAILABLE and not in_memory_only:
+        try:
+            return pd.read_parquet(BytesIO(read_minio_bytes(parquet_uri)), columns=columns)
+        except S3Error as e:
+            if parquet_uri == uri or e.code not in ("NoSuchKey", "NoSuchObject"):
+                raise
+        logger.debug(f"No Parquet sibling for {uri}, falling back to Excel")
+    return pd.read_excel(BytesIO(read_minio_bytes(uri)), usecols=columns)
+
+
+def publish_result_table(df: pd.DataFrame, bucket: str, suffix: str) -> str:
+    """
+    将结果表上传为Parquet（机器读取）及可选的Excel导出（EXCEL_EXPORT），返回minio路径
+
+    开启Excel导出时返回.xlsx地址（展示给用户），read_result_table会自动读取同名的.parquet；
+    否则返回.parquet地址。
+    """
+    from src.utils.minio_utils import upload_bytes_to_minio
+
+    name = f"{uuid.uuid4().hex}_{suffix}"
+    uri = None
+    if PARQUET_AVAILABLE:
+        uri = upload_bytes_to_minio(
+            to_parquet_bytes(df), bucket, name + PARQUET_SUFFIX,
+            content_type=PARQUET_CONTENT_TYPE, content_addressed=False,
+        )
+    if EXCEL_EXPORT or uri is None:
+        uri = upload_bytes_to_minio(
+            to_excel_bytes(df), bucket, name + EXCEL_SUFFIX,
+            content_type=EXCEL_CONTENT_TYPE, content_addressed=False,
+        )
+    return uri
@@ -0,0 +1,349 @@
+import json
+import sys
+import threading
+import time
+import uuid
+
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from minio.commonconfig import ENABLED, Filter, Tag, Tags
+from minio.deleteobjects import DeleteObject
+from minio.error import S3Error
+from minio.lifecycleconfig import Expiration, LifecycleConfig, Rule
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.async_storage import run_storage_op
+from src.utils.log import logger
+
+
+RUN_MANIFEST_CONFIG = CONFIG_YAML.get("RUN_MANIFEST", {})
+RUN_MANIFEST_ENABLED = RUN_MANIFEST_CONFIG.get("enabled", True)
+# 清单保存位置：minio://<bucket>/<prefix><run_id>.json
+RUN_MANIFEST_BUCKET = RUN_MANIFEST_CONFIG.get("bucket", CONFIG_YAML["MINIO"]["molly_bucket"])
+RUN_MANIFEST_PREFIX = RUN_MANIFEST_CONFIG.get("prefix", "runs/")
+# 流程结束后立即批量删除中间产物；否则保留，由 DELETE /runs/{run_id}/intermediates 或生命周期规则清理
+CLEANUP_ON_FINISH = RUN_MANIFEST_CONFIG.get("cleanup_on_finish", False)
+# 大于0时启动时为各结果桶设置生命周期规则：带 artifact-role=intermediate 标签的对象N天后过期
+INTERMEDIATE_EXPIRE_DAYS = RUN_MANIFEST_CONFIG.get("intermediate_expire_days", 0)
+
+ROLE_INPUT = "input"
+ROLE_INTERMEDIATE = "intermediate"
+ROLE_DELIVERABLE = "deliverable"
+RUN_ID_TAG = "run-id"
+ROLE_TAG = "artifact-role"
+LIFECYCLE_RULE_ID = "expire-run-intermediates"
+# 内容寻址对象可能被多次运行共享，只记录不删除
+_SHARED_PREFIX = "sha256/"
+
+
+class ArtifactRun:
+    """一次流水线运行产生的全部MinIO对象及其角色（输入/中间产物/交付物）"""
+
+    def __init__(self, tool: str, run_id: str = None):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.tool = tool
+        self.started = time.time()
+        # 流水线自行捕获异常时可将其置为"failed"
+        self.status = "running"
+        # URI -> {"role", "stage", "tagged"}；tagged表示对象标签已与role一致
+        self.artifacts: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, uri: str, role: str = ROLE_INTERMEDIATE, stage: str = None, tagged: bool = False):
+        with self._lock:
+            entry = self.artifacts.get(uri)
+            if entry is None:
+                self.artifacts[uri] = {"role": role, "stage": stage, "tagged": tagged}
+            elif entry["role"] == ROLE_INTERMEDIATE and role != ROLE_INTERMEDIATE:
+                # 输入与交付物不会被降级为中间产物
+                entry["role"] = role
+                entry["tagged"] = False
+
+    def object_tags(self, role: str = ROLE_INTERMEDIATE) -> Tags:
+        tags = Tags(for_object=True)
+        tags[RUN_ID_TAG] = self.run_id
+        tags[ROLE_TAG] = role
+        return tags
+
+
+_current_run: ContextVar[Optional[ArtifactRun]] = ContextVar("artifact_run", default=None)
+_stats_lock = threading.Lock()
+_stats = defaultdict(int)
+
+
+def upload_tags() -> Optional[Tags]:
+    """当前运行的对象标签，供上传时直接写入；不在运行中时返回None"""
+    run = _current_run.get()
+    return run.object_tags() if run is not None else None
+
+
+def record_artifact(uri: str, role: str = ROLE_INTERMEDIATE, stage: str = None, tagged: bool = False):
+    """把对象登记到当前运行的清单；不在运行中时忽略"""
+    run = _current_run.get()
+    if run is not None and isinstance(uri, str) and uri.startswith("minio://"):
+        run.record(uri, role, stage, tagged)
+
+
+def mark_deliverable(uri: str):
+    """标记为交付给用户的结果（连同同名的Parquet等兄弟文件），清理时保留"""
+    run = _current_run.get()
+    if run is None or not isinstance(uri, str):
+        return
+    stem = uri.rsplit(".", 1)[0]
+    with run._lock:
+        siblings = [known for known in run.artifacts if known.rsplit(".", 1)[0] == stem]
+    for known in set(siblings + [uri]):
+        run.record(known, ROLE_DELIVERABLE)
+
+
+def _collect_uris(value: Any, uris: List[str]):
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith("minio://"):
+            uris.append(text)
+        elif text.startswith(("{", "[")):
+            try:
+                _collect_uris(json.loads(text), uris)
+            except ValueError:
+                pass
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_uris(item, uris)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _collect_uris(item, uris)
+
+
+def record_result_uris(result: Any, stage: str):
+    """登记远程工具返回结果中引用的对象（由工具服务写入，需在结束时补打标签）"""
+    if _current_run.get() is None:
+        return
+    uris: List[str] = []
+    _collect_uris(result, uris)
+    for uri in uris:
+        record_artifact(uri, ROLE_INTERMEDIATE, stage)
+
+
+def manifest_uri(run_id: str) -> str:
+    return f"minio://{RUN_MANIFEST_BUCKET}/{RUN_MANIFEST_PREFIX}{run_id}.json"
+
+
+def _is_shared(uri: str) -> bool:
+    from src.utils.minio_utils import split_minio_uri
+
+    return split_minio_uri(uri)[1].startswith(_SHARED_PREFIX)
+
+
+def _write_manifest(manifest: Dict[str, Any]):
+    from src.utils.minio_utils import upload_bytes_to_minio
+
+    upload_bytes_to_minio(
+        json.dumps(manifest, ensure_ascii=False, indent=2),
+        RUN_MANIFEST_BUCKET,
+        f"{RUN_MANIFEST_PREFIX}{manifest['run_id']}.json",
+        content_type="application/json",
+        content_addressed=False,
+    )
+
+
+def _tag_artifacts(run: ArtifactRun):
+    # 工具服务写入的对象及角色变化的对象补打标签，生命周期规则据此只清理中间产物
+    from src.utils.minio_utils import get_minio_client, split_minio_uri
+
+    with run._lock:
+        pending = [(uri, entry) for uri, entry in run.artifacts.items() if not entry["tagged"]]
+    for uri, entry in pending:
+        if _is_shared(uri):
+            continue
+        bucket_name, object_name = split_minio_uri(uri)
+        try:
+            get_minio_client().set_object_tags(bucket_name, object_name, run.object_tags(entry["role"]))
+            with run._lock:
+                entry["tagged"] = True
+        except S3Error as e:
+            logger.warning(f"Failed to tag {uri} for run {run.run_id}: {e}")
+
+
+def _finalize(run: ArtifactRun) -> Dict[str, Any]:
+    _tag_artifacts(run)
+    with run._lock:
+        artifacts = [
+            {"uri": uri, "role": entry["role"], "stage": entry["stage"], "tagged": entry["tagged"]}
+            for uri, entry in run.artifacts.items()
+        ]
+    manifest = {
+        "run_id": run.run_id,
+        "tool": run.tool,
+        "status": run.status,
+        "started_at": run.started,
+        "finished_at": time.time(),
+        "cleaned_at": None,
+        "artifacts": artifacts,
+    }
+    if CLEANUP_ON_FINISH:
+        _delete_intermediates(manifest)
+    _write_manifest(manifest)
+    with _stats_lock:
+        _stats["runs"] += 1
+        _stats["artifacts"] += len(artifacts)
+    logger.info(f"Run {run.run_id} ({run.tool}) manifest written: {len(artifacts)} artifacts")
+    return manifest
+
+
+@asynccontextmanager
+async def artifact_run(tool: str, inputs: Iterable[str] = ()) -> AsyncIterator[Optional[ArtifactRun]]:
+    """
+    在一次流水线运行期间登记其产生的全部MinIO对象，结束时补打标签并写出运行清单
+
+    运行期间的上传（upload_*_to_minio、后台写入）自动带上run-id/artifact-role标签，
+    远程工具返回的对象由call_remote_tool登记。
+
+    Args:
+        tool: 流水线/工具名
+        inputs: 用户输入的文件路径，登记为input，不会被清理
+
+    Example:
+        async with artifact_run("NeoAntigenSelection", [input_file]) as run:
+            ...
+            mark_deliverable(final_uri)
+    """
+    if not RUN_MANIFEST_ENABLED:
+        yield None
+        return
+    run = ArtifactRun(tool)
+    for uri in inputs:
+        if isinstance(uri, str) and uri.startswith("minio://"):
+            run.record(uri, ROLE_INPUT, tagged=True)
+    token = _current_run.set(run)
+    try:
+        yield run
+    except BaseException:
+        run.status = "failed"
+        raise
+    finally:
+        _current_run.reset(token)
+        if run.status == "running":
+            run.status = "succeeded"
+        try:
+            await run_storage_op("run_manifest.finalize", _finalize, run)
+        except Exception as e:
+            logger.error(f"Failed to write manifest for run {run.run_id}: {e}")
+
+
+def load_manifest(run_id: str) -> Dict[str, Any]:
+    """
+    读取运行清单
+
+    Raises:
+        S3Error: 清单不存在（NoSuchKey）或MinIO错误
+    """
+    from src.utils.minio_utils import read_minio_bytes
+
+    return json.loads(read_minio_bytes(manifest_uri(run_id)))
+
+
+def _delete_intermediates(manifest: Dict[str, Any]) -> Dict[str, int]:
+    from src.utils.minio_utils import get_minio_client, split_minio_uri
+
+    by_bucket: Dict[str, List[str]] = defaultdict(list)
+    for artifact in manifest["artifacts"]:
+        if artifact["role"] != ROLE_INTERMEDIATE or artifact.get("deleted") or _is_shared(artifact["uri"]):
+            continue
+        bucket_name, object_name = split_minio_uri(artifact["uri"])
+        by_bucket[bucket_name].append(object_name)
+
+    failed = set()
+    for bucket_name, object_names in by_bucket.items():
+        # 每个桶一次批量删除请求（DeleteObjects），只返回失败项
+        errors = get_minio_client().remove_objects(
+            bucket_name, (DeleteObject(name) for name in object_names)
+        )
+        for error in errors:
+            logger.warning(f"Failed to delete minio://{bucket_name}/{error.name}: {error.message}")
+            failed.add(f"minio://{bucket_name}/{error.name}")
+
+    deleted = 0
+    for artifact in manifest["artifacts"]:
+        if artifact["role"] != ROLE_INTERMEDIATE or artifact.get("deleted") or _is_shared(artifact["uri"]):
+            continue
+        if artifact["uri"] not in failed:
+            artifact["deleted"] = True
+            deleted += 1
+    manifest["cleaned_at"] = time.time()
+    with _stats_lock:
+        _stats["deleted"] += deleted
+        _stats["delete_failures"] += len(failed)
+    return {"deleted": deleted, "failed": len(failed)}
+
+
+def cleanup_run(run_id: str) -> Dict[str, Any]:
+    """
+    按运行清单批量删除该次运行的中间产物，保留输入与交付物，并更新清单
+
+    Returns:
+        Dict[str, Any]: run_id、删除数、失败数
+    """
+    manifest = load_manifest(run_id)
+    result = _delete_intermediates(manifest)
+    _write_manifest(manifest)
+    logger.info(f"Run {run_id} intermediates cleaned: {result}")
+    return {"run_id": run_id, **result}
+
+
+def apply_lifecycle_rules(buckets: Iterable[str] = None) -> List[str]:
+    """
+    为结果桶设置生命周期规则：带 artifact-role=intermediate 标签的对象在INTERMEDIATE_EXPIRE_DAYS天后过期
+
+    保留桶上已有的其他规则。INTERMEDIATE_EXPIRE_DAYS不大于0时不做任何操作。
+
+    Returns:
+        List[str]: 已设置规则的桶
+    """
+    from src.utils.minio_utils import MINIO_CONFIG, get_minio_client
+
+    if INTERMEDIATE_EXPIRE_DAYS <= 0:
+        return []
+    if buckets is None:
+        buckets = [value for key, value in MINIO_CONFIG.items() if key.endswith("_bucket")]
+    client = get_minio_client()
+    rule = Rule(
+        ENABLED,
+        rule_filter=Filter(tag=Tag(ROLE_TAG, ROLE_INTERMEDIATE)),
+        rule_id=LIFECYCLE_RULE_ID,
+        expiration=Expiration(days=INTERMEDIATE_EXPIRE_DAYS),
+    )
+    applied = []
+    for bucket_name in sorted(set(buckets)):
+        try:
+            if not client.bucket_exists(bucket_name):
+                continue
+            existing = client.get_bucket_lifecycle(bucket_name)
+            rules = [r for r in (existing.rules if existing else []) if r.rule_id != LIFECYCLE_RULE_ID]
+            client.set_bucket_lifecycle(bucket_name, LifecycleConfig(rules + [rule]))
+            applied.append(bucket_name)
+        except S3Error as e:
+            logger.warning(f"Failed to set lifecycle rule on {bucket_name}: {e}")
+    logger.info(f"Intermediate expiry ({INTERMEDIATE_EXPIRE_DAYS}d) lifecycle rule set on: {applied}")
+    return applied
+
+
+def get_run_manifest_stats() -> Dict[str, Any]:
+    """已写出的运行清单数、登记的对象数及批量清理情况"""
+    with _stats_lock:
+        stats = dict(_stats)
+    return {
+        "enabled": RUN_MANIFEST_ENABLED,
+        "cleanup_on_finish": CLEANUP_ON_FINISH,
+        "intermediate_expire_days": INTERMEDIATE_EXPIRE_DAYS,
+        "runs": stats.get("runs", 0),
+        "artifacts": stats.get("artifacts", 0),
+        "deleted": stats.get("deleted", 0),
+        "delete_failures": stats.get("delete_failures", 0),
+    }
@@ -0,0 +1,139 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import sys
+import threading
+
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.async_storage import run_storage_op
+from src.utils.log import logger
+
+
+SINGLE_FLIGHT_CONFIG = CONFIG_YAML.get("SINGLE_FLIGHT", {})
+SINGLE_FLIGHT_ENABLED = SINGLE_FLIGHT_CONFIG.get("enabled", True)
+
+# 调用方可能位于不同线程的事件循环（同步工具内的asyncio.run），
+# 因此用线程安全的concurrent.futures.Future共享结果，各自通过asyncio.wrap_future等待
+_inflight: Dict[str, concurrent.futures.Future] = {}
+_inflight_lock = threading.Lock()
+_stats = {"leaders": 0, "coalesced": 0}
+
+
+def _object_etag(uri: str) -> Optional[str]:
+    from src.utils.minio_utils import get_minio_client
+
+    parsed = urlparse(uri)
+    try:
+        return get_minio_client().stat_object(parsed.netloc, parsed.path.lstrip("/")).etag
+    except Exception as e:
+        logger.debug(f"stat_object failed for {uri}: {e}")
+        return None
+
+
+def _normalize(value: Any, etags: Dict[str, Optional[str]]) -> Any:
+    """参数规范化：去除字符串首尾空白，minio输入替换为对象ETag（内容相同的不同对象视为同一输入）"""
+    if isinstance(value, dict):
+        return {key: _normalize(item, etags) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item, etags) for item in value]
+    if isinstance(value, str):
+        value = value.strip()
+        if value in etags and etags[value]:
+            return f"etag:{etags[value]}"
+    return value
+
+
+def _collect_minio_uris(value: Any, uris: set):
+    if isinstance(value, dict):
+        for item in value.values():
+            _collect_minio_uris(item, uris)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _collect_minio_uris(item, uris)
+    elif isinstance(value, str) and value.strip().startswith("minio://"):
+        uris.add(value.strip())
+
+
+async def flight_key(tool_name: str, payload: Dict[str, Any]) -> str:
+    """单飞键：sha256(工具名 + 规范化参数 + 输入对象ETag)"""
+    uris = set()
+    _collect_minio_uris(payload, uris)
+    etags = {}
+    for uri in uris:
+        etags[uri] = await run_storage_op("stat_object", _object_etag, uri)
+    raw = json.dumps(
+        {"tool": tool_name, "payload": _normalize(payload, etags)},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def single_flight(tool_name: str, payload: Dict[str, Any], func: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    合并并发的相同工具调用：同一键只有一个调用真正请求上游，其余调用等待并共享其结果（或异常）
+
+    等待方被取消不影响其他调用；发起请求的调用被取消时，等待方收到RuntimeError。
+
+    Args:
+        tool_name: 工具名
+        payload: 请求体，用于计算单飞键
+        func: 真正发起上游请求的协程函数
+
+    Returns:
+        Any: func的结果
+    """
+    if not SINGLE_FLIGHT_ENABLED:
+        return await func()
+
+    key = await flight_key(tool_name, payload)
+    with _inflight_lock:
+        shared = _inflight.get(key)
+        is_leader = shared is None
+        if is_leader:
+            shared = concurrent.futures.Future()
+            # 标记为运行中：某个等待方被取消时只取消它自己的asyncio包装，不会取消共享的结果
+            shared.set_running_or_notify_cancel()
+            _inflight[key] = shared
+            _stats["leaders"] += 1
+        else:
+            _stats["coalesced"] += 1
+
+    if not is_leader:
+        logger.info(f"{tool_name} call coalesced with in-flight request {key[:12]}")
+        return await asyncio.wrap_future(shared)
+
+    try:
+        result = await func()
+    except asyncio.CancelledError:
+        _finish(key, shared)
+        shared.set_exception(RuntimeError(f"{tool_name} 合并的上游调用已被发起方取消"))
+        raise
+    except BaseException as e:
+        _finish(key, shared)
+        shared.set_exception(e)
+        raise
+    _finish(key, shared)
+    shared.set_result(result)
+    return result
+
+
+def _finish(key: str, shared: concurrent.futures.Future):
+    # 先移出登记再设置结果，之后到达的相同调用成为新的leader，不会等待已完成的结果
+    with _inflight_lock:
+        if _inflight.get(key) is shared:
+            del _inflight[key]
+
+
+def get_single_flight_stats() -> Dict[str, int]:
+    with _inflight_lock:
+        return {**_stats, "inflight": len(_inflight)}
@@ -0,0 +1,237 @@
+import aiosqlite
+import asyncio
+import hashlib
+import json
+import random
+import sys
+import time
+
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.http_client import get_json, post_json
+from src.utils.log import logger
+
+
+JOBS_CONFIG = CONFIG_YAML.get("TOOL_JOBS", {})
+JOBS_DB_PATH = JOBS_CONFIG.get("db_path", "tool_jobs.sqlite")
+JOBS_INITIAL_INTERVAL = JOBS_CONFIG.get("initial_interval", 2)
+JOBS_MAX_INTERVAL = JOBS_CONFIG.get("max_interval", 60)
+JOBS_BACKOFF_FACTOR = JOBS_CONFIG.get("backoff_factor", 2)
+JOBS_MAX_WAIT = JOBS_CONFIG.get("max_wait", 6 * 3600)
+JOBS_REQUEST_TIMEOUT = JOBS_CONFIG.get("request_timeout", 30)
+JOBS_TOOLS = JOBS_CONFIG.get("tools", {}) or {}
+
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+_CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS tool_jobs (
+    job_key TEXT PRIMARY KEY,
+    tool_name TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    status_url TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class ToolJobError(Exception):
+    """远程作业执行失败（服务端返回failed状态）"""
+
+
+class ToolJobTimeout(Exception):
+    """作业在max_wait内未完成，作业记录保留，可再次调用继续轮询"""
+
+
+def job_mode_enabled(tool_name: str) -> bool:
+    """TOOL_JOBS.tools.<tool_name>.enabled 为 true 时，该工具走提交-轮询的作业模式"""
+    return bool((JOBS_TOOLS.get(tool_name) or {}).get("enabled", False))
+
+
+def job_key(tool_name: str, payload: Dict[str, Any]) -> str:
+    """相同工具+相同参数对应同一个作业，用于后端重启后恢复轮询"""
+    raw = json.dumps({"tool": tool_name, "payload": payload}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _loads(value: Any) -> Any:
+    # 工具服务习惯返回json.dumps后的字符串，这里兼容字符串与对象两种形式
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _as_envelope(result: Any) -> str:
+    """作业结果统一为原有的 {"type": "link", "url": ...} 等JSON字符串"""
+    if isinstance(result, str):
+        return result
+    return json.dumps(result, ensure_ascii=False)
+
+
+async def _connect() -> aiosqlite.Connection:
+    conn = await aiosqlite.connect(JOBS_DB_PATH, timeout=5.0)
+    await conn.execute(_CREATE_TABLE_SQL)
+    return conn
+
+
+async def _load_job(key: str) -> Optional[Dict[str, Any]]:
+    conn = await _connect()
+    try:
+        conn.row_factory = aiosqlite.Row
+        async with conn.execute("SELECT * FROM tool_jobs WHERE job_key = ?", (key,)) as cursor:
+            row = await cursor.fetchone()
+        return dict(row) if row else None
+    finally:
+        await conn.close()
+
+
+async def _save_job(key: str, tool_name: str, job_id: str, status_url: str, status: str,
+                    result: Optional[str] = None, error: Optional[str] = None):
+    now = time.time()
+    conn = await _connect()
+    try:
+        await conn.execute(
+            """
+            INSERT INTO tool_jobs (job_key, tool_name, job_id, status_url, status, result, error, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(job_key) DO UPDATE SET
+                job_id = excluded.job_id, status_url = excluded.status_url, status = excluded.status,
+                result = excluded.result, error = excluded.error, updated_at = excluded.updated_at
+            """,
+            (key, tool_name, job_id, status_url, status, result, error, now, now),
+        )
+        await conn.commit()
+    finally:
+        await conn.close()
+
+
+async def _delete_job(key: str):
+    conn = await _connect()
+    try:
+        await conn.execute("DELETE FROM tool_jobs WHERE job_key = ?", (key,))
+        await conn.commit()
+    finally:
+        await conn.close()
+
+
+async def _submit(tool_name: str, payload: Dict[str, Any]) -> Dict[str, str]:
+    tool_config = JOBS_TOOLS[tool_name]
+    response = _loads(await post_json(tool_name, tool_config["submit_url"], payload, timeout=JOBS_REQUEST_TIMEOUT))
+    if not isinstance(response, dict) or not response.get("job_id"):
+        raise ToolJobError(f"{tool_name} 作业提交失败，未返回job_id: {response}")
+    job_id = str(response["job_id"])
+    status_url = response.get("status_url") or tool_config["status_url"].format(job_id=job_id)
+    logger.info(f"{tool_name} job submitted: {job_id}")
+    return {"job_id": job_id, "status_url": status_url}
+
+
+async def _poll(tool_name: str, job_id: str, status_url: str, max_wait: float) -> str:
+    """
+    按指数退避（带抖动）轮询作业状态，直到成功、失败或超过max_wait
+
+    服务端状态接口返回 {"status": "queued|running|succeeded|failed", "result": ..., "error": ...}
+    """
+    interval = JOBS_INITIAL_INTERVAL
+    deadline = time.monotonic() + max_wait
+    while True:
+        status = _loads(await get_json(tool_name, status_url, timeout=JOBS_REQUEST_TIMEOUT))
+        if not isinstance(status, dict):
+            raise ToolJobError(f"{tool_name} 作业 {job_id} 状态格式错误: {status}")
+        state = status.get("status")
+        if state == JOB_SUCCEEDED:
+            return _as_envelope(status.get("result"))
+        if state == JOB_FAILED:
+            raise ToolJobError(f"{tool_name} 作业 {job_id} 执行失败: {status.get('error')}")
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ToolJobTimeout(f"{tool_name} 作业 {job_id} 在 {max_wait}s 内未完成")
+        await asyncio.sleep(min(interval * random.uniform(0.8, 1.2), remaining))
+        interval = min(interval * JOBS_BACKOFF_FACTOR, JOBS_MAX_INTERVAL)
+
+
+async def run_tool_job(tool_name: str, payload: Dict[str, Any]) -> str:
+    """
+    以作业模式调用远程工具：提交 -> 获取job_id -> 指数退避轮询 -> 返回结果JSON字符串
+
+    作业状态持久化在TOOL_JOBS.db_path中：后端重启后，相同工具+参数的调用会接着轮询
+    已提交的作业而不是重新提交；若作业已由resume_pending_jobs在后台完成，直接返回结果。
+
+    Args:
+        tool_name: 工具名，需在TOOL_JOBS.tools中配置submit_url/status_url
+        payload: 与同步接口相同的请求体
+
+    Returns:
+        str: 最终结果，与同步接口一致的 {"type": "link", "url": ...} JSON字符串
+
+    Raises:
+        ToolJobError: 提交失败或作业执行失败
+        ToolJobTimeout: 超过TOOL_JOBS.max_wait仍未完成（作业记录保留，可再次调用继续轮询）
+    """
+    key = job_key(tool_name, payload)
+    job = await _load_job(key)
+    if job and job["status"] == JOB_SUCCEEDED:
+        await _delete_job(key)
+        logger.info(f"{tool_name} job {job['job_id']} already finished, returning stored result")
+        return job["result"]
+    if job and job["status"] == JOB_RUNNING:
+        logger.info(f"{tool_name} job {job['job_id']} resumed")
+    else:
+        job = await _submit(tool_name, payload)
+        await _save_job(key, tool_name, job["job_id"], job["status_url"], JOB_RUNNING)
+
+    try:
+        result = await _poll(tool_name, job["job_id"], job["status_url"], JOBS_MAX_WAIT)
+    except ToolJobError:
+        await _delete_job(key)
+        raise
+    await _delete_job(key)
+    return result
+
+
+async def resume_pending_jobs():
+    """
+    后端启动时调用：继续轮询重启前未完成的作业，并把结果写回作业表
+
+    之后相同参数的工具调用会直接拿到结果（见run_tool_job）。
+    """
+    try:
+        conn = await _connect()
+        try:
+            conn.row_factory = aiosqlite.Row
+            async with conn.execute("SELECT * FROM tool_jobs WHERE status = ?", (JOB_RUNNING,)) as cursor:
+                jobs = [dict(row) for row in await cursor.fetchall()]
+        finally:
+            await conn.close()
+    except Exception as e:
+        logger.error(f"Failed to load pending tool jobs: {e}")
+        return
+
+    async def resume(job: Dict[str, Any]):
+        remaining = JOBS_MAX_WAIT - (time.time() - job["created_at"])
+        try:
+            result = await _poll(job["tool_name"], job["job_id"], job["status_url"], max(remaining, 0))
+            await _save_job(job["job_key"], job["tool_name"], job["job_id"], job["status_url"], JOB_SUCCEEDED, result=result)
+            logger.info(f"{job['tool_name']} job {job['job_id']} finished after restart")
+        except ToolJobError as e:
+            await _delete_job(job["job_key"])
+            logger.error(str(e))
+        except Exception as e:
+            logger.error(f"Resuming {job['tool_name']} job {job['job_id']} failed: {type(e).__name__} - {e}")
+
+    if jobs:
+        logger.info(f"Resuming {len(jobs)} pending tool jobs")
+        await asyncio.gather(*(resume(job) for job in jobs))
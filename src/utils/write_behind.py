@@ -0,0 +1,243 @@
+import asyncio
+import concurrent.futures
+import sys
+import threading
+import time
+
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set, Union
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+from src.utils.async_storage import aupload_bytes, submit_storage_op
+from src.utils.log import logger
+
+
+WRITE_BEHIND_CONFIG = CONFIG_YAML.get("WRITE_BEHIND", {})
+WRITE_BEHIND_ENABLED = WRITE_BEHIND_CONFIG.get("enabled", True)
+# 流水线结束时等待剩余后台上传的最长时间（秒）
+WRITE_BEHIND_FLUSH_TIMEOUT = WRITE_BEHIND_CONFIG.get("flush_timeout", 120)
+
+
+class _PendingUpload:
+    __slots__ = ("uri", "data", "stage", "future", "started", "finished")
+
+    def __init__(self, uri: str, data: bytes, stage: str, future: concurrent.futures.Future):
+        self.uri = uri
+        self.data = data
+        self.stage = stage
+        self.future = future
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+
+# 尚未写入MinIO的产物：URI -> 待上传内容。同进程内的读取直接使用内存中的数据
+_pending: Dict[str, _PendingUpload] = {}
+_lock = threading.Lock()
+# 当前流水线运行写出的URI（write_behind_run内有效），flush_pending只等待这些上传
+_run_uris: ContextVar[Optional[Set[str]]] = ContextVar("write_behind_run_uris", default=None)
+_stage_stats: Dict[str, Dict[str, Any]] = defaultdict(
+    lambda: {"count": 0, "failures": 0, "bytes": 0, "upload_seconds": 0.0, "blocked_seconds": 0.0}
+)
+
+
+def _upload_error(future: concurrent.futures.Future) -> Optional[BaseException]:
+    if future.cancelled():
+        return RuntimeError("后台上传已取消")
+    return future.exception()
+
+
+def _finish(entry: _PendingUpload, future: concurrent.futures.Future):
+    entry.finished = time.perf_counter()
+    upload_seconds = entry.finished - entry.started
+    error = _upload_error(future)
+    failed = error is not None
+    with _lock:
+        if _pending.get(entry.uri) is entry:
+            del _pending[entry.uri]
+        stats = _stage_stats[entry.stage]
+        stats["count"] += 1
+        stats["failures"] += int(failed)
+        stats["bytes"] += len(entry.data)
+        stats["upload_seconds"] += upload_seconds
+    if failed:
+        logger.error(f"Write-behind upload failed for {entry.uri} ({entry.stage}): {error}")
+    else:
+        logger.info(f"Write-behind {entry.stage}: {entry.uri} persisted in {upload_seconds * 1000:.1f}ms")
+
+
+async def persist_behind(
+    data: Union[bytes, str],
+    bucket_name: str,
+    minio_object_name: str,
+    content_type: str = "application/octet-stream",
+    stage: str = "default",
+) -> str:
+    """
+    后台（write-behind）上传流水线中间产物，立即返回其MinIO地址
+
+    上传在存储线程池中进行，不阻塞调用方（WRITE_BEHIND.enabled为false时退化为等待上传完成）。
+    上传完成前，本进程内对该URI的读取（read_minio_bytes / open_minio_object / download_from_minio_uri）
+    直接使用内存中的数据。
+    需要把URI交给远程服务时先调用wait_persisted（call_remote_tool已自动处理）。
+
+    Args:
+        data: 文件内容，str按UTF-8编码
+        bucket_name: MinIO桶名称
+        minio_object_name: 对象名（必须指定，URI需在上传前确定）
+        content_type: 对象的Content-Type
+        stage: 流水线阶段名，用于统计节省的耗时
+
+    Returns:
+        str: MinIO访问地址 (格式: minio://bucket/object_name)
+    """
+    from src.utils.minio_utils import upload_bytes_to_minio
+
+    if not WRITE_BEHIND_ENABLED:
+        return await aupload_bytes(data, bucket_name, minio_object_name, content_type=content_type, content_addressed=False)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    uri = f"minio://{bucket_name}/{minio_object_name}"
+
+    future = concurrent.futures.Future()
+    # 标记为运行中：某个等待方被取消时只取消它自己的asyncio包装，不会取消其他等待方共享的结果
+    future.set_running_or_notify_cancel()
+    entry = _PendingUpload(uri, data, stage, future)
+    with _lock:
+        _pending[uri] = entry
+    run_uris = _run_uris.get()
+    if run_uris is not None:
+        run_uris.add(uri)
+    upload = submit_storage_op(
+        "put_object", upload_bytes_to_minio, data, bucket_name, minio_object_name, "", content_type, False
+    )
+
+    def done(upload_future: concurrent.futures.Future):
+        # 先更新统计、移出待上传表，再通知等待方，保证等待返回后读取会走MinIO
+        _finish(entry, upload_future)
+        error = _upload_error(upload_future)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(uri)
+
+    upload.add_done_callback(done)
+    return uri
+
+
+def pending_bytes(uri: str) -> Optional[bytes]:
+    """返回尚未写入MinIO的产物内容，不在待上传表中时返回None"""
+    with _lock:
+        entry = _pending.get(uri)
+        return entry.data if entry is not None else None
+
+
+def _collect_uris(value: Any, uris: set):
+    if isinstance(value, dict):
+        for item in value.values():
+            _collect_uris(item, uris)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _collect_uris(item, uris)
+    elif isinstance(value, str) and value.strip().startswith("minio://"):
+        uris.add(value.strip())
+
+
+async def wait_persisted(value: Union[str, Iterable, Dict[str, Any]]):
+    """
+    等待value中引用的后台上传全部完成（value可为URI、URI列表或请求体）
+
+    Raises:
+        Exception: 对应的后台上传失败
+    """
+    uris = set()
+    _collect_uris(value, uris)
+    with _lock:
+        entries = [_pending[uri] for uri in uris if uri in _pending]
+    for entry in entries:
+        started = time.perf_counter()
+        try:
+            await asyncio.wrap_future(entry.future)
+        finally:
+            with _lock:
+                _stage_stats[entry.stage]["blocked_seconds"] += time.perf_counter() - started
+
+
+@asynccontextmanager
+async def write_behind_run() -> AsyncIterator[Set[str]]:
+    """
+    记录一次流水线运行中persist_behind写出的URI，供结束时的flush_pending只等待本次运行的上传
+
+    Example:
+        async with write_behind_run():
+            ...
+            await flush_pending()
+    """
+    uris: Set[str] = set()
+    token = _run_uris.set(uris)
+    try:
+        yield uris
+    finally:
+        _run_uris.reset(token)
+
+
+async def flush_pending(uris: Optional[Iterable[str]] = None, timeout: float = WRITE_BEHIND_FLUSH_TIMEOUT) -> int:
+    """
+    等待后台上传完成，流水线结束前调用，保证返回给用户的地址均已可访问
+
+    多用户的服务进程中只等待本次运行的上传，不受其他运行的上传拖慢或超时影响。
+
+    Args:
+        uris: 需要等待的URI；默认为当前write_behind_run写出的URI，不在运行中时等待进程内全部上传
+        timeout: 最长等待时间（秒）
+
+    Returns:
+        int: 失败或超时未完成的上传数
+    """
+    if uris is None:
+        uris = _run_uris.get()
+    with _lock:
+        if uris is None:
+            entries = list(_pending.values())
+        else:
+            entries = [_pending[uri] for uri in set(uris) if uri in _pending]
+    if not entries:
+        return 0
+    started = time.perf_counter()
+    done, not_done = await asyncio.wait([asyncio.wrap_future(entry.future) for entry in entries], timeout=timeout)
+    failed = sum(1 for f in done if f.exception() is not None) + len(not_done)
+    # 结束前的等待同样计入各阶段的阻塞耗时
+    now = time.perf_counter()
+    with _lock:
+        for entry in entries:
+            _stage_stats[entry.stage]["blocked_seconds"] += max(min(entry.finished or now, now) - started, 0)
+    if not_done:
+        logger.warning(f"{len(not_done)} write-behind uploads still running after {timeout}s")
+    return failed
+
+
+def get_write_behind_stats() -> Dict[str, Any]:
+    """各阶段后台上传的次数、字节数、上传耗时、调用方阻塞等待耗时及节省的耗时（毫秒）"""
+    with _lock:
+        stages = {}
+        for stage, stats in _stage_stats.items():
+            upload_ms = stats["upload_seconds"] * 1000
+            blocked_ms = stats["blocked_seconds"] * 1000
+            stages[stage] = {
+                "count": stats["count"],
+                "failures": stats["failures"],
+                "bytes": stats["bytes"],
+                "upload_ms": round(upload_ms, 2),
+                "blocked_ms": round(blocked_ms, 2),
+                "saved_ms": round(max(upload_ms - blocked_ms, 0), 2),
+            }
+        return {
+            "enabled": WRITE_BEHIND_ENABLED,
+            "pending": len(_pending),
+            "stages": stages,
+        }
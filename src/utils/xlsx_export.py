@@ -0,0 +1,108 @@
+import sys
+
+from itertools import chain, islice
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator, List, Sequence, Union
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[2]
+sys.path.append(str(project_root))
+from config import CONFIG_YAML
+
+
+XLSX_EXPORT_CONFIG = CONFIG_YAML.get("XLSX_EXPORT", {})
+# 列宽按前N行估算，不再遍历全部单元格
+WIDTH_SAMPLE_ROWS = XLSX_EXPORT_CONFIG.get("width_sample_rows", 200)
+MAX_COLUMN_WIDTH = XLSX_EXPORT_CONFIG.get("max_column_width", 60)
+
+
+class SummaryRow:
+    """统计行：占满整行的合并单元格，文字居中（如NetMHCpan每个蛋白块末尾的统计信息）"""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+def _cell_value(value: Any) -> Any:
+    # NaN/NA写成空单元格；numpy标量转为Python标量
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def write_xlsx(
+    output: Union[str, Path, BinaryIO],
+    columns: Sequence[str],
+    rows: Iterable[Union[Sequence[Any], SummaryRow]],
+    sheet_name: str = "Results",
+    width_sample_rows: int = WIDTH_SAMPLE_ROWS,
+) -> int:
+    """
+    以openpyxl只写（流式）模式写出XLSX，内存占用与行数无关
+
+    rows可以直接是解析器的生成器；列宽由表头和前width_sample_rows行估算。
+    rows中的SummaryRow写为合并整行、居中的统计行。
+
+    Args:
+        output: 输出文件路径或可写的二进制流
+        columns: 表头
+        rows: 数据行（序列）或SummaryRow
+        sheet_name: 工作表名
+        width_sample_rows: 用于估算列宽的行数
+
+    Returns:
+        int: 写入的数据行数（不含表头和统计行）
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet_name)
+
+    rows = iter(rows)
+    sample = list(islice(rows, width_sample_rows))
+    widths = [len(str(column)) for column in columns]
+    for row in sample:
+        if isinstance(row, SummaryRow):
+            continue
+        for index, value in enumerate(row[:len(widths)]):
+            if value is not None:
+                widths[index] = max(widths[index], len(str(value)))
+    # 只写模式下列宽必须在写入第一行之前设置
+    for index, width in enumerate(widths, start=1):
+        worksheet.column_dimensions[get_column_letter(index)].width = min(width + 2, MAX_COLUMN_WIDTH)
+
+    worksheet.append(list(columns))
+    row_number = 1
+    data_rows = 0
+    for row in chain(sample, rows):
+        row_number += 1
+        if isinstance(row, SummaryRow):
+            cell = WriteOnlyCell(worksheet, value=row.text)
+            cell.alignment = Alignment(horizontal="center", vertical="center")
+            worksheet.append([cell])
+            worksheet.merged_cells.add(
+                CellRange(min_col=1, min_row=row_number, max_col=len(columns), max_row=row_number)
+            )
+        else:
+            worksheet.append([_cell_value(value) for value in row])
+            data_rows += 1
+
+    if isinstance(output, (str, Path)):
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+    workbook.save(output)
+    return data_rows
+
+
+def dataframe_rows(df: pd.DataFrame) -> Iterator[List[Any]]:
+    """逐行产出DataFrame的值，供write_xlsx使用"""
+    for row in df.itertuples(index=False, name=None):
+        yield list(row)
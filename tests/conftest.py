@@ -0,0 +1,7 @@
+import sys
+
+from pathlib import Path
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[1]
+sys.path.append(str(project_root))
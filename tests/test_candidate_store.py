@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.candidate_store import CandidateStore, allele_label
+
+
+OCCURRENCES = pd.DataFrame({
+    'protein': ["KRAS|p.G12D", "TP53|R175H", "KRAS|p.G12D"],
+    'start': [5, 170, 40],
+    'length': [9, 9, 10],
+    'sequence': ["VVGADGVGK", "HMTEVVRRC", "KLVVVGADGV"],
+    'mutation': ["p.G12D", "R175H", "p.G12D"],
+})
+
+
+def _store():
+    store = CandidateStore.from_occurrences(OCCURRENCES)
+    store.add_scores(pd.DataFrame({
+        'Peptide': ["VVGADGVGK", "VVGADGVGK", "HMTEVVRRC", "GADGVGKSA"],
+        'MHC': ["HLA-A*02:01", "HLA-A11:01", "A*02:01", "HLA-A*02:01"],
+        'BindLevel': ["<= SB", "<= WB", "<= SB", "<= WB"],
+    }), "Peptide", "MHC", ["BindLevel"])
+    return store
+
+
+def test_allele_label():
+    assert allele_label("HLA-A*02:01") == allele_label("HLA-A02:01") == allele_label(" a*02:01") == "HLA-A*02:01"
+
+
+def test_fan_out_one_row_per_pair_and_occurrence():
+    table = _store().fan_out()
+    rows = table.sort_values(['peptide', 'allele', 'start']).astype(object).where(table.notna(), None)
+    assert rows[['peptide', 'allele', 'BindLevel', 'protein', 'start', 'end', 'mutation']].values.tolist() == [
+        # NetMHCpan子窗口不在来源映射中，保留一行，来源列为空
+        ["GADGVGKSA", "HLA-A*02:01", "<= WB", None, None, None, None],
+        ["HMTEVVRRC", "HLA-A*02:01", "<= SB", "TP53|R175H", 170, 178, "R175H"],
+        ["VVGADGVGK", "HLA-A*02:01", "<= SB", "KRAS|p.G12D", 5, 13, "p.G12D"],
+        ["VVGADGVGK", "HLA-A*11:01", "<= WB", "KRAS|p.G12D", 5, 13, "p.G12D"],
+    ]
+
+
+def test_fan_out_follows_latest_stage_filter():
+    store = _store()
+    store.add_scores(pd.DataFrame({
+        'pep': ["VVGADGVGK"],
+        'mhc': ["HLA-A*11:01"],
+        'BigMHC_EL': [0.75],
+    }), "pep", "mhc", ["BigMHC_EL"])
+    table = store.fan_out()
+    assert table[['peptide', 'allele', 'BindLevel']].values.tolist() == [["VVGADGVGK", "HLA-A*11:01", "<= WB"]]
+    assert table['BigMHC_EL'].tolist() == [np.float32(0.75)]
+    assert store.alive_pairs() == [("VVGADGVGK", "HLA-A*11:01")]
+
+
+def test_fan_out_repeats_peptide_for_every_occurrence():
+    occurrences = pd.concat([OCCURRENCES, pd.DataFrame({
+        'protein': ["NRAS|Q61K"], 'start': [12], 'length': [9], 'sequence': ["VVGADGVGK"], 'mutation': ["Q61K"],
+    })], ignore_index=True)
+    store = CandidateStore.from_occurrences(occurrences)
+    store.add_pairs(["VVGADGVGK"], ["HLA-A*02:01"])
+    table = store.fan_out()
+    assert sorted(zip(table['protein'], table['start'].tolist())) == [("KRAS|p.G12D", 5), ("NRAS|Q61K", 12)]
+    assert store.summary()["occurrences"] == 4
+
+
+def test_fan_out_without_provenance_has_no_source_columns():
+    store = CandidateStore()
+    store.add_pairs(["AAAAAAAAA", "CCCCCCCCC"], ["HLA-A*02:01", "HLA-A*02:01"])
+    table = store.fan_out()
+    assert list(table.columns) == ['peptide', 'allele']
+    assert table.values.tolist() == [["AAAAAAAAA", "HLA-A*02:01"], ["CCCCCCCCC", "HLA-A*02:01"]]
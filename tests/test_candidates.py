@@ -0,0 +1,39 @@
+from src.utils.candidates import fasta_pairs, pair_fasta, protein_mutation, unique_keys
+
+
+def test_fasta_pairs_keeps_record_order_and_normalizes_alleles():
+    fasta = (
+        ">AAAAAAAAA|HLA-A*02:01\nAAAAAAAAA\n"
+        ">CCCCCCCCC|A*11:01\nCCCCCCCCC\n"
+        ">peptide_1 P1 start1_end9_len9\nDDDDDDDDD\n"
+        ">AAAAAAAAA|HLA-A*02:01\nAAAAAAAAA\n"
+    )
+    # 表头不是 >peptide|HLA 格式的记录跳过，重复组合不去重
+    assert fasta_pairs(fasta) == [
+        ("AAAAAAAAA", "HLA-A*02:01"),
+        ("CCCCCCCCC", "HLA-A*11:01"),
+        ("AAAAAAAAA", "HLA-A*02:01"),
+    ]
+
+
+def test_fasta_pairs_falls_back_to_header_peptide():
+    assert fasta_pairs(">FFFFFFFF|HLA-B*07:02\n") == [("FFFFFFFF", "HLA-B*07:02")]
+
+
+def test_pair_fasta_round_trips_through_fasta_pairs():
+    pairs = [("AAAAAAAAA", "HLA-A*02:01"), ("AAAAAAAAA", "HLA-B*07:02"), ("CCCCCCCCC", "HLA-A*02:01")]
+    fasta = pair_fasta(pairs)
+    assert fasta.splitlines()[:2] == [">AAAAAAAAA|HLA-A*02:01", "AAAAAAAAA"]
+    assert fasta_pairs(fasta) == pairs
+
+
+def test_unique_pairs_keep_first_occurrence_order():
+    pairs = fasta_pairs(pair_fasta([("B", "HLA-A*02:01"), ("A", "HLA-A*02:01"), ("B", "HLA-A*02:01")]))
+    assert unique_keys(pairs) == [("B", "HLA-A*02:01"), ("A", "HLA-A*02:01")]
+
+
+def test_protein_mutation():
+    assert protein_mutation("KRAS|p.G12D") == "p.G12D"
+    assert protein_mutation("KRAS|G12D") == "G12D"
+    assert protein_mutation("sp|P01116|RASK_HUMAN") == ""
+    assert protein_mutation("KRAS") == ""
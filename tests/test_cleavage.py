@@ -0,0 +1,104 @@
+import io
+
+import numpy as np
+
+import src.utils.cleavage as cleavage
+from src.utils.cleavage import cleavage_windows, parse_netchop_text, protein_peptides
+
+
+NETCHOP_TEXT = """NetChop 3.0 predictions using version C-term. Threshold 0.500000
+
+--------------------------------------
+ pos  AA  C      score      Ident
+--------------------------------------
+   1   M  .   0.062785 sp|P1|GENE1
+   2   K  S   0.923041 sp|P1|GENE1
+   3   T  .   0.120000 sp|P1|GENE1
+   4   A  S   0.800000 sp|P1|GENE1
+--------------------------------------
+
+Number of cleavage sites 2. Number of amino acids 4. Protein name sp|P1|GENE1
+
+--------------------------------------
+ pos  AA  C      score      Ident
+--------------------------------------
+   1   G  S   0.700000 GENE2|p.G12D
+   2   D  .   0.100000 GENE2|p.G12D
+   3   V  S   0.900000 GENE2|p.G12D
+--------------------------------------
+"""
+
+
+def _naive_windows(cut_sites, seq_len, lengths):
+    # 原实现：逐个剪切位点、逐个长度判断结束位置是否也是剪切位点
+    sites = set(cut_sites.tolist())
+    return [
+        (start, length)
+        for start in cut_sites.tolist()
+        for length in lengths
+        if start + length <= seq_len and start + length in sites
+    ]
+
+
+def test_cleavage_windows_start_and_end_on_cut_sites():
+    cut_sites = np.array([0, 3, 8, 9, 12, 17], dtype=np.int64)
+    starts, lengths = cleavage_windows(cut_sites, 17, [5, 8, 9])
+    assert list(zip(starts.tolist(), lengths.tolist())) == [(0, 8), (0, 9), (3, 5), (3, 9), (8, 9), (9, 8), (12, 5)]
+
+
+def test_cleavage_windows_drops_windows_past_sequence_end():
+    cut_sites = np.array([0, 8, 16], dtype=np.int64)
+    starts, lengths = cleavage_windows(cut_sites, 12, [8])
+    assert starts.tolist() == [0]
+    assert lengths.tolist() == [8]
+
+
+def test_cleavage_windows_empty_inputs():
+    for cut_sites, lengths in ((np.empty(0, dtype=np.int64), [8, 9]), (np.array([0, 8], dtype=np.int64), [])):
+        starts, window_lengths = cleavage_windows(cut_sites, 20, lengths)
+        assert starts.size == 0 and window_lengths.size == 0
+
+
+def test_cleavage_windows_matches_naive_generator():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        seq_len = int(rng.integers(1, 200))
+        cut_sites = np.unique(rng.integers(0, seq_len + 1, size=int(rng.integers(0, 60))))
+        starts, lengths = cleavage_windows(cut_sites, seq_len, [8, 9, 10])
+        assert list(zip(starts.tolist(), lengths.tolist())) == _naive_windows(cut_sites, seq_len, [8, 9, 10])
+
+
+def test_protein_peptides_positions_are_one_based():
+    sequence = "MKTAYIAKQRQISFVKSHFSRQ"
+    df = protein_peptides("P1", sequence, np.array([2, 10, 11, 20], dtype=np.int64), lengths=[8, 9])
+    assert df[['start', 'end', 'length', 'sequence']].values.tolist() == [
+        [3, 10, 8, "TAYIAKQR"],
+        [3, 11, 9, "TAYIAKQRQ"],
+        [12, 20, 9, "ISFVKSHFS"],
+    ]
+    assert set(df['protein']) == {"P1"}
+
+
+def _as_lists(proteins):
+    return {protein: (sequence, cut_sites.tolist()) for protein, (sequence, cut_sites) in proteins.items()}
+
+
+def test_parse_netchop_text_splits_proteins_by_ident():
+    assert _as_lists(parse_netchop_text(NETCHOP_TEXT)) == {
+        "sp|P1|GENE1": ("MKTA", [2, 4]),
+        "GENE2|p.G12D": ("GDV", [1, 3]),
+    }
+
+
+def test_parse_netchop_text_accepts_bytes_and_streams(monkeypatch):
+    expected = _as_lists(parse_netchop_text(NETCHOP_TEXT))
+    data = NETCHOP_TEXT.replace("\n", "\r\n").encode("utf-8")
+    assert _as_lists(parse_netchop_text(data)) == expected
+    # 小块读取时一个蛋白跨越多个块，行不能被截断
+    monkeypatch.setattr(cleavage, "NETCHOP_READ_BLOCK_SIZE", 16)
+    assert _as_lists(parse_netchop_text(io.BytesIO(data))) == expected
+
+
+def test_parse_netchop_text_reorders_out_of_order_positions():
+    text = "   2   K  S   0.9 P1\n   1   M  .   0.1 P1\n   3   T  S   0.8 P1\n"
+    assert _as_lists(parse_netchop_text(text)) == {"P1": ("MKT", [2, 3])}
@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import pandas as pd
+import pytest
+
+import src.utils.prediction_cache as prediction_cache
+from src.model.agents.tools.NetMHCPan import netmhcpan
+from src.model.agents.tools.NetMHCPan.filter_netmhcpan import filter_netmhcpan_table
+from src.model.agents.tools.NetMHCStabPan import netmhcstabpan
+from src.model.agents.tools.NetMHCStabPan.filter_netmhcstabpan import filter_netmhcstabpan_table
+from src.utils.result_tables import typed_columns
+
+
+ALLELES = ["HLA-A02:01", "HLA-B07:02"]
+UPSTREAM_ALLELES = ["HLA-A*02:01", "HLA-B*07:02"]
+RECORDS = [("p1 KRAS|p.G12D", "AAAAAAAAAC"), ("p2", "CCCCCCCCCDA")]
+
+TOOLS = {
+    "NetMHCpan": dict(
+        columns=netmhcpan.RESULT_COLUMNS, summary_template=netmhcpan.SUMMARY_TEMPLATE, pos_base=1,
+        summary_per_record=True, content_builder=filter_netmhcpan_table,
+    ),
+    "NetMHCstabpan": dict(
+        columns=netmhcstabpan.RESULT_COLUMNS, summary_template=netmhcstabpan.SUMMARY_TEMPLATE, pos_base=0,
+        summary_per_record=False, content_builder=filter_netmhcstabpan_table,
+    ),
+}
+
+
+class FakeStorage:
+    """内存中的FASTA与结果表，代替MinIO"""
+
+    def __init__(self, monkeypatch):
+        self.fastas = {}
+        self.tables = {}
+        self.upstream_inputs = []
+        monkeypatch.setattr(prediction_cache, "read_fasta_records", lambda uri: self.fastas[uri])
+        monkeypatch.setattr(prediction_cache, "read_result_table", lambda uri: self.tables[uri])
+        monkeypatch.setattr(prediction_cache, "publish_result_table", self.publish)
+        monkeypatch.setattr(prediction_cache, "stage_tool_input", self.stage)
+
+    def publish(self, df, bucket, stem):
+        uri = f"minio://{bucket}/{len(self.tables)}_{stem}"
+        self.tables[uri] = typed_columns(df)
+        return uri
+
+    async def stage(self, tool, fasta, bucket, name, content_type=None):
+        uri = f"minio://{bucket}/{name}"
+        self.fastas[uri] = [
+            (record.split("\n")[0], record.split("\n")[1]) for record in fasta.strip().lstrip(">").split("\n>")
+        ]
+        return uri
+
+    def upstream(self, tool):
+        # 按上游工具的输出结构生成结果表：NetMHCpan每条序列、每个allele后一条统计行，NetMHCstabpan只在表末一条
+        async def call(uri):
+            records = self.fastas[uri]
+            self.upstream_inputs.append([header for header, _ in records])
+            rows = []
+            for allele in UPSTREAM_ALLELES:
+                for header, sequence in records:
+                    identity = header.split()[0]
+                    binders = 0
+                    for start in range(len(sequence) - 8):
+                        peptide = sequence[start:start + 9]
+                        bind_level = "<= SB" if peptide.startswith("A") else None
+                        binders += bind_level is not None
+                        if tool == "NetMHCpan":
+                            rows.append({
+                                "Pos": start + 1, "MHC": allele, "Peptide": peptide, "Identity": identity,
+                                "Score_EL": 0.5, "%Rank_EL": 0.1, "Aff(nM)": 30.0, "BindLevel": bind_level,
+                            })
+                        else:
+                            rows.append({
+                                "Pos": start, "HLA": allele, "peptide": peptide, "Identity": identity,
+                                "Pred": 0.5, "Thalf(h)": 1.0, "%Rank_Stab": 0.3, "BindLevel": bind_level,
+                            })
+                    if tool == "NetMHCpan":
+                        rows.append({"Pos": netmhcpan.SUMMARY_TEMPLATE.format(
+                            identity=identity, allele=allele, strong=binders, weak=0, total=len(sequence) - 8,
+                        )})
+            if tool == "NetMHCstabpan":
+                header, sequence = records[0]
+                rows.append({"Pos": netmhcstabpan.SUMMARY_TEMPLATE.format(
+                    identity=header.split()[0], allele=UPSTREAM_ALLELES[0],
+                    strong=sum(sequence[start] == "A" for start in range(len(sequence) - 8)), weak=0, total=len(sequence) - 8,
+                )})
+            uri = f"minio://results/upstream{len(self.tables)}"
+            self.tables[uri] = pd.DataFrame(rows)
+            return json.dumps({"type": "link", "url": uri, "content": "upstream"}, ensure_ascii=False)
+        return call
+
+    def run(self, tool, uri):
+        result = json.loads(asyncio.run(prediction_cache.cached_fasta_prediction(
+            tool, uri, ALLELES, [9], self.upstream(tool), "results", params={"threshold": 0.5}, **TOOLS[tool],
+        )))
+        return self.tables[result["url"]], result["content"]
+
+
+@pytest.fixture
+def storage(monkeypatch, tmp_path):
+    monkeypatch.setattr(prediction_cache, "_cache", prediction_cache.PredictionCache(str(tmp_path / "cache.sqlite")))
+    storage = FakeStorage(monkeypatch)
+    storage.fastas["minio://molly/all.fasta"] = RECORDS
+    storage.fastas["minio://molly/first.fasta"] = RECORDS[:1]
+    return storage
+
+
+@pytest.mark.parametrize("tool", list(TOOLS))
+def test_cold_run_matches_upstream_table(storage, tool):
+    table, _ = storage.run(tool, "minio://molly/all.fasta")
+    upstream = storage.tables["minio://results/upstream0"]
+    pd.testing.assert_frame_equal(table, typed_columns(upstream[table.columns]))
+    assert storage.upstream_inputs == [["p1 KRAS|p.G12D", "p2"]]
+
+
+@pytest.mark.parametrize("tool", list(TOOLS))
+def test_partial_and_full_hits_match_cold_run(monkeypatch, tmp_path, storage, tool):
+    cold_table, cold_content = storage.run(tool, "minio://molly/all.fasta")
+
+    monkeypatch.setattr(prediction_cache, "_cache", prediction_cache.PredictionCache(str(tmp_path / "partial.sqlite")))
+    storage.run(tool, "minio://molly/first.fasta")
+    storage.upstream_inputs.clear()
+    partial_table, partial_content = storage.run(tool, "minio://molly/all.fasta")
+    # 只有未命中的序列发给上游
+    assert storage.upstream_inputs == [["p2"]]
+    pd.testing.assert_frame_equal(partial_table, cold_table)
+    assert partial_content == cold_content
+
+    storage.upstream_inputs.clear()
+    hit_table, hit_content = storage.run(tool, "minio://molly/all.fasta")
+    assert storage.upstream_inputs == []
+    pd.testing.assert_frame_equal(hit_table, cold_table)
+    assert hit_content == cold_content
+
+
+def test_params_are_part_of_cache_key(storage):
+    storage.run("NetMHCpan", "minio://molly/all.fasta")
+    storage.upstream_inputs.clear()
+    asyncio.run(prediction_cache.cached_fasta_prediction(
+        "NetMHCpan", "minio://molly/all.fasta", ALLELES, [9], storage.upstream("NetMHCpan"), "results",
+        params={"threshold": 0.1}, **TOOLS["NetMHCpan"],
+    ))
+    assert storage.upstream_inputs == [["p1 KRAS|p.G12D", "p2"]]
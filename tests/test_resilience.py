@@ -0,0 +1,192 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+import src.utils.resilience as resilience
+from src.utils.resilience import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    call_with_retry,
+    is_transient_error,
+)
+
+
+async def _ok():
+    return "ok"
+
+
+async def _transient():
+    raise aiohttp.ClientConnectionError("connection refused")
+
+
+async def _bad_request():
+    raise ValueError("bad request")
+
+
+def _call(breaker, func):
+    return asyncio.run(breaker.call(func))
+
+
+def _fail(breaker, times=1):
+    for _ in range(times):
+        with pytest.raises(aiohttp.ClientConnectionError):
+            _call(breaker, _transient)
+
+
+def _expire(breaker):
+    # 把熔断时间提前，模拟已过recovery_timeout
+    breaker.opened_at -= breaker.recovery_timeout
+
+
+def test_is_transient_error():
+    assert is_transient_error(aiohttp.ClientConnectionError())
+    assert is_transient_error(asyncio.TimeoutError())
+    for status, transient in ((500, True), (503, True), (429, True), (400, False), (404, False)):
+        error = aiohttp.ClientResponseError(None, (), status=status)
+        assert is_transient_error(error) is transient
+    assert not is_transient_error(ValueError())
+
+
+def test_opens_after_consecutive_transient_failures():
+    breaker = CircuitBreaker("tool:8000", failure_threshold=3, recovery_timeout=60)
+    _fail(breaker, 2)
+    assert breaker.state == STATE_CLOSED
+    # 成功调用清零连续失败次数
+    assert _call(breaker, _ok) == "ok"
+    _fail(breaker, 2)
+    assert breaker.state == STATE_CLOSED
+    _fail(breaker)
+    assert breaker.state == STATE_OPEN
+
+    with pytest.raises(CircuitOpenError) as error:
+        _call(breaker, _ok)
+    assert error.value.endpoint == "tool:8000"
+    assert 0 < error.value.retry_after <= 60
+    snapshot = breaker.snapshot()
+    assert snapshot["state"] == STATE_OPEN
+    assert snapshot["total_failures"] == 5
+    assert snapshot["total_rejected"] == 1
+
+
+def test_non_transient_errors_do_not_open():
+    breaker = CircuitBreaker("tool:8000", failure_threshold=1)
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            _call(breaker, _bad_request)
+    assert breaker.state == STATE_CLOSED
+    assert breaker.total_failures == 0
+
+
+def test_half_open_probe_success_closes():
+    breaker = CircuitBreaker("tool:8000", failure_threshold=1, recovery_timeout=60, half_open_max_calls=1)
+    _fail(breaker)
+    _expire(breaker)
+
+    async def probe():
+        release = asyncio.Event()
+
+        async def slow_ok():
+            await release.wait()
+            return "ok"
+
+        task = asyncio.create_task(breaker.call(slow_ok))
+        await asyncio.sleep(0)
+        assert breaker.state == STATE_HALF_OPEN
+        # 探测名额已被占用，其余调用直接拒绝
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(_ok)
+        release.set()
+        return await task
+
+    assert asyncio.run(probe()) == "ok"
+    assert breaker.state == STATE_CLOSED
+    assert breaker.consecutive_failures == 0
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = CircuitBreaker("tool:8000", failure_threshold=3, recovery_timeout=60)
+    _fail(breaker, 3)
+    _expire(breaker)
+    # half_open下一次失败即重新熔断，并重新计时
+    _fail(breaker)
+    assert breaker.state == STATE_OPEN
+    with pytest.raises(CircuitOpenError):
+        _call(breaker, _ok)
+
+
+def test_half_open_probe_released_on_cancel_and_client_error():
+    breaker = CircuitBreaker("tool:8000", failure_threshold=1, recovery_timeout=60, half_open_max_calls=1)
+    _fail(breaker)
+    _expire(breaker)
+
+    async def cancelled_probe():
+        task = asyncio.create_task(breaker.call(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled_probe())
+    assert breaker.state == STATE_HALF_OPEN
+    with pytest.raises(ValueError):
+        _call(breaker, _bad_request)
+    assert breaker.state == STATE_HALF_OPEN
+    # 名额均已释放，下一个探测仍可放行
+    assert _call(breaker, _ok) == "ok"
+    assert breaker.state == STATE_CLOSED
+
+
+@pytest.fixture
+def breakers(monkeypatch):
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(resilience, "RETRY_BACKOFF_BASE", 0)
+    monkeypatch.setattr(resilience, "RETRY_MAX_RETRIES", 2)
+    monkeypatch.setattr(resilience, "RETRY_IDEMPOTENT_TOOLS", {"NetMHCpan"})
+
+
+def _flaky(failures):
+    calls = []
+
+    async def func():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise aiohttp.ClientConnectionError("connection reset")
+        return "ok"
+
+    return func, calls
+
+
+def test_call_with_retry_retries_idempotent_tools(breakers):
+    func, calls = _flaky(2)
+    assert asyncio.run(call_with_retry("NetMHCpan", "http://tool:8000/netmhcpan", func)) == "ok"
+    assert len(calls) == 3
+
+    func, calls = _flaky(3)
+    with pytest.raises(aiohttp.ClientConnectionError):
+        asyncio.run(call_with_retry("NetMHCpan", "http://tool:8000/netmhcpan", func))
+    assert len(calls) == 3
+
+
+def test_call_with_retry_does_not_retry_other_tools(breakers):
+    func, calls = _flaky(1)
+    with pytest.raises(aiohttp.ClientConnectionError):
+        asyncio.run(call_with_retry("LinearDesign", "http://tool:8001/lineardesign", func))
+    assert len(calls) == 1
+
+
+def test_breaker_is_shared_per_endpoint(breakers):
+    resilience._breakers["tool:8001"] = CircuitBreaker("tool:8001", failure_threshold=1, recovery_timeout=60)
+    func, _ = _flaky(1)
+    with pytest.raises(aiohttp.ClientConnectionError):
+        asyncio.run(call_with_retry("LinearDesign", "http://tool:8001/lineardesign", func))
+    # 同一服务器上的其他工具同样被熔断，不再请求
+    func, calls = _flaky(0)
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call_with_retry("RNAFold", "http://tool:8001/rnafold", func))
+    assert calls == []
+    assert resilience.is_endpoint_available("http://tool:8002/rnaplot")
+    assert not resilience.is_endpoint_available("http://tool:8001/rnafold")
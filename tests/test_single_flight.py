@@ -0,0 +1,151 @@
+import asyncio
+import threading
+
+import pytest
+
+import src.utils.single_flight as single_flight_module
+from src.utils.single_flight import get_single_flight_stats, single_flight
+
+
+PAYLOAD = {"input_file": " AAAAAAAAA ", "mhc_allele": "HLA-A02:01"}
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(single_flight_module, "SINGLE_FLIGHT_ENABLED", True)
+    monkeypatch.setattr(single_flight_module, "_inflight", {})
+    monkeypatch.setattr(single_flight_module, "_stats", {"leaders": 0, "coalesced": 0})
+
+
+class Upstream:
+    """可控的上游调用：release之前一直挂起，记录调用次数"""
+
+    def __init__(self, result="R", error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def _followers(upstream, count):
+    leader = asyncio.create_task(single_flight("NetMHCpan", PAYLOAD, upstream))
+    await upstream.started.wait()
+    followers = [asyncio.create_task(single_flight("NetMHCpan", dict(PAYLOAD), upstream)) for _ in range(count)]
+    # 让等待方都登记到同一个进行中的调用上
+    for _ in range(5):
+        await asyncio.sleep(0)
+    return leader, followers
+
+
+def test_followers_share_leader_result():
+    async def run():
+        upstream = Upstream()
+        leader, followers = await _followers(upstream, 3)
+        upstream.release.set()
+        return upstream, await asyncio.gather(leader, *followers)
+
+    upstream, results = asyncio.run(run())
+    assert results == ["R"] * 4
+    assert upstream.calls == 1
+    assert get_single_flight_stats() == {"leaders": 1, "coalesced": 3, "inflight": 0}
+
+
+def test_different_payloads_are_not_coalesced():
+    async def run():
+        first, second = Upstream("A"), Upstream("B")
+        first.release.set()
+        second.release.set()
+        return await asyncio.gather(
+            single_flight("NetMHCpan", PAYLOAD, first),
+            single_flight("NetMHCpan", {**PAYLOAD, "mhc_allele": "HLA-B07:02"}, second),
+        )
+
+    assert asyncio.run(run()) == ["A", "B"]
+    assert get_single_flight_stats()["leaders"] == 2
+
+
+def test_cancelled_follower_does_not_affect_others():
+    async def run():
+        upstream = Upstream()
+        leader, followers = await _followers(upstream, 2)
+        followers[0].cancel()
+        await asyncio.sleep(0)
+        upstream.release.set()
+        return upstream, await asyncio.gather(leader, *followers, return_exceptions=True)
+
+    upstream, results = asyncio.run(run())
+    assert isinstance(results[1], asyncio.CancelledError)
+    assert results[0] == "R" and results[2] == "R"
+    assert upstream.calls == 1
+    assert get_single_flight_stats() == {"leaders": 1, "coalesced": 2, "inflight": 0}
+
+
+def test_cancelled_leader_fails_followers_without_retrying():
+    async def run():
+        upstream = Upstream()
+        leader, followers = await _followers(upstream, 2)
+        leader.cancel()
+        results = await asyncio.gather(leader, *followers, return_exceptions=True)
+        # 之后的相同调用重新成为leader
+        upstream.release.set()
+        again = await single_flight("NetMHCpan", PAYLOAD, upstream)
+        return upstream, results, again
+
+    upstream, results, again = asyncio.run(run())
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert all(isinstance(result, RuntimeError) for result in results[1:])
+    assert again == "R"
+    assert upstream.calls == 2
+    assert get_single_flight_stats() == {"leaders": 2, "coalesced": 2, "inflight": 0}
+
+
+def test_leader_error_is_shared():
+    async def run():
+        upstream = Upstream(error=ValueError("upstream 500"))
+        leader, followers = await _followers(upstream, 2)
+        upstream.release.set()
+        return upstream, await asyncio.gather(leader, *followers, return_exceptions=True)
+
+    upstream, results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert upstream.calls == 1
+
+
+def test_followers_on_other_event_loops():
+    # 同步工具在各自线程的事件循环中调用，等待方与leader不在同一个循环
+    release = threading.Event()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.to_thread(release.wait)
+        return "R"
+
+    results = {}
+
+    def call(name):
+        results[name] = asyncio.run(single_flight("NetMHCpan", PAYLOAD, upstream))
+
+    leader = threading.Thread(target=call, args=("leader",))
+    leader.start()
+    while not single_flight_module._inflight:
+        threading.Event().wait(0.01)
+    followers = [threading.Thread(target=call, args=(f"follower{i}",)) for i in range(2)]
+    for thread in followers:
+        thread.start()
+    while get_single_flight_stats()["coalesced"] < 2:
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(timeout=5)
+    assert results == {"leader": "R", "follower0": "R", "follower1": "R"}
+    assert len(calls) == 1
@@ -0,0 +1,139 @@
+import asyncio
+import concurrent.futures
+
+import pytest
+
+import src.utils.write_behind as write_behind
+from src.utils.write_behind import flush_pending, pending_bytes, persist_behind, wait_persisted, write_behind_run
+
+
+class FakeStorage:
+    """代替存储线程池：上传挂起，由测试决定何时完成、失败或取消"""
+
+    def __init__(self, monkeypatch):
+        self.uploads = {}
+        monkeypatch.setattr(write_behind, "WRITE_BEHIND_ENABLED", True)
+        monkeypatch.setattr(write_behind, "_pending", {})
+        monkeypatch.setattr(write_behind, "submit_storage_op", self.submit)
+
+    def submit(self, op, func, data, bucket_name, object_name, *args):
+        future = concurrent.futures.Future()
+        self.uploads[f"minio://{bucket_name}/{object_name}"] = future
+        return future
+
+    def complete(self, uri):
+        self.uploads[uri].set_result(uri)
+
+    def fail(self, uri, error):
+        self.uploads[uri].set_exception(error)
+
+
+def _run(coro):
+    # 等待方没有被通知时以超时失败，而不是一直挂起
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    return FakeStorage(monkeypatch)
+
+
+def test_pending_data_is_readable_until_persisted(storage):
+    async def run():
+        uri = await persist_behind("ACDEFGHIK", "molly", "a.fasta", stage="test")
+        assert pending_bytes(uri) == b"ACDEFGHIK"
+        waiter = asyncio.create_task(wait_persisted({"input_file": uri}))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        storage.complete(uri)
+        await waiter
+        return uri
+
+    uri = _run(run())
+    assert uri == "minio://molly/a.fasta"
+    assert pending_bytes(uri) is None
+
+
+def test_cancelled_waiter_does_not_cancel_the_upload(storage):
+    async def run():
+        uri = await persist_behind(b"data", "molly", "b.fasta")
+        cancelled = asyncio.create_task(wait_persisted(uri))
+        waiter = asyncio.create_task(wait_persisted([uri]))
+        flush = asyncio.create_task(flush_pending([uri]))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        storage.complete(uri)
+        return await asyncio.gather(cancelled, waiter, flush, return_exceptions=True)
+
+    cancelled, waited, failed = _run(run())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert waited is None
+    assert failed == 0
+
+
+def test_cancelled_flush_does_not_cancel_the_upload(storage):
+    async def run():
+        uri = await persist_behind(b"data", "molly", "c.fasta")
+        flush = asyncio.create_task(flush_pending([uri]))
+        waiter = asyncio.create_task(wait_persisted(uri))
+        await asyncio.sleep(0)
+        flush.cancel()
+        await asyncio.sleep(0)
+        storage.complete(uri)
+        return await asyncio.gather(flush, waiter, return_exceptions=True)
+
+    cancelled, waited = _run(run())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert waited is None
+
+
+def test_failed_upload(storage):
+    async def run():
+        uri = await persist_behind(b"data", "molly", "d.fasta", stage="test")
+        waiter = asyncio.create_task(wait_persisted(uri))
+        flush = asyncio.create_task(flush_pending([uri]))
+        await asyncio.sleep(0)
+        storage.fail(uri, ConnectionError("minio down"))
+        with pytest.raises(ConnectionError):
+            await waiter
+        return uri, await flush
+
+    uri, failed = _run(run())
+    assert failed == 1
+    # 失败的上传移出待上传表，之后的读取走MinIO
+    assert pending_bytes(uri) is None
+    assert write_behind.get_write_behind_stats()["stages"]["test"]["failures"] >= 1
+
+
+def test_cancelled_upload(storage):
+    async def run():
+        uri = await persist_behind(b"data", "molly", "e.fasta")
+        waiter = asyncio.create_task(wait_persisted(uri))
+        flush = asyncio.create_task(flush_pending([uri]))
+        await asyncio.sleep(0)
+        storage.uploads[uri].cancel()
+        return await asyncio.gather(waiter, flush, return_exceptions=True)
+
+    waited, failed = _run(run())
+    assert isinstance(waited, RuntimeError)
+    assert failed == 1
+
+
+def test_flush_waits_only_for_current_run(storage):
+    async def run():
+        other = await persist_behind(b"other", "molly", "other.fasta")
+        async with write_behind_run() as uris:
+            mine = await persist_behind(b"mine", "molly", "mine.fasta")
+            assert uris == {mine}
+            flush = asyncio.create_task(flush_pending())
+            await asyncio.sleep(0)
+            storage.complete(mine)
+            failed = await flush
+        # 运行之外默认等待全部上传，超时未完成的计为失败
+        return other, failed, await flush_pending(timeout=0.01)
+
+    other, failed, outside = _run(run())
+    assert failed == 0
+    assert outside == 1
+    assert pending_bytes(other) == b"other"